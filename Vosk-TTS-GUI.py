@@ -1,18 +1,19 @@
+import time  # Для задержек и замера времени запуска
+STARTUP_T0 = time.perf_counter()
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from vosk_tts import Model, Synth
 import os
-import tempfile
-import pygame  # Для воспроизведения
-from threading import Thread  # Для асинхронного синтеза
-from pydub import AudioSegment  # Для пост-обработки (скорость, паузы, MP3)
-import time  # Для задержек
-import re  # Для разбиения текста и поиска чисел
-from num2words import num2words  # Для преобразования чисел в слова
-import unicodedata  # Для нормализации символов
-import string  # Для printable символов
+import json  # Для отчёта о времени запуска
+from threading import Thread, Event  # Для загрузки модели и ожидания ответа из рабочих потоков
+from tts_jobs import JobScheduler, JobCancelled, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND  # Очередь задач синтеза
+from tts_timing import json_log_file  # JSON-лог замеров по этапам
 import traceback  # Для полного лога ошибок
-import datetime  # Для timestamp в логах
+# Тяжёлые модули (vosk_tts, numpy, pydub, pygame, num2words) импортируются при загрузке модели в фоне
+
+APP_VERSION = "1.0"
+JOB_WORKERS = 2  # Одновременных задач синтеза; одна всегда свободна для проигрывания
+DICT_FILE = "pronunciation_dict.txt"  # Как tts_engine.DEFAULT_DICT_FILE, без импорта движка при старте
+DICT_PAGE_ROWS = 15  # Строк словаря в окне редактора
 
 class TTSApp:
     def __init__(self, root):
@@ -20,20 +21,16 @@ class TTSApp:
         self.root.title("Vosk TTS Синтезатор")
         self.root.geometry("930x635")
 
-        # Модель и синтезатор
-        try:
-            self.model = Model(model_name="vosk-model-tts-ru-0.9-multi")
-            self.synth = Synth(self.model)
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось загрузить модель: {e}")
-            root.quit()
-
-        # Пользовательский словарь (загружаем из дефолтного файла)
-        self.dict_file = "pronunciation_dict.txt"
-        self.pronunciation_dict = self.load_dictionary(self.dict_file)
-
-        # Инициализация pygame
-        pygame.mixer.init()
+        # Модель загружается в фоне, до готовности кнопки синтеза отключены
+        self.engine = None
+        self.player = None
+        self.catalog = None  # Образцы голосов (tts_preview), готовятся в фоне после загрузки модели
+        self.preview_jobs = {}  # (голос, скорость) -> задача синтеза образца
+        self.hovered_speaker = None
+        self.dict_file = DICT_FILE
+        self.dictionary_changed = False  # Словарь правили, пока модель загружалась
+        self.retired_dictionaries = []  # (прежний словарь движка, задачи, которые могут его использовать)
+        self.startup = {"version": APP_VERSION, "import_s": round(time.perf_counter() - STARTUP_T0, 3)}
 
         # История файлов
         self.history = []
@@ -43,13 +40,99 @@ class TTSApp:
 
         # Переменные
         self.playing = False
-        self.temp_file = None
-        self.max_speed = 2.0  # Максимальное ускорение для обычного текста
-        self.max_speed_srt = 1.4  # Максимальное ускорение для SRT
+
+        # Очередь задач: проигрывание идёт раньше длинных экспортов
+        # VOSK_TTS_TIMING_LOG=файл — дописывать туда JSON-замеры по фрагментам и задачам
+        timing_file = os.environ.get("VOSK_TTS_TIMING_LOG")
+        self.scheduler = JobScheduler(workers=JOB_WORKERS, timing_log=json_log_file(timing_file) if timing_file else None)
+
+        self.root.after(0, self._on_window_shown)
+        self.root.after(100, self._poll_jobs)
+        Thread(target=self._load_model_thread, daemon=True).start()
+
+    def _on_window_shown(self):
+        self.startup["window_s"] = round(time.perf_counter() - STARTUP_T0, 3)
+
+    def _load_model_thread(self, config=None, previous=None, on_loaded=None):
+        # config — настройки для загрузки (по умолчанию из файла); previous — (движок, образцы)
+        # прежней модели: при ошибке остаются рабочими. on_loaded() — в потоке GUI после загрузки
+        try:
+            from tts_engine import TTSEngine  # Синтез без GUI
+            from tts_config import load_config, engine_options  # Модель и потоки из настроек
+            from tts_audio import SAMPLE_RATE  # Частота аудио модели
+            from tts_player import StreamPlayer  # Потоковое воспроизведение
+            from tts_preview import SpeakerCatalog  # Образцы голосов
+            import pygame  # Для воспроизведения
+
+            config = config or load_config()
+            # Потоков синтеза по числу ядер, если не задано; потоки onnxruntime делятся между ними
+            threads = config["threads"] or os.cpu_count() or 1
+            engine = TTSEngine(dict_file=None, **engine_options(config, threads))
+            engine.srt_workers = engine.text_workers = threads
+            # Пользовательский словарь (загружаем из дефолтного файла)
+            engine.set_dictionary(engine.load_dictionary(self.dict_file))
+            catalog = SpeakerCatalog(engine, config["preview_phrase"])
+
+            # Инициализация pygame в формате модели (буферы подаются напрямую); при смене модели плеер прежний
+            player = self.player
+            if player is None:
+                pygame.mixer.init(frequency=SAMPLE_RATE, size=-16, channels=1)
+                player = StreamPlayer()
+        except Exception as e:
+            error = e
+            self.root.after(0, lambda: self._on_model_failed(error, previous))
+            return
+        self.root.after(0, lambda: self._on_model_ready(engine, player, catalog, on_loaded))
+
+    def _on_model_failed(self, error, previous):
+        # Окно остаётся открытым: без модели доступны настройки, чтобы исправить модель или путь
+        messagebox.showerror("Ошибка", f"Не удалось загрузить модель: {error}")
+        if previous is not None:
+            self.engine, self.catalog = previous
+            if self.dictionary_changed:
+                self.dictionary_changed = False
+                self._apply_dictionary()
+            self._queue_previews()
+            for button in self.model_buttons:
+                button.config(state=tk.NORMAL)
+            self.status_label.config(text="Модель не сменена, настройки не сохранены")
+        else:
+            self.settings_btn.config(state=tk.NORMAL)
+            self.status_label.config(text="Модель не загружена: проверьте настройки")
+
+    def _on_model_ready(self, engine, player, catalog, on_loaded=None):
+        if on_loaded:
+            on_loaded()
+        self.engine = engine
+        self.player = player
+        self.catalog = catalog
+        if self.dictionary_changed:
+            # Файл словаря могли сохранить уже после того, как поток загрузки его прочитал
+            self.dictionary_changed = False
+            self._apply_dictionary()
+        self.preview_jobs = {}
+        self._queue_previews()
+        self.engine.cache.enabled = self.cache_var.get()
+        for button in self.model_buttons:
+            button.config(state=tk.NORMAL)
+        self.status_label.config(text="Модель загружена")
+        if "model_s" not in self.startup:
+            self.startup["model_s"] = round(time.perf_counter() - STARTUP_T0, 3)
+            self._report_startup()
+
+    def _report_startup(self):
+        # VOSK_TTS_STARTUP_REPORT=файл — записать время запуска (см. benchmarks/bench_startup.py)
+        report_file = os.environ.get("VOSK_TTS_STARTUP_REPORT")
+        if not report_file:
+            return
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(self.startup, f)
+        if os.environ.get("VOSK_TTS_STARTUP_EXIT"):
+            self.root.quit()
 
     def create_widgets(self):
         # Текстовое поле с прокруткой
-        self.text_label = tk.Label(self.root, text="Введите текст или используйте SRT ( <pause> для пауз, \n для абзацев):")
+        self.text_label = tk.Label(self.root, text="Введите текст или используйте SRT ( <pause> для пауз, \n для абзацев, [speaker=N] для смены голоса):")
         self.text_label.pack()
 
         text_frame = tk.Frame(self.root)
@@ -77,6 +160,7 @@ class TTSApp:
         self.speaker_var = tk.IntVar(value=2)
         self.speaker_menu = ttk.Combobox(self.root, textvariable=self.speaker_var, values=list(range(57)))
         self.speaker_menu.pack()
+        self._bind_speaker_preview()
 
         # Скорость (коэффициент, 0.5-2.0)
         self.speed_label = tk.Label(self.root, text="Скорость (0.5x - 2.0x):")
@@ -92,6 +176,11 @@ class TTSApp:
         self.volume_slider = tk.Scale(self.root, from_=0, to=100, orient=tk.HORIZONTAL, variable=self.volume_var)
         self.volume_slider.pack()
 
+        # Кэш синтезированных фрагментов
+        self.cache_var = tk.BooleanVar(value=True)
+        self.cache_check = tk.Checkbutton(self.root, text="Использовать кэш фрагментов", variable=self.cache_var, command=self.toggle_cache)
+        self.cache_check.pack()
+
         # Кнопки
         button_frame = tk.Frame(self.root)
         button_frame.pack(pady=10)
@@ -105,18 +194,36 @@ class TTSApp:
         self.srt_btn = tk.Button(button_frame, text="Синтезировать из SRT", command=self.synth_from_srt)
         self.srt_btn.pack(side=tk.LEFT, padx=5)
 
+        self.book_btn = tk.Button(button_frame, text="Аудиокнига", command=self.synth_audiobook)
+        self.book_btn.pack(side=tk.LEFT, padx=5)
+
         self.stop_btn = tk.Button(button_frame, text="Стоп", command=self.stop_playback)
         self.stop_btn.pack(side=tk.LEFT, padx=5)
 
+        self.cancel_btn = tk.Button(button_frame, text="Отменить все", command=self.cancel_all)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+
         self.clear_btn = tk.Button(button_frame, text="Очистить текст", command=self.clear_text)
         self.clear_btn.pack(side=tk.LEFT, padx=5)
 
         self.dict_btn = tk.Button(button_frame, text="Редактировать словарь", command=self.edit_dictionary)
         self.dict_btn.pack(side=tk.LEFT, padx=5)
 
+        self.stats_btn = tk.Button(button_frame, text="Статистика", command=self.show_stats)
+        self.stats_btn.pack(side=tk.LEFT, padx=5)
+
+        self.settings_btn = tk.Button(button_frame, text="Настройки", command=self.edit_settings)
+        self.settings_btn.pack(side=tk.LEFT, padx=5)
+
         self.about_btn = tk.Button(button_frame, text="О программе", command=self.show_about)
         self.about_btn.pack(side=tk.LEFT, padx=5)
 
+        # Кнопки, которым нужна модель, включаются после её загрузки
+        self.model_buttons = [self.synth_play_btn, self.synth_save_btn, self.srt_btn, self.book_btn, self.dict_btn,
+                              self.settings_btn]
+        for button in self.model_buttons:
+            button.config(state=tk.DISABLED)
+
         # История
         self.history_label = tk.Label(self.root, text="История файлов:")
         self.history_label.pack()
@@ -128,6 +235,10 @@ class TTSApp:
         self.progress = ttk.Progressbar(self.root, orient="horizontal", length=400, mode="determinate", maximum=100)
         self.progress.pack(pady=10)
 
+        # Состояние загрузки модели
+        self.status_label = tk.Label(self.root, text="Загрузка модели...")
+        self.status_label.pack()
+
     def show_context_menu(self, event):
         self.context_menu.post(event.x_root, event.y_root)
 
@@ -147,180 +258,335 @@ class TTSApp:
         self.text_area.delete("1.0", tk.END)
 
     def show_about(self):
-        messagebox.showinfo("О программе", "Vosk TTS Синтезатор\nВерсия 1.0\nИспользует vosk-tts для русского TTS.\nАвтор: DmitryVN\nhttps://github.com/DmitryVN/Vosk-TTS-GUI")
-
-    def load_dictionary(self, file_path):
-        try:
-            if os.path.exists(file_path):
-                with open(file_path, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
-                    return {line.split(":", 1)[0].strip(): line.split(":", 1)[1].strip() for line in lines if ":" in line}
-            return {}
-        except Exception as e:
-            messagebox.showwarning("Ошибка", f"Не удалось загрузить словарь: {e}")
-            return {}
+        messagebox.showinfo("О программе", f"Vosk TTS Синтезатор\nВерсия {APP_VERSION}\nИспользует vosk-tts для русского TTS.\nАвтор: DmitryVN\nhttps://github.com/DmitryVN/Vosk-TTS-GUI")
 
-    def save_dictionary(self, file_path, dictionary):
-        try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                for k, v in dictionary.items():
-                    f.write(f"{k}: {v}\n")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось сохранить словарь: {e}")
+    def show_stats(self):
+        # Сводка замеров по последним завершённым задачам: куда уходит время
+        jobs = [job for job in self.scheduler.history if job.timer.items][-5:]
+        if not jobs:
+            messagebox.showinfo("Статистика", "Завершённых задач синтеза пока нет.")
+            return
+        text = "\n\n".join(f"{job.name} ({job.status})\n{job.timer.format_summary()}" for job in reversed(jobs))
+        messagebox.showinfo("Статистика", text)
+
+    def edit_settings(self):
+        # Модель (имя или каталог), потоки onnxruntime и фраза образцов; после сохранения модель перезагружается
+        from tts_config import load_config, save_config, autotune, TUNED_KEYS
+
+        config = load_config()
+        settings_window = tk.Toplevel(self.root)
+        settings_window.title("Настройки модели")
+
+        fields = [("model_name", "Название модели (пусто — по умолчанию):", str),
+                  ("model_path", "Каталог модели на диске (вместо названия):", str),
+                  ("intra_op_threads", "Потоков внутри операции (0 — авто):", int),
+                  ("inter_op_threads", "Потоков между операциями (0 — авто):", int),
+                  ("threads", "Параллельных синтезов (0 — по числу ядер):", int),
+                  ("processes", "Процессов пакетного синтеза tts_cli (0 — по числу ядер):", int),
+                  ("preview_phrase", "Фраза образцов голосов (пусто — по умолчанию):", str)]
+        variables = {}
+        for row, (key, label, _) in enumerate(fields):
+            tk.Label(settings_window, text=label).grid(row=row, column=0, sticky="w", padx=5, pady=2)
+            variables[key] = tk.StringVar(value=str(config[key]))
+            tk.Entry(settings_window, textvariable=variables[key], width=40).grid(row=row, column=1, padx=5, pady=2)
+
+        def browse():
+            folder = filedialog.askdirectory()
+            if folder:
+                variables["model_path"].set(folder)
+
+        tk.Button(settings_window, text="Обзор...", command=browse).grid(row=1, column=2, padx=5)
+
+        def read_fields():
+            values = {}
+            for key, _, kind in fields:
+                try:
+                    values[key] = kind(variables[key].get().strip() or kind())
+                except ValueError:
+                    messagebox.showerror("Ошибка", f"Неверное значение: {variables[key].get()}", parent=settings_window)
+                    return None
+            return values
+
+        def save():
+            values = read_fields()
+            if values is None:
+                return
+            if self._foreground_jobs():
+                messagebox.showwarning("Настройки", "Дождитесь окончания или отмените задачи синтеза.", parent=settings_window)
+                return
+            new_config = {**config, **values}  # Ключи, которых нет в окне, остаются как в файле
+
+            def on_loaded():
+                # Настройки записываются, только если модель по ним загрузилась
+                try:
+                    save_config(new_config)
+                except OSError as e:
+                    messagebox.showerror("Ошибка", f"Модель загружена, но настройки не сохранены: {e}")
+
+            settings_window.destroy()
+            # Перезагрузка модели в фоне, как при запуске; образцы прежней модели не нужны.
+            # Если новая не загрузится, остаётся прежняя
+            self.scheduler.cancel(PRIORITY_BACKGROUND)
+            previous = (self.engine, self.catalog) if self.engine is not None else None
+            self.engine = None
+            self.catalog = None
+            for button in self.model_buttons:
+                button.config(state=tk.DISABLED)
+            self.status_label.config(text="Загрузка модели...")
+            Thread(target=self._load_model_thread, args=(new_config, previous, on_loaded), daemon=True).start()
+
+        def tune():
+            # Перебор процессов и потоков на этом компьютере; занимает несколько минут
+            values = read_fields()
+            if values is None:
+                return
+            speaker_id = self.speaker_var.get()
+            tune_btn.config(state=tk.DISABLED, text="Подбор...")
+
+            def run():
+                try:
+                    best, _ = autotune(values, speaker_id=speaker_id)
+                except Exception as e:
+                    error = e
+                    self.root.after(0, lambda: messagebox.showerror("Ошибка", f"Подбор не удался: {error}", parent=settings_window))
+                    self.root.after(0, lambda: tune_btn.config(state=tk.NORMAL, text="Подобрать потоки"))
+                    return
+
+                def done():
+                    if not settings_window.winfo_exists():
+                        return
+                    for key in TUNED_KEYS:
+                        variables[key].set(str(best[key]))
+                    tune_btn.config(state=tk.NORMAL, text="Подобрать потоки")
+                    messagebox.showinfo("Подбор", f"Лучшее: параллельных синтезов {best['threads']}, процессов "
+                                        f"{best['processes']}, потоков модели {best['intra_op_threads']}/"
+                                        f"{best['inter_op_threads']} ({best['audio_per_second']} с аудио в секунду).\n"
+                                        "Нажмите «Сохранить».", parent=settings_window)
+                self.root.after(0, done)
+            Thread(target=run, daemon=True).start()
+
+        button_frame = tk.Frame(settings_window)
+        button_frame.grid(row=len(fields), column=0, columnspan=3, pady=5)
+        tune_btn = tk.Button(button_frame, text="Подобрать потоки", command=tune)
+        tune_btn.pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Сохранить", command=save).pack(side=tk.LEFT, padx=5)
+
+    def toggle_cache(self):
+        if self.engine:
+            self.engine.cache.enabled = self.cache_var.get()
+
+    def _apply_dictionary(self):
+        # Словарь из файла — в движок (уже скомпилирован, открывается сразу). Прежний закрывается,
+        # когда завершатся задачи, выполнявшиеся при замене (новые берут уже новый словарь)
+        if self.engine is None:
+            self.dictionary_changed = True  # Модель загружается: применить, когда загрузится
+            return
+        from tts_dictionary import CompiledDictionary
+
+        previous = self.engine.pronunciation_dict
+        self.engine.set_dictionary(self.engine.load_dictionary(self.dict_file))
+        if isinstance(previous, CompiledDictionary):
+            running = [job for job in self._foreground_jobs() if job.status == "running"]
+            self.retired_dictionaries.append((previous, running))
+            self._close_retired_dictionaries()
+
+    def _close_retired_dictionaries(self):
+        keep = []
+        for dictionary, jobs in self.retired_dictionaries:
+            if all(job.finished for job in jobs):
+                dictionary.close()
+            else:
+                keep.append((dictionary, jobs))
+        self.retired_dictionaries = keep
 
     def edit_dictionary(self):
+        # Словарь может быть большим: в списке только видимые строки скомпилированного словаря
+        # (tts_dictionary), правки копятся в changes и дописываются в файл при сохранении
+        from tts_dictionary import open_dictionary, parse_dictionary, save_changes, format_entry
+
+        if not os.path.exists(self.dict_file):
+            open(self.dict_file, "a", encoding="utf-8").close()
+        # У окна свой экземпляр словаря (mmap), не движка: закрывается вместе с окном
+        state = {"dictionary": open_dictionary(self.dict_file), "first": 0}
+        changes = {}  # Ключ -> новое значение или None (удалить)
+
         dict_window = tk.Toplevel(self.root)
         dict_window.title("Редактировать словарь произношения")
-        dict_window.geometry("400x300")
+        dict_window.geometry("500x440")
 
-        text_area = tk.Text(dict_window, height=15, width=50)
-        text_area.pack()
+        def close_window():
+            state["dictionary"].close()
+            dict_window.destroy()
 
-        dict_text = "\n".join([f"{k}: {v}" for k, v in self.pronunciation_dict.items()])
-        text_area.insert(tk.END, dict_text)
+        dict_window.protocol("WM_DELETE_WINDOW", close_window)
 
-        button_frame = tk.Frame(dict_window)
-        button_frame.pack(pady=5)
+        search_var = tk.StringVar()
+        search_frame = tk.Frame(dict_window)
+        search_frame.pack(fill=tk.X, padx=5, pady=5)
+        tk.Label(search_frame, text="Поиск:").pack(side=tk.LEFT)
+        tk.Entry(search_frame, textvariable=search_var).pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        list_frame = tk.Frame(dict_window)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=5)
+        listbox = tk.Listbox(list_frame, height=DICT_PAGE_ROWS, exportselection=False)
+        listbox.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        scrollbar = tk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        def show(first):
+            dictionary = state["dictionary"]
+            total = len(dictionary)
+            size = DICT_PAGE_ROWS
+            first = max(0, min(first, total - size))
+            state["first"] = first
+            listbox.delete(0, tk.END)
+            for i in range(first, min(first + size, total)):
+                key, value = dictionary.row(i)
+                if key in changes:
+                    value = "(удалено)" if changes[key] is None else changes[key] + " *"
+                listbox.insert(tk.END, f"{key}: {value}")
+            scrollbar.set(first / total if total else 0, min(1, (first + size) / total) if total else 1)
+            count_label.config(text=f"Записей: {total}, несохранённых правок: {len(changes)}")
+
+        def on_scroll(action, amount, unit=None):
+            if action == "moveto":
+                show(int(float(amount) * len(state["dictionary"])))
+            else:
+                step = DICT_PAGE_ROWS if unit == "pages" else 1
+                show(state["first"] + int(amount) * step)
+
+        def on_wheel(event):
+            delta = -1 if event.num == 4 or event.delta > 0 else 1
+            show(state["first"] + delta * 3)
+            return "break"
+
+        scrollbar.config(command=on_scroll)
+        listbox.bind("<MouseWheel>", on_wheel)
+        listbox.bind("<Button-4>", on_wheel)
+        listbox.bind("<Button-5>", on_wheel)
+
+        edit_frame = tk.Frame(dict_window)
+        edit_frame.pack(fill=tk.X, padx=5, pady=5)
+        key_var = tk.StringVar()
+        value_var = tk.StringVar()
+        tk.Label(edit_frame, text="Слово:").grid(row=0, column=0, sticky="w")
+        tk.Entry(edit_frame, textvariable=key_var, width=25).grid(row=0, column=1, padx=5)
+        tk.Label(edit_frame, text="Произношение:").grid(row=1, column=0, sticky="w")
+        tk.Entry(edit_frame, textvariable=value_var, width=25).grid(row=1, column=1, padx=5)
+        count_label = tk.Label(dict_window, text="")
+        count_label.pack()
+
+        def on_select(event):
+            selection = listbox.curselection()
+            if selection:
+                key, value = state["dictionary"].row(state["first"] + selection[0])
+                key_var.set(key)
+                value_var.set(changes.get(key, value) or "")
+
+        def on_search(*args):
+            show(state["dictionary"].search(search_var.get().strip()))
+
+        listbox.bind("<<ListboxSelect>>", on_select)
+        search_var.trace_add("write", on_search)
+
+        def set_entry():
+            key = key_var.get().strip()
+            if not key or ":" in key:
+                messagebox.showwarning("Ошибка", "Слово не должно быть пустым или содержать двоеточие.", parent=dict_window)
+                return
+            changes[key] = value_var.get().strip()
+            show(state["first"])
+
+        def delete_entry():
+            key = key_var.get().strip()
+            if key:
+                changes[key] = None
+                show(state["first"])
+
+        def reopen(message):
+            # Пересборка большого словаря занимает секунды: в фоне, окно остаётся отзывчивым
+            save_btn.config(state=tk.DISABLED)
+            count_label.config(text="Сборка словаря...")
+
+            def run():
+                try:
+                    dictionary = open_dictionary(self.dict_file)
+                except Exception as e:
+                    error = e
+
+                    def failed():
+                        messagebox.showerror("Ошибка", f"Не удалось собрать словарь: {error}")
+                        if dict_window.winfo_exists():
+                            save_btn.config(state=tk.NORMAL)
+                    self.root.after(0, failed)
+                    return
+
+                def done():
+                    self._apply_dictionary()
+                    if not dict_window.winfo_exists():
+                        dictionary.close()
+                        return
+                    state["dictionary"].close()
+                    state["dictionary"] = dictionary
+                    save_btn.config(state=tk.NORMAL)
+                    show(state["first"])
+                    messagebox.showinfo("Успех", message, parent=dict_window)
+                self.root.after(0, done)
+            Thread(target=run, daemon=True).start()
 
         def load_from_file():
-            file = filedialog.askopenfilename(filetypes=[("Text files", "*.txt *.dic")])
+            # Записи файла дописываются к словарю; совпадающие ключи берутся из файла
+            file = filedialog.askopenfilename(filetypes=[("Text files", "*.txt *.dic")], parent=dict_window)
             if file:
-                new_dict = self.load_dictionary(file)
-                if new_dict:
-                    self.pronunciation_dict.update(new_dict)
-                    text_area.delete("1.0", tk.END)
-                    text_area.insert(tk.END, "\n".join([f"{k}: {v}" for k, v in self.pronunciation_dict.items()]))
-                    messagebox.showinfo("Успех", "Словарь загружен из файла!")
+                try:
+                    save_changes(self.dict_file, parse_dictionary(file))
+                except Exception as e:
+                    messagebox.showwarning("Ошибка", f"Не удалось загрузить словарь: {e}", parent=dict_window)
+                    return
+                reopen("Словарь загружен из файла!")
 
         def save_to_file():
-            file = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text files", "*.txt *.dic")])
-            if file:
-                temp_dict = {}
-                lines = text_area.get("1.0", tk.END).strip().split("\n")
-                for line in lines:
-                    if ":" in line:
-                        key, value = line.split(":", 1)
-                        temp_dict[key.strip()] = value.strip()
-                self.save_dictionary(file, temp_dict)
-                messagebox.showinfo("Успех", "Словарь сохранён в файл!")
+            file = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text files", "*.txt *.dic")],
+                                                parent=dict_window)
+            if not file:
+                return
+            dictionary = state["dictionary"]
+            try:
+                with open(file, "w", encoding="utf-8") as f:
+                    for key, value in dictionary.items():
+                        value = changes.get(key, value)
+                        if value is not None:
+                            f.write(format_entry(key, value))
+                    f.writelines(format_entry(key, value) for key, value in changes.items()
+                                 if value is not None and key not in dictionary)
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось сохранить словарь: {e}", parent=dict_window)
+                return
+            messagebox.showinfo("Успех", "Словарь сохранён в файл!", parent=dict_window)
 
         def save_dict():
-            new_dict = {}
-            lines = text_area.get("1.0", tk.END).strip().split("\n")
-            for line in lines:
-                if ":" in line:
-                    try:
-                        key, value = line.split(":", 1)
-                        new_dict[key.strip()] = value.strip()
-                    except:
-                        pass
-            self.pronunciation_dict = new_dict
-            self.save_dictionary(self.dict_file, new_dict)  # Сохраняем в дефолтный
-            messagebox.showinfo("Успех", "Словарь обновлён!")
-            dict_window.destroy()
-
-        load_btn = tk.Button(button_frame, text="Загрузить из файла", command=load_from_file)
-        load_btn.pack(side=tk.LEFT, padx=5)
-
-        save_file_btn = tk.Button(button_frame, text="Сохранить в файл", command=save_to_file)
-        save_file_btn.pack(side=tk.LEFT, padx=5)
-
-        save_btn = tk.Button(button_frame, text="Сохранить изменения", command=save_dict)
+            if not changes:
+                return
+            try:
+                save_changes(self.dict_file, changes)
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось сохранить словарь: {e}", parent=dict_window)
+                return
+            changes.clear()
+            reopen("Словарь обновлён!")
+
+        button_frame = tk.Frame(edit_frame)
+        button_frame.grid(row=0, column=2, rowspan=2, padx=5)
+        tk.Button(button_frame, text="Записать", command=set_entry).pack(fill=tk.X)
+        tk.Button(button_frame, text="Удалить", command=delete_entry).pack(fill=tk.X)
+
+        file_frame = tk.Frame(dict_window)
+        file_frame.pack(pady=5)
+        tk.Button(file_frame, text="Загрузить из файла", command=load_from_file).pack(side=tk.LEFT, padx=5)
+        tk.Button(file_frame, text="Сохранить в файл", command=save_to_file).pack(side=tk.LEFT, padx=5)
+        save_btn = tk.Button(file_frame, text="Сохранить изменения", command=save_dict)
         save_btn.pack(side=tk.LEFT, padx=5)
-
-    def apply_dictionary_and_numbers(self, text):
-        # Расширенная очистка: нормализация, удаление не-printable, скобок, замена тире/кавычек
-        text = unicodedata.normalize('NFKC', text)
-        text = ''.join(c for c in text if c in string.printable or unicodedata.category(c) != 'Cc')
-        text = re.sub(r'[```math```{}KATEX_INLINE_OPENKATEX_INLINE_CLOSE]', '', text)  # Удаление скобок
-        text = text.replace('–', '-').replace('—', '-').replace('−', '-')  # Замена тире на дефис
-        text = text.replace('«', '"').replace('»', '"').replace('‘', "'").replace('’', "'").replace('"', ' ').replace("'", ' ')  # Кавычки на пробел
-        text = text.replace('…', '...')  # Ellipsis
-        text = text.replace('ё', 'е')
-        text = re.sub(r'[\r\n]+', ' ', text)
-        # Базовая транслитерация латинского/английского текста
-        text = self.transliterate_latin(text)
-        # Преобразование чисел
-        text = self.convert_numbers_to_words(text)
-        # Словарь
-        for key, value in self.pronunciation_dict.items():
-            text = text.replace(key, value)
-        return text
-
-    def transliterate_latin(self, text):
-        translit_map = {
-            'a': 'а', 'b': 'б', 'c': 'к', 'd': 'д', 'e': 'е', 'f': 'ф', 'g': 'г', 'h': 'х', 'i': 'и', 'j': 'й',
-            'k': 'к', 'l': 'л', 'm': 'м', 'n': 'н', 'o': 'о', 'p': 'п', 'q': 'к', 'r': 'р', 's': 'с', 't': 'т',
-            'u': 'у', 'v': 'в', 'w': 'в', 'x': 'кс', 'y': 'й', 'z': 'з',
-            'A': 'А', 'B': 'Б', 'C': 'К', 'D': 'Д', 'E': 'Е', 'F': 'Ф', 'G': 'Г', 'H': 'Х', 'I': 'И', 'J': 'Й',
-            'K': 'К', 'L': 'Л', 'M': 'М', 'N': 'Н', 'O': 'О', 'P': 'П', 'Q': 'К', 'R': 'Р', 'S': 'С', 'T': 'Т',
-            'U': 'У', 'V': 'В', 'W': 'В', 'X': 'Кс', 'Y': 'Й', 'Z': 'З'
-        }
-        def replace_latin(match):
-            return ''.join(translit_map.get(c, c) for c in match.group(0))
-        text = re.sub(r'[a-zA-Z]+', replace_latin, text)
-        return text
-
-    def convert_numbers_to_words(self, text):
-        # Дроби (1/2 -> одна вторая)
-        text = re.sub(r'(\d+)/(\d+)', lambda m: f"{num2words(int(m.group(1)), lang='ru')} {num2words(int(m.group(2)), lang='ru', to='ordinal')}", text)
-        # Проценты (50% или 50 % -> пятьдесят процентов)
-        text = re.sub(r'(\d+)\s*%', lambda m: f"{num2words(int(m.group(1)), lang='ru')} процентов", text)
-        # Десятичные с точкой или запятой (3.14 или 1,9 -> три целых четырнадцать сотых)
-        text = re.sub(r'(\d+)[.,](\d+)', lambda m: f"{num2words(int(m.group(1)), lang='ru')} целых {num2words(int(m.group(2)), lang='ru')} {self.get_fraction_word(len(m.group(2)))}", text)
-        # Простые числа (123 -> сто двадцать три)
-        text = re.sub(r'\b(\d+)\b', lambda m: num2words(int(m.group(1)), lang='ru'), text)
-        # Валюта (100 руб. -> сто рублей)
-        text = re.sub(r'(\d+) руб\.', lambda m: f"{num2words(int(m.group(1)), lang='ru')} рублей", text)
-        return text
-
-    def get_fraction_word(self, digits):
-        if digits == 1: return "десятых"
-        elif digits == 2: return "сотых"
-        elif digits == 3: return "тысячных"
-        return "долей"
-
-    def synth_text_to_wav(self, text, output_file, speaker_id, speed_factor=1.0):
-        text = self.apply_dictionary_and_numbers(text)
-        combined = AudioSegment.empty()
-        pause_short = AudioSegment.silent(duration=500)  # Для <pause>
-        pause_long = AudioSegment.silent(duration=1000)  # Для \n (абзацы)
-
-        # Улучшенное разбиение
-        try:
-            parts = re.split(r'(?<=[\.\!\?\;])\s*|\n', text)
-            if len(text) > 1000:
-                chunks = []
-                current_chunk = ""
-                for part in parts:
-                    if len(current_chunk) + len(part) > 500:
-                        chunks.append(current_chunk.strip())
-                        current_chunk = part
-                    else:
-                        current_chunk += part + " "
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-            else:
-                chunks = [p.strip() for p in parts if p.strip()]
-        except:
-            chunks = [text]
-
-        for i, chunk in enumerate(chunks):
-            chunk = chunk.replace("<pause>", "")
-            if chunk:
-                temp_out = tempfile.mktemp(suffix=".wav")
-                self.synth.synth(chunk, temp_out, speaker_id=speaker_id)
-                segment = AudioSegment.from_wav(temp_out)
-                if speed_factor != 1.0:
-                    segment = segment.speedup(playback_speed=speed_factor) if speed_factor > 1 else segment._spawn(segment.raw_data, overrides={"frame_rate": int(segment.frame_rate * speed_factor)})
-                    segment = segment.set_frame_rate(22050)  # Стандартный rate
-                combined += segment
-                if "<pause>" in chunk:
-                    combined += pause_short
-                if "\n" in chunk or i < len(chunks) - 1:
-                    combined += pause_long
-                os.remove(temp_out)
-        combined.export(output_file, format="wav")
+        show(0)
 
     def synth_and_play(self):
         text = self.text_area.get("1.0", tk.END).strip()
@@ -332,43 +598,28 @@ class TTSApp:
         speed_factor = self.speed_var.get()
         volume = self.volume_var.get() / 100.0
 
-        self.temp_file = tempfile.mktemp(suffix=".wav")
-
-        self.progress["value"] = 0
-        thread = Thread(target=self._synth_and_play_thread, args=(text, speaker_id, speed_factor, volume))
-        thread.start()
+        # Новое проигрывание заменяет текущее
+        self.stop_playback()
+        self.scheduler.submit("Проигрывание", lambda job: self._synth_and_play_job(job, text, speaker_id, speed_factor, volume),
+                              priority=PRIORITY_INTERACTIVE)
 
-    def _synth_and_play_thread(self, text, speaker_id, speed_factor, volume):
+    def _synth_and_play_job(self, job, text, speaker_id, speed_factor, volume):
+        # Потоковое воспроизведение: первый фрагмент звучит, пока синтезируются остальные
         try:
-            self.synth_text_to_wav(text, self.temp_file, speaker_id, speed_factor)
-            
-            # Вычисляем длительность аудио
-            audio = AudioSegment.from_wav(self.temp_file)
-            duration = audio.duration_seconds
-            
-            pygame.mixer.music.load(self.temp_file)
-            pygame.mixer.music.set_volume(volume)
-            pygame.mixer.music.play()
+            from tts_player import StreamPlayer
+            # Свой проигрыватель на задачу, чтобы остановка прежней не задела новую
+            player = self.player = StreamPlayer()
             self.playing = True
-            
-            # Реальный прогресс
-            start_time = time.time()
-            while self.playing and pygame.mixer.music.get_busy():
-                elapsed = (time.time() - start_time)
-                progress_value = min(100, (elapsed / duration) * 100 if duration > 0 else 0)
-                self.root.after(0, lambda v=progress_value: self.progress.__setitem__("value", v))
-                time.sleep(0.1)
-            
-            self.playing = False
-            time.sleep(0.5)  # Задержка для освобождения файла
-            try:
-                os.remove(self.temp_file)
-            except OSError as e:
-                print(f"Ошибка удаления temp файла: {e}")
+            job.token.on_cancel(player.stop)
+            buffers = self.engine.iter_text_pcm(text, speaker_id, speed_factor, incremental=True, token=job.token,
+                                                timer=job.timer)
+            player.play(buffers, volume, on_progress=job.set_progress)
+        except JobCancelled:
+            raise
         except Exception as e:
             self.root.after(0, lambda: messagebox.showerror("Ошибка", str(e)))
         finally:
-            self.root.after(0, lambda: self.progress.__setitem__("value", 0))
+            self.playing = False
 
     def synth_and_save(self):
         text = self.text_area.get("1.0", tk.END).strip()
@@ -385,32 +636,31 @@ class TTSApp:
             return
 
         format = "mp3" if output_file.endswith(".mp3") else "wav"
+        volume = self.volume_var.get() / 100.0  # Громкость применяется и к файлу
 
-        self.progress["value"] = 0
-        thread = Thread(target=self._synth_and_save_thread, args=(text, output_file, speaker_id, speed_factor, format))
-        thread.start()
+        self.scheduler.submit(f"Сохранение {os.path.basename(output_file)}",
+                              lambda job: self._synth_and_save_job(job, text, output_file, speaker_id, speed_factor, format, volume))
 
-    def _synth_and_save_thread(self, text, output_file, speaker_id, speed_factor, format):
+    def _synth_and_save_job(self, job, text, output_file, speaker_id, speed_factor, format, volume=1.0):
         try:
-            temp_wav = tempfile.mktemp(suffix=".wav")
-            self.synth_text_to_wav(text, temp_wav, speaker_id, speed_factor)
-            audio = AudioSegment.from_wav(temp_wav)
-            audio.export(output_file, format=format)
-            os.remove(temp_wav)
+            # Без incremental: фрагменты документа не держатся в памяти, повторы берутся из кэша на диске
+            self.engine.synth_text_to_file(text, output_file, speaker_id, speed_factor, format,
+                                           token=job.token, progress=job.set_progress, timer=job.timer, gain=volume)
             self.root.after(0, lambda f=output_file: self.add_to_history(f))
             self.root.after(0, lambda: messagebox.showinfo("Успех", f"Файл сохранён: {output_file}"))
+        except JobCancelled:
+            raise
         except Exception as e:
             self.root.after(0, lambda: messagebox.showerror("Ошибка", str(e)))
-        finally:
-            self.root.after(0, lambda: self.progress.__setitem__("value", 0))
 
     def synth_from_srt(self):
-        srt_file = filedialog.askopenfilename(filetypes=[("SRT files", "*.srt")])
+        srt_file = filedialog.askopenfilename(filetypes=[("Субтитры", "*.srt *.vtt *.ass *.ssa"), ("SRT files", "*.srt")])
         if not srt_file:
             return
 
+        problems = []
         try:
-            subtitles = self.parse_srt(srt_file)
+            subtitles = self.engine.parse_srt(srt_file, log=problems.append)
         except Exception as e:
             messagebox.showerror("Ошибка", f"Ошибка парсинга SRT: {e}")
             return
@@ -418,6 +668,11 @@ class TTSApp:
         if not subtitles:
             messagebox.showwarning("Ошибка", "SRT пустой или неверный формат!")
             return
+        if problems:
+            # Испорченные субтитры пропущены: показать, какие, и дать отказаться
+            shown = "\n".join(problems[:10]) + (f"\n... ещё {len(problems) - 10}" if len(problems) > 10 else "")
+            if not messagebox.askyesno("Предупреждение", f"Ошибки в файле субтитров, эти места пропущены: {len(problems)}\n{shown}\n\nПродолжить?"):
+                return
 
         # Выбор файла для сохранения
         filetypes = [("WAV files", "*.wav"), ("MP3 files", "*.mp3")]
@@ -428,165 +683,201 @@ class TTSApp:
 
         speaker_id = self.speaker_var.get()
         initial_speed = self.speed_var.get()
+        volume = self.volume_var.get() / 100.0
 
-        self.root.after(0, lambda: self.progress.__setitem__("value", 0))
-        thread = Thread(target=self._synth_srt_thread, args=(subtitles, output_file, speaker_id, initial_speed, format))
-        thread.start()
+        self.scheduler.submit(f"SRT {os.path.basename(srt_file)}",
+                              lambda job: self._synth_srt_job(job, subtitles, output_file, speaker_id, initial_speed, format, volume))
 
-    def _synth_srt_thread(self, subtitles, output_file, speaker_id, initial_speed, format):
-        start_time = time.time()
+    def synth_audiobook(self):
+        from tts_audiobook import Audiobook
+        input_file = filedialog.askopenfilename(filetypes=[("Text files", "*.txt")])
+        if not input_file:
+            return
+        output_dir = filedialog.askdirectory(title="Папка для глав")
+        if not output_dir:
+            return
+
+        book = Audiobook(self.engine, input_file, output_dir, self.speaker_var.get(), self.speed_var.get(),
+                         gain=self.volume_var.get() / 100.0)
+        # Если в папке уже есть незаконченная озвучка этой книги, она продолжается
+        restart = False
         try:
-            combined = AudioSegment.empty()
-            prev_end = 0.0
-            total_subs = len(subtitles)
-            skipped = 0
+            book.load_manifest()
+        except ValueError as e:
+            if not messagebox.askyesno("Аудиокнига", f"{e}\nНачать озвучку в этой папке заново?"):
+                return
+            restart = True
+
+        self.scheduler.submit(f"Аудиокнига {os.path.basename(input_file)}",
+                              lambda job: self._synth_audiobook_job(job, book, restart))
 
-            for idx, (start, end, text) in enumerate(subtitles):
-                print(f"[{datetime.datetime.now()}] Обработка субтитра {idx+1}/{total_subs}: {text}")
+    def _synth_audiobook_job(self, job, book, restart):
+        try:
+            manifest = book.run(restart=restart, token=job.token, progress=job.set_progress, timer=job.timer)
+            self.root.after(0, lambda f=book.output_dir: self.add_to_history(f))
+            self.root.after(0, lambda: messagebox.showinfo("Успех", f"Глав озвучено: {len(manifest['chapters'])} в {book.output_dir}"))
+        except JobCancelled:
+            raise
+        except Exception as e:
+            self.root.after(0, lambda: messagebox.showerror("Ошибка", str(e)))
 
-                silence_duration = (start - prev_end) * 1000
-                if silence_duration > 0:
-                    combined += AudioSegment.silent(duration=silence_duration)
+    def _ask_yes_no(self, title, message):
+        # Вопрос из рабочего потока: диалог показывается в потоке Tk, ответ ждём здесь
+        answered = Event()
+        answer = []
+        def ask():
+            answer.append(messagebox.askyesno(title, message))
+            answered.set()
+        self.root.after(0, ask)
+        answered.wait()
+        return answer[0]
+
+    def _synth_srt_job(self, job, subtitles, output_file, speaker_id, initial_speed, format, volume=1.0):
+        start_time = time.time()
+        timeout_asked = []
 
-                temp_wav = tempfile.mktemp(suffix=".wav")
-                try:
-                    # Попытка 1: Полная предобработка
-                    self.synth_text_to_wav(text, temp_wav, speaker_id, initial_speed)
-                except Exception as e:
-                    print(f"[{datetime.datetime.now()}] Полная предобработка failed для {text}: {traceback.format_exc()}")
-                    try:
-                        # Попытка 2: Только очистка
-                        cleaned_text = self.clean_text_only(text)
-                        self.synth.synth(cleaned_text, temp_wav, speaker_id=speaker_id)
-                    except Exception as e2:
-                        print(f"[{datetime.datetime.now()}] Пропущен субтитр: {text} из-за ошибки: {traceback.format_exc()}")
-                        skipped += 1
-                        combined += AudioSegment.silent(duration=(end - start) * 1000)
-                        prev_end = end
-                        continue
-
-                segment = AudioSegment.from_wav(temp_wav)
-                combined += segment
-                os.remove(temp_wav)
-                prev_end = start + segment.duration_seconds
-
-                progress_value = (idx + 1) / total_subs * 100
-                self.root.after(0, lambda v=progress_value: self.progress.__setitem__("value", v))
-
-                # Проверка таймаута (5 мин)
-                if time.time() - start_time > 300:
-                    def ask_timeout():
-                        if messagebox.askyesno("Таймаут", "Обработка длится >5 мин. Продолжить?") == False:
-                            raise TimeoutError("Обработка прервана пользователем")
-                    self.root.after(0, ask_timeout)
+        def on_progress(done, total):
+            job.set_progress(done, total)
 
+            # Проверка таймаута (5 мин): при отказе задача отменяется
+            if time.time() - start_time > 300 and not timeout_asked:
+                timeout_asked.append(True)
+                if not self._ask_yes_no("Таймаут", "Обработка длится >5 мин. Продолжить?"):
+                    job.cancel()
+
+        def confirm_export(skipped, total_subs):
             # Проверка на большое количество пропусков
-            def check_skipped():
-                if skipped / total_subs > 0.1 and messagebox.askyesno("Предупреждение", f"Пропущено {skipped} субтитров (>10%). Продолжить сохранение?") == False:
-                    raise ValueError("Сохранение отменено пользователем")
-            self.root.after(0, check_skipped)
-
-            # Проверка combined
-            if combined.duration_seconds == 0:
-                raise ValueError("Аудио пустое (все субтитры пропущены).")
-
-            print(f"[{datetime.datetime.now()}] Начинаю ускорение (если нужно)...")
-            srt_total_duration = subtitles[-1][1] if subtitles else 0
-            audio_duration = combined.duration_seconds
-            speed_factor = initial_speed
-            if audio_duration > srt_total_duration:
-                while speed_factor < self.max_speed_srt and audio_duration > srt_total_duration:
-                    speed_factor += 0.1
-                    combined = combined.speedup(playback_speed=speed_factor / initial_speed)
-                    audio_duration = combined.duration_seconds
-                if audio_duration > srt_total_duration:
-                    def show_warn():
-                        messagebox.showwarning("Предупреждение", f"Аудио не уложилось даже при {self.max_speed_srt}x.")
-                    self.root.after(0, show_warn)
-
-            print(f"[{datetime.datetime.now()}] Начинаю экспорт в {output_file} (формат: {format})...")
-            combined.export(output_file, format=format)
-            print(f"[{datetime.datetime.now()}] Экспорт завершён.")
+            if skipped / total_subs > 0.1:
+                return self._ask_yes_no("Предупреждение", f"Пропущено {skipped} субтитров (>10%). Продолжить сохранение?")
+            return True
+
+        try:
+            result = self.engine.synth_srt(subtitles, output_file, speaker_id, initial_speed, format, progress=on_progress,
+                                           token=job.token, confirm_export=confirm_export, timer=job.timer, gain=volume)
+            skipped = result["skipped"]
+
+            if not result["fits"]:
+                def show_warn():
+                    lines = [f"{item['index']}: +{item['overflow_seconds']} с" for item in result["overflow"][:10]]
+                    messagebox.showwarning("Предупреждение", f"Не уложились даже при {self.engine.max_speed_srt}x: {len(result['overflow'])} субтитров\n" + "\n".join(lines))
+                self.root.after(0, show_warn)
 
             self.root.after(0, lambda f=output_file: self.add_to_history(f))
-            msg = f"SRT синтезировано в: {output_file} (скорость: {speed_factor}x)"
+            msg = f"SRT синтезировано в: {output_file} (скорость: {result['speed_factor']}x)"
             if skipped > 0:
                 msg += f"\nПропущено: {skipped} (см. консоль)"
             self.root.after(0, lambda m=msg: messagebox.showinfo("Успех", m))
+        except JobCancelled:
+            raise
         except Exception as e:
             error_msg = str(e) + "\n" + traceback.format_exc()
-            print(f"[{datetime.datetime.now()}] Критическая ошибка: {error_msg}")
+            from tts_engine import log_message
+            log_message(f"Критическая ошибка: {error_msg}")
             self.root.after(0, lambda em=error_msg: messagebox.showerror("Ошибка", em + "\nПопробуйте повторить с скоростью 1.0 или проверьте FFmpeg."))
-        finally:
-            self.root.after(0, lambda: self.progress.__setitem__("value", 0))
-
-    def clean_text_only(self, text):
-        # Расширенная очистка для попытки 2
-        text = unicodedata.normalize('NFKC', text)
-        text = ''.join(c for c in text if c in string.printable or unicodedata.category(c) != 'Cc')
-        text = re.sub(r'[```math```{}KATEX_INLINE_OPENKATEX_INLINE_CLOSE]', '', text)
-        text = text.replace('–', '-').replace('—', '-').replace('−', '-')  # Замена тире
-        text = text.replace('«', '"').replace('»', '"').replace('‘', "'").replace('’', "'").replace('"', ' ').replace("'", ' ')
-        text = text.replace('…', '...')
-        text = text.replace('ё', 'е')
-        text = re.sub(r'[\r\n]+', ' ', text)
-        return text
-
-    def parse_srt(self, file_path):
-        subtitles = []
-        encodings = ['utf-8', 'cp1251', 'latin1', 'utf-16']
-        lines = None
-        for enc in encodings:
-            try:
-                with open(file_path, 'r', encoding=enc) as f:
-                    lines = f.readlines()
-                break
-            except UnicodeDecodeError:
-                continue
-        if lines is None:
-            raise ValueError("Не удалось прочитать SRT: неподдерживаемая кодировка.")
-
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            if line.isdigit():
-                i += 1
-                time_line = lines[i].strip()
-                if '-->' in time_line:
-                    start_str, end_str = time_line.split(' --> ')
-                    try:
-                        start = self.time_to_seconds(start_str)
-                        end = self.time_to_seconds(end_str)
-                    except ValueError:
-                        i += 1
-                        continue
-                    text = ""
-                    i += 1
-                    while i < len(lines) and lines[i].strip() != "":
-                        text += lines[i].strip() + " "
-                        i += 1
-                    subtitles.append((start, end, text.strip()))
-                else:
-                    i += 1
-            else:
-                i += 1
-        return subtitles
 
-    def time_to_seconds(self, time_str):
-        h, m, s_ms = time_str.split(':')
-        s, ms = s_ms.split(',')
-        return int(h)*3600 + int(m)*60 + int(s) + int(ms)/1000
+    def _foreground_jobs(self):
+        # Задачи пользователя, без фоновой подготовки образцов
+        return [job for job in self.scheduler.active() if job.priority < PRIORITY_BACKGROUND]
+
+    def _queue_previews(self):
+        # Образцы всех голосов при текущей скорости, по одной фоновой задаче на голос:
+        # задачи пользователя, поставленные позже, всё равно идут раньше
+        speed_factor = self.speed_var.get()
+        for speaker_id in self.catalog.missing(speed_factor):
+            self._submit_preview(speaker_id, speed_factor, PRIORITY_BACKGROUND)
+
+    def _submit_preview(self, speaker_id, speed_factor, priority, on_done=None):
+        key = (speaker_id, speed_factor)
+        job = self.preview_jobs.get(key)
+        if job is not None and not job.finished and (job.priority <= priority or job.status == "running"):
+            return job
+        catalog = self.catalog
+        job = self.scheduler.submit(f"Образец голоса {speaker_id}",
+                                    lambda job: catalog.render(speaker_id, speed_factor, job.token),
+                                    priority=priority, on_done=on_done)
+        self.preview_jobs[key] = job
+        return job
+
+    def _bind_speaker_preview(self):
+        # Образец звучит при выборе голоса и при наведении на строку в раскрытом списке
+        self.speaker_menu.bind("<<ComboboxSelected>>", lambda event: self.preview_speaker(self.speaker_var.get()))
+        try:
+            popdown = self.speaker_menu.tk.eval(f"ttk::combobox::PopdownWindow {self.speaker_menu}")
+        except tk.TclError:
+            return  # Старый Tk: только при выборе
+        listbox = f"{popdown}.f.l"
+        command = self.root.register(self._on_speaker_hover)
+        self.root.tk.call("bind", listbox, "<Motion>", f"+{command} [{listbox} nearest %y]")
+        self.root.tk.call("bind", listbox, "<Leave>", f"+{self.root.register(self._on_speaker_leave)}")
+
+    def _on_speaker_hover(self, index):
+        values = self.speaker_menu.cget("values")
+        index = int(index)
+        if not 0 <= index < len(values) or int(values[index]) == self.hovered_speaker:
+            return
+        self.hovered_speaker = int(values[index])
+        self.preview_speaker(self.hovered_speaker)
+
+    def _on_speaker_leave(self):
+        self.hovered_speaker = None
+
+    def preview_speaker(self, speaker_id):
+        # Готовый образец звучит сразу; если его ещё нет — синтезируется вне очереди
+        # и звучит, если голос всё ещё выбран или под курсором
+        if self.catalog is None:
+            return
+        catalog = self.catalog
+        speed_factor = self.speed_var.get()
+        pcm = catalog.get(speaker_id, speed_factor)
+        if pcm is not None:
+            self._play_preview(pcm)
+            return
+
+        def on_done(job):
+            if job.status != "done":
+                return
+
+            def play():
+                if catalog is self.catalog and speaker_id in (self.hovered_speaker, self.speaker_var.get()):
+                    self._play_preview(job.result)
+            self.root.after(0, play)
+        self._submit_preview(speaker_id, speed_factor, PRIORITY_INTERACTIVE, on_done)
+
+    def _play_preview(self, pcm):
+        from tts_player import play_preview
+        play_preview(pcm, self.volume_var.get() / 100.0)
 
     def stop_playback(self):
+        # Отмена проигрывания: синтез останавливается после текущего фрагмента
+        self.scheduler.cancel(PRIORITY_INTERACTIVE)
         if self.playing:
-            pygame.mixer.music.stop()
+            self.player.stop()
             self.playing = False
-            time.sleep(0.5)
-            if self.temp_file and os.path.exists(self.temp_file):
-                try:
-                    os.remove(self.temp_file)
-                except OSError as e:
-                    print(f"Ошибка удаления temp файла при стопе: {e}")
+
+    def cancel_all(self):
+        self.stop_playback()
+        self.scheduler.cancel()
+
+    def _poll_jobs(self):
+        # Прогресс и состояние очереди обновляются из потока Tk
+        if self.retired_dictionaries:
+            self._close_retired_dictionaries()
+        active = self._foreground_jobs()
+        running = [job for job in active if job.status == "running"]
+        if running:
+            job = max(running, key=lambda j: j.id)
+            self.progress["value"] = job.progress * 100
+        else:
+            self.progress["value"] = 0
+        if self.engine:
+            if active:
+                self.status_label.config(text=f"Задач: {len(active)} (выполняется: {len(running)}, в очереди: {len(active) - len(running)})")
+            else:
+                # После правки текста видно, сколько фрагментов последнего проигрывания взято готовыми
+                stats = self.engine.last_render_stats
+                reused = f"; проигрывание: {stats['reused']} из {stats['chunks']} фрагментов без синтеза" if stats["chunks"] else ""
+                self.status_label.config(text="Модель загружена" + reused)
+        self.root.after(100, self._poll_jobs)
 
     def add_to_history(self, file_path):
         if file_path in self.history:
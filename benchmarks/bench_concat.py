@@ -0,0 +1,73 @@
+"""Сравнение склейки аудио: AudioSegment += (старый путь) и join_pcm (PCM в памяти).
+
+Модель не нужна: каждый «фрагмент» — синусоида длиной около секунды, как
+одно короткое предложение (~80 символов текста). Печатает время и пиковую
+память (tracemalloc) для разного числа фрагментов.
+
+    python benchmarks/bench_concat.py --segments 50 200 800
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from pydub import AudioSegment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tts_audio import SAMPLE_RATE, silence, join_pcm, pcm_to_wav_bytes, wav_bytes_to_pcm  # noqa: E402
+
+CHARS_PER_SEGMENT = 80
+
+
+def make_segment(seconds=1.0):
+    t = np.arange(int(SAMPLE_RATE * seconds))
+    return (3000 * np.sin(t * 0.05)).astype(np.int16)
+
+
+def old_pipeline(count, segment_wav):
+    combined = AudioSegment.empty()
+    pause_long = AudioSegment.silent(duration=1000)
+    for i in range(count):
+        combined += AudioSegment(data=segment_wav[44:], sample_width=2, frame_rate=SAMPLE_RATE, channels=1)
+        if i < count - 1:
+            combined += pause_long
+    return len(combined.raw_data)
+
+
+def new_pipeline(count, segment_wav):
+    parts = []
+    pause_long = silence(1000)
+    for i in range(count):
+        parts.append(wav_bytes_to_pcm(segment_wav))
+        if i < count - 1:
+            parts.append(pause_long)
+    return join_pcm(parts).nbytes
+
+
+def measure(func, count, segment_wav):
+    tracemalloc.start()
+    started = time.perf_counter()
+    func(count, segment_wav)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, nargs="+", default=[50, 200, 800])
+    args = parser.parse_args()
+
+    segment_wav = pcm_to_wav_bytes(make_segment())
+    print(f"{'фрагм.':>7} {'символов':>9} {'старый, с':>10} {'старый, МБ':>11} {'новый, с':>9} {'новый, МБ':>10}")
+    for count in args.segments:
+        old_time, old_peak = measure(old_pipeline, count, segment_wav)
+        new_time, new_peak = measure(new_pipeline, count, segment_wav)
+        print(f"{count:>7} {count * CHARS_PER_SEGMENT:>9} {old_time:>10.3f} {old_peak / 2**20:>11.1f} {new_time:>9.3f} {new_peak / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Словарь произношения: текстовый файл и регулярка против скомпилированного словаря.
+
+Словарь из случайных слов разной длины пишется в текстовый файл. Для
+каждого размера печатаются: разбор текста в dict и сборка DictionaryMatcher
+(как было при каждом запуске), компиляция tts_dictionary (один раз после
+правки), открытие готового файла (каждый запуск), поиск по префиксу для
+редактора и замена в тексте. Замена сверяется с DictionaryMatcher, пока
+регулярку ещё можно собрать за разумное время (--regex-max).
+
+    python benchmarks/bench_dictionary.py --dict-sizes 10000 100000 500000 --text-kb 100
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tts_dictionary import compile_dictionary, open_dictionary, parse_dictionary, format_entry  # noqa: E402
+from tts_normalizer import DictionaryMatcher  # noqa: E402
+
+LETTERS = "абвгдежзийклмнопрстуфхцчшщыэюя"
+
+
+def make_dictionary(size, rng):
+    keys = set()
+    while len(keys) < size:
+        keys.add("".join(rng.choice(LETTERS) for _ in range(rng.randint(3, 14))))
+    return {key: key.upper() for key in keys}
+
+
+def make_text(size_kb, keys, rng):
+    words = []
+    length = 0
+    while length < size_kb * 1024:
+        word = rng.choice(keys) if rng.random() < 0.3 else "".join(rng.choice(LETTERS) for _ in range(rng.randint(2, 9)))
+        words.append(word)
+        length += len(word.encode("utf-8")) + 1
+    return " ".join(words)
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dict-sizes", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--text-kb", type=int, default=100)
+    parser.add_argument("--regex-max", type=int, default=100000, help="Больше записей регулярку не собирать")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"{'словарь':>8} {'файл, МБ':>9} {'разбор, с':>10} {'регулярка, с':>13} {'компиляция, с':>14} "
+              f"{'открытие, мс':>13} {'поиск, мс':>10} {'замена рег., с':>15} {'замена, с':>10}")
+        for size in args.dict_sizes:
+            dictionary = make_dictionary(size, rng)
+            source = os.path.join(workdir, f"dict{size}.txt")
+            with open(source, "w", encoding="utf-8") as f:
+                f.writelines(format_entry(key, value) for key, value in dictionary.items())
+            text = make_text(args.text_kb, list(dictionary)[:1000], rng)
+
+            parse_time, parsed = timed(parse_dictionary, source)
+            compile_time, _ = timed(compile_dictionary, source, os.path.join(workdir, "tmp.dic"))
+            compiled_dir = os.path.join(workdir, "compiled")
+            open_dictionary(source, compiled_dir).close()
+            open_time, compiled = timed(open_dictionary, source, compiled_dir)
+            search_time, _ = timed(compiled.search, "мир")
+            replace_time, actual = timed(compiled.replace, text)
+
+            regex_time = regex_replace_time = float("nan")
+            if size <= args.regex_max:
+                regex_time, matcher = timed(DictionaryMatcher, parsed)
+                regex_replace_time, expected = timed(matcher.replace, text)
+                assert expected == actual, "замена расходится с DictionaryMatcher"
+            compiled.close()
+            print(f"{size:>8} {os.path.getsize(source) / 2 ** 20:>9.1f} {parse_time:>10.3f} {regex_time:>13.3f} "
+                  f"{compile_time:>14.3f} {open_time * 1000:>13.2f} {search_time * 1000:>10.3f} "
+                  f"{regex_replace_time:>15.3f} {replace_time:>10.3f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
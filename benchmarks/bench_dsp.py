@@ -0,0 +1,90 @@
+"""Темп, частота и громкость: прежний путь через pydub против tts_dsp.process.
+
+Вход — гармонический сигнал с основным тоном 180 Гц (похоже на голос) нужной
+длины. Для каждого коэффициента печатаются время, отклонение длины от
+ожидаемой и основной тон результата: WSOLA должен сохранять 180 Гц и при
+замедлении, а прежнее замедление через frame_rate тон понижало. В конце —
+обрезка тишины и выравнивание громкости фрагментов (tts_dsp.condition).
+
+    python benchmarks/bench_dsp.py --seconds 60 --factors 0.8 1.2 1.4 1.8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tts_audio import SAMPLE_RATE, pcm_to_segment, segment_to_pcm  # noqa: E402
+from tts_dsp import process, condition, to_int16  # noqa: E402
+
+PITCH = 180.0
+
+
+def make_voice(seconds):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    signal = (0.3 * np.sin(2 * np.pi * PITCH * t) + 0.2 * np.sin(4 * np.pi * PITCH * t)) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    return to_int16(signal.astype(np.float32))
+
+
+def pitch(pcm, rate=SAMPLE_RATE):
+    n = min(len(pcm), rate * 4)
+    spectrum = np.abs(np.fft.rfft(pcm[:n].astype(np.float64) * np.hanning(n)))
+    return round(float(np.argmax(spectrum)) * rate / n, 1)
+
+
+def legacy(pcm, factor, gain, rate):
+    # Как было: speedup pydub для ускорения, frame_rate для замедления, затем частота и громкость
+    segment = pcm_to_segment(pcm)
+    if factor > 1:
+        segment = segment.speedup(playback_speed=factor)
+    elif factor < 1:
+        segment = segment._spawn(segment.raw_data, overrides={"frame_rate": int(segment.frame_rate * factor)})
+        segment = segment.set_frame_rate(SAMPLE_RATE)
+    if rate != SAMPLE_RATE:
+        segment = segment.set_frame_rate(rate)
+    if gain != 1.0:
+        segment = segment.apply_gain(20 * np.log10(gain))
+    return np.frombuffer(segment.raw_data, dtype=np.int16) if rate != SAMPLE_RATE else segment_to_pcm(segment)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--factors", type=float, nargs="+", default=[0.8, 1.2, 1.4, 1.8])
+    parser.add_argument("--gain", type=float, default=0.7, help="Громкость (как ползунок GUI)")
+    parser.add_argument("--rate", type=int, default=44100, help="Частота микшера для проигрывания")
+    args = parser.parse_args()
+
+    pcm = make_voice(args.seconds)
+    print(f"Вход: {args.seconds} с, тон {pitch(pcm)} Гц")
+    print(f"{'режим':>22} {'pydub, с':>9} {'numpy, с':>9} {'длина pydub':>12} {'длина numpy':>12} {'тон pydub':>10} {'тон numpy':>10}")
+    cases = [(f"темп {factor}", factor, 1.0, SAMPLE_RATE) for factor in args.factors]
+    cases.append((f"{args.rate} Гц, громк. {args.gain}", 1.0, args.gain, args.rate))
+    for name, factor, gain, rate in cases:
+        started = time.perf_counter()
+        old = legacy(pcm, factor, gain, rate)
+        old_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        new = process(pcm, speed=factor, gain=gain, dst_rate=rate)
+        new_time = time.perf_counter() - started
+
+        expected = len(pcm) / factor * rate / SAMPLE_RATE
+        print(f"{name:>22} {old_time:>9.3f} {new_time:>9.3f} {len(old) / expected - 1:>+12.2%} {len(new) / expected - 1:>+12.2%} "
+              f"{pitch(old, rate):>10} {pitch(new, rate):>10}")
+
+    # Фрагменты по 3 с речи с тишиной 0.2 с по краям, как у модели
+    pad = np.zeros(int(SAMPLE_RATE * 0.2), dtype=np.int16)
+    segments = [np.concatenate([pad, part, pad]) for part in np.array_split(pcm, max(1, int(args.seconds // 3)))]
+    started = time.perf_counter()
+    trimmed = [condition(segment) for segment in segments]
+    seconds = time.perf_counter() - started
+    before = sum(len(segment) for segment in segments) / SAMPLE_RATE
+    after = sum(len(segment) for segment in trimmed) / SAMPLE_RATE
+    print(f"Обрезка тишины и громкость: {len(segments)} фрагментов за {seconds:.3f} с, {before:.1f} с -> {after:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
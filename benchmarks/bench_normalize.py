@@ -0,0 +1,124 @@
+"""Предобработка текста: прежняя цепочка replace/re.sub против TextNormalizer.
+
+Сначала на корпусе проверяется, что результат совпадает с прежней функцией
+там, где она однозначна (ключи словаря не входят друг в друга и в значения).
+Прежняя функция воспроизведена ниже как есть, кроме класса скобок: в исходнике
+он был испорчен и удалял латинские буквы вместо скобок.
+
+    python benchmarks/bench_normalize.py --dict-sizes 100 1000 10000 --text-kb 100
+"""
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+import unicodedata
+
+from num2words import num2words
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tts_normalizer import TextNormalizer, get_fraction_word  # noqa: E402
+
+CORPUS = [
+    "Привет, мир! Это «тест» — проверка… 123 и 50 % и 3,14 и 1/2.",
+    "Ёжик в тумане (фильм 1975 года) [реж. Норштейн] {заметка}.",
+    "Python и Linux: версия 3.11, цена 100 руб. за штуку\r\nНовая строка\n\nЕщё одна.",
+    "‘Одинарные’ и \"двойные\" кавычки, тире – и − минус.",
+    "Управляющие\x07символы\x1b и таб\tостаются.",
+    "XML, JSON, HTTP/2 и 10/3 процента, 7% скидка, 0.5 литра.",
+]
+
+
+def legacy_apply(text, pronunciation_dict):
+    text = unicodedata.normalize('NFKC', text)
+    text = ''.join(c for c in text if c in string.printable or unicodedata.category(c) != 'Cc')
+    text = re.sub(r'[\[\]{}()]', '', text)
+    text = text.replace('–', '-').replace('—', '-').replace('−', '-')
+    text = text.replace('«', '"').replace('»', '"').replace('‘', "'").replace('’', "'").replace('"', ' ').replace("'", ' ')
+    text = text.replace('…', '...')
+    text = text.replace('ё', 'е')
+    text = re.sub(r'[\r\n]+', ' ', text)
+    translit_map = {
+        'a': 'а', 'b': 'б', 'c': 'к', 'd': 'д', 'e': 'е', 'f': 'ф', 'g': 'г', 'h': 'х', 'i': 'и', 'j': 'й',
+        'k': 'к', 'l': 'л', 'm': 'м', 'n': 'н', 'o': 'о', 'p': 'п', 'q': 'к', 'r': 'р', 's': 'с', 't': 'т',
+        'u': 'у', 'v': 'в', 'w': 'в', 'x': 'кс', 'y': 'й', 'z': 'з',
+        'A': 'А', 'B': 'Б', 'C': 'К', 'D': 'Д', 'E': 'Е', 'F': 'Ф', 'G': 'Г', 'H': 'Х', 'I': 'И', 'J': 'Й',
+        'K': 'К', 'L': 'Л', 'M': 'М', 'N': 'Н', 'O': 'О', 'P': 'П', 'Q': 'К', 'R': 'Р', 'S': 'С', 'T': 'Т',
+        'U': 'У', 'V': 'В', 'W': 'В', 'X': 'Кс', 'Y': 'Й', 'Z': 'З'
+    }
+    text = re.sub(r'[a-zA-Z]+', lambda m: ''.join(translit_map.get(c, c) for c in m.group(0)), text)
+    text = re.sub(r'(\d+)/(\d+)', lambda m: f"{num2words(int(m.group(1)), lang='ru')} {num2words(int(m.group(2)), lang='ru', to='ordinal')}", text)
+    text = re.sub(r'(\d+)\s*%', lambda m: f"{num2words(int(m.group(1)), lang='ru')} процентов", text)
+    text = re.sub(r'(\d+)[.,](\d+)', lambda m: f"{num2words(int(m.group(1)), lang='ru')} целых {num2words(int(m.group(2)), lang='ru')} {get_fraction_word(len(m.group(2)))}", text)
+    text = re.sub(r'\b(\d+)\b', lambda m: num2words(int(m.group(1)), lang='ru'), text)
+    text = re.sub(r'(\d+) руб\.', lambda m: f"{num2words(int(m.group(1)), lang='ru')} рублей", text)
+    for key, value in pronunciation_dict.items():
+        text = text.replace(key, value)
+    return text
+
+
+def make_dictionary(size, rng):
+    # Однозначный словарь: ключи одной длины (не входят друг в друга), значения — заглавными
+    letters = "абвгдежзиклмнопрстуфхцчшщэюя"
+    keys = set()
+    while len(keys) < size:
+        keys.add("".join(rng.choice(letters) for _ in range(7)))
+    return {key: key.upper() for key in sorted(keys)}
+
+
+def make_text(size_kb, dictionary, rng):
+    keys = list(dictionary)
+    words = []
+    length = 0
+    while length < size_kb * 1024:
+        word = rng.choice(keys) if rng.random() < 0.2 else rng.choice(CORPUS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def check_corpus(rng):
+    dictionary = make_dictionary(500, rng)
+    normalizer = TextNormalizer(dictionary)
+    samples = CORPUS + [make_text(4, dictionary, rng) for _ in range(5)]
+    for sample in samples:
+        expected = legacy_apply(sample, dictionary)
+        actual = normalizer.normalize(sample)
+        if expected != actual:
+            raise SystemExit(f"Расхождение:\n{sample!r}\nпрежняя: {expected!r}\nновая:   {actual!r}")
+    print(f"Корпус: {len(samples)} текстов, результат совпадает")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dict-sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--text-kb", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    check_corpus(rng)
+    print(f"{'словарь':>8} {'текст, КБ':>10} {'прежняя, с':>11} {'сборка, с':>10} {'новая, с':>9}")
+    for size in args.dict_sizes:
+        dictionary = make_dictionary(size, rng)
+        text = make_text(args.text_kb, dictionary, rng)
+
+        started = time.perf_counter()
+        expected = legacy_apply(text, dictionary)
+        legacy_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        normalizer = TextNormalizer(dictionary)
+        build_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        actual = normalizer.normalize(text)
+        new_time = time.perf_counter() - started
+
+        assert expected == actual
+        print(f"{size:>8} {args.text_kb:>10} {legacy_time:>11.3f} {build_time:>10.3f} {new_time:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Бенчмарк всего конвейера синтеза на детерминированном фейковом синтезаторе.
+
+Этапы на тексте заданных размеров (по умолчанию 1 КБ, 100 КБ, 10 МБ):
+предобработка, разбиение на фрагменты, синтез со склейкой в память (до
+1 МБ) и потоковый экспорт в файл; синтез одного текста в 1 и N потоков
+(модель имитируется задержкой, результат должен совпадать побайтно).
+Отдельно: ускорение аудио (speedup),
+разбор SRT и сборка SRT из N субтитров (по умолчанию 10 000), экспорт в
+MP3, если есть ffmpeg. С --real вместо фейка используется модель vosk-tts
+и меряется real-time factor для каждого чтеца.
+
+Результат — одна JSON-строка; с --output она дописывается в файл, чтобы
+сравнивать запуски между версиями:
+
+    python benchmarks/bench_pipeline.py --output pipeline.jsonl
+    python benchmarks/bench_pipeline.py --sizes-kb 1 100 --cues 1000
+    python benchmarks/bench_pipeline.py --real --speakers 0 1 2 3 4
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tts_engine import TTSEngine  # noqa: E402
+from tts_config import add_model_arguments, config_from_args, engine_options  # noqa: E402
+from tts_cache import SegmentCache  # noqa: E402
+from tts_audio import SAMPLE_RATE, StreamWriter, speedup_pcm, duration_seconds  # noqa: E402
+from fake_synth import FakeSynth  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SENTENCES = [
+    "Привет, мир! Это «тест» — проверка… 123 и 50 % и 3,14 и 1/2.",
+    "Ёжик в тумане (фильм 1975 года) [реж. Норштейн].",
+    "Python и Linux: версия 3.11, цена 100 руб. за штуку.",
+    "Длинное спокойное предложение без чисел и латиницы, как в обычной книге.",
+    "Вопрос? Ответ! И ещё одно короткое предложение.",
+]
+REAL_PHRASE = "Съешь же ещё этих мягких французских булок, да выпей чаю. В 1961 году человек впервые полетел в космос."
+SRT_MS_PER_CHAR = 10  # Для SRT — темп, близкий к речи, чтобы реплики приходилось ускорять
+LATENCY_MS_PER_CHAR = 0.1  # Имитация времени модели при замере потоков синтеза текста
+MAX_PCM_KB = 1024  # Больше этого синтез в память не меряется: только потоковый экспорт
+
+
+def make_text(size_kb, rng):
+    parts = []
+    size = 0
+    while size < size_kb * 1024:
+        sentence = rng.choice(SENTENCES)
+        parts.append(sentence)
+        size += len(sentence.encode("utf-8")) + 1
+        if rng.random() < 0.1:
+            parts.append("\n")
+    return " ".join(parts)
+
+
+def make_subtitles(count, ms_per_char, rng):
+    subtitles = []
+    t = 0.0
+    for _ in range(count):
+        text = rng.choice(SENTENCES)
+        duration = len(text) * ms_per_char / 1000 * rng.uniform(1.0, 1.4)  # Иногда не помещается — нужна подгонка
+        subtitles.append((round(t, 3), round(t + duration, 3), text))
+        t += duration + rng.uniform(0.0, 0.5)
+    return subtitles
+
+
+def write_srt(file_path, subtitles):
+    def fmt(seconds):
+        ms = int(round(seconds * 1000))
+        return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+    with open(file_path, "w", encoding="utf-8") as f:
+        for i, (start, end, text) in enumerate(subtitles, 1):
+            f.write(f"{i}\n{fmt(start)} --> {fmt(end)}\n{text}\n\n")
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def record(results, stage, seconds, **extra):
+    item = {"stage": stage, "seconds": round(seconds, 4)}
+    item.update(extra)
+    results.append(item)
+    print(json.dumps(item, ensure_ascii=False), file=sys.stderr)
+
+
+def bench_text(engine, size_kb, tmp, rng, results):
+    text = make_text(size_kb, rng)
+    seconds, normalized = timed(engine.apply_dictionary_and_numbers, text)
+    record(results, "normalize", seconds, size_kb=size_kb, mb_per_s=round(size_kb / 1024 / seconds, 3))
+    seconds, chunks = timed(engine.split_chunks, normalized)
+    record(results, "chunk", seconds, size_kb=size_kb, chunks=len(chunks))
+    if size_kb <= MAX_PCM_KB:
+        seconds, pcm = timed(engine.synth_text_to_pcm, text, 0)
+        record(results, "synth_to_pcm", seconds, size_kb=size_kb, audio_s=round(duration_seconds(pcm), 1))
+    output_file = os.path.join(tmp, "text.wav")
+    seconds, _ = timed(engine.synth_text_to_file, text, output_file, 0)
+    record(results, "synth_to_wav", seconds, size_kb=size_kb, file_mb=round(os.path.getsize(output_file) / 2 ** 20, 1))
+    os.remove(output_file)
+
+
+def bench_text_workers(engine, size_kb, workers, rng, results):
+    # Один документ в разное число потоков: время и совпадение результата с однопоточным
+    synth = engine.synth
+    engine.synth = FakeSynth(2, latency_ms_per_char=LATENCY_MS_PER_CHAR)
+    text = make_text(size_kb, rng)
+    baseline = None
+    try:
+        for n in workers:
+            seconds, pcm = timed(engine.synth_text_to_pcm, text, 0, workers=n)
+            digest = hashlib.md5(pcm.tobytes()).hexdigest()
+            baseline = baseline or digest
+            record(results, "synth_text_workers", seconds, size_kb=size_kb, workers=n, identical=digest == baseline)
+    finally:
+        engine.synth = synth
+
+
+def bench_audio(tmp, results):
+    pcm = FakeSynth().synth_audio("а" * 6000)  # Около минуты аудио
+    audio_s = round(duration_seconds(pcm), 1)
+    for factor in (1.2, 1.4):
+        seconds, _ = timed(speedup_pcm, pcm, factor)
+        record(results, "stretch", seconds, audio_s=audio_s, factor=factor)
+    if shutil.which("ffmpeg"):
+        output_file = os.path.join(tmp, "export.mp3")
+
+        def export():
+            with StreamWriter(output_file, "mp3") as writer:
+                writer.write(pcm)
+        seconds, _ = timed(export)
+        record(results, "export_mp3", seconds, audio_s=audio_s)
+        os.remove(output_file)
+
+
+def bench_srt(engine, count, workers, tmp, rng, results):
+    engine.synth = FakeSynth(SRT_MS_PER_CHAR)
+    subtitles = make_subtitles(count, SRT_MS_PER_CHAR, rng)
+    srt_file = os.path.join(tmp, "subs.srt")
+    write_srt(srt_file, subtitles)
+    seconds, parsed = timed(engine.parse_srt, srt_file)
+    record(results, "parse_srt", seconds, cues=len(parsed))
+    output_file = os.path.join(tmp, "subs.wav")
+    for n in workers:
+        seconds, report = timed(engine.synth_srt, parsed, output_file, 0, log=lambda message: None, workers=n)
+        record(results, "synth_srt", seconds, cues=len(parsed), workers=n, stretched=report["stretched"],
+               overflow=len(report["overflow"]), audio_s=report["duration"])
+        os.remove(output_file)
+
+
+def bench_real(options, speakers, repeats, results):
+    engine = TTSEngine(dict_file=None, cache=SegmentCache(enabled=False), **options)
+    text = engine.apply_dictionary_and_numbers(REAL_PHRASE)
+    engine.synth_raw(text, speakers[0])  # Прогрев
+    for speaker_id in speakers:
+        total = 0.0
+        audio = 0.0
+        for _ in range(repeats):
+            seconds, pcm = timed(engine.synth_raw, text, speaker_id)
+            total += seconds
+            audio += duration_seconds(pcm)
+        record(results, "real_synth", total, speaker=speaker_id, audio_s=round(audio, 2), rtf=round(total / audio, 4))
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[1, 100, 10240])
+    parser.add_argument("--cues", type=int, default=10000, help="Субтитров в SRT (0 — не мерить)")
+    parser.add_argument("--srt-workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--text-workers", type=int, nargs="+", default=[1, os.cpu_count() or 1],
+                        help="Потоков синтеза одного текста (замер на 100 КБ)")
+    parser.add_argument("--ms-per-char", type=float, default=2,
+                        help="Длина фейкового аудио на символ, мс (10 МБ текста при 2 мс — около 0.5 ГБ WAV)")
+    parser.add_argument("--real", action="store_true", help="Мерить настоящую модель vosk-tts (RTF по чтецам)")
+    add_model_arguments(parser)
+    parser.add_argument("--speakers", type=int, nargs="+", default=[0, 1, 2, 3, 4])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Дописать результат JSON-строкой в этот файл")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    results = []
+    options = engine_options(config_from_args(args)) if args.real else {}
+    if args.real:
+        bench_real(options, args.speakers, args.repeats, results)
+    else:
+        engine = TTSEngine(dict_file=None, synth=FakeSynth(args.ms_per_char), cache=SegmentCache(enabled=False))
+        engine.text_workers = 1  # Накладные расходы конвейера меряются в один поток
+        engine.set_dictionary({"Linux": "Линукс", "Python": "Пайтон", "тест": "тэст"})
+        engine.apply_dictionary_and_numbers(SENTENCES[0])  # Прогрев: импорт num2words не входит в замеры
+        tmp = tempfile.mkdtemp(prefix="vosk-bench-")
+        try:
+            for size_kb in args.sizes_kb:
+                bench_text(engine, size_kb, tmp, rng, results)
+            bench_text_workers(engine, 100, sorted(set(args.text_workers)), rng, results)
+            bench_audio(tmp, results)
+            if args.cues:
+                bench_srt(engine, args.cues, sorted(set(args.srt_workers)), tmp, rng, results)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    line = json.dumps({
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "synth": "vosk-tts" if args.real else f"fake:{args.ms_per_char}ms/char, srt:{SRT_MS_PER_CHAR}ms/char",
+        "model_options": options,
+        "sample_rate": SAMPLE_RATE,
+        "results": results,
+    }, ensure_ascii=False)
+    print(line)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Время запуска: импорт модулей и GUI до окна и до готовности модели.
+
+Каждый модуль импортируется в отдельном процессе. GUI запускается с
+VOSK_TTS_STARTUP_REPORT и сам закрывается после загрузки модели (нужен
+дисплей). Результат — одна JSON-строка, которую удобно дописывать в файл
+и сравнивать между версиями:
+
+    python benchmarks/bench_startup.py --output startup.jsonl
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["tkinter", "numpy", "pydub", "pygame", "num2words", "vosk_tts", "tts_engine"]
+
+
+def import_time(module):
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return round(float(result.stdout.strip().splitlines()[-1]), 3)
+
+
+def gui_startup(timeout):
+    fd, report_file = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    env = dict(os.environ, VOSK_TTS_STARTUP_REPORT=report_file, VOSK_TTS_STARTUP_EXIT="1")
+    started = time.perf_counter()
+    try:
+        subprocess.run([sys.executable, os.path.join(ROOT, "Vosk-TTS-GUI.py")], cwd=ROOT, env=env, timeout=timeout,
+                       capture_output=True)
+        total = time.perf_counter() - started
+        with open(report_file, encoding="utf-8") as f:
+            content = f.read()
+        if not content:
+            return None
+        report = json.loads(content)
+        report["process_s"] = round(total, 3)
+        return report
+    except (subprocess.TimeoutExpired, OSError, ValueError):
+        return None
+    finally:
+        os.remove(report_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="Дописать результат JSON-строкой в этот файл")
+    parser.add_argument("--no-gui", action="store_true", help="Только время импорта модулей")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    result = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "imports_s": {module: import_time(module) for module in MODULES},
+    }
+    if not args.no_gui:
+        result["gui"] = gui_startup(args.timeout)
+
+    line = json.dumps(result, ensure_ascii=False)
+    print(line)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main()
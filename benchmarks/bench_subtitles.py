@@ -0,0 +1,167 @@
+"""Разбор субтитров: прежний parse_srt против потокового tts_subtitles.
+
+Пишутся файлы на --cues субтитров: SRT в UTF-8 с BOM, SRT в cp1251 (прежний
+код сначала пробовал UTF-8 и читал файл дважды), WebVTT и ASS. Для каждого
+печатаются время и пиковая память разбора (tracemalloc), число субтитров;
+у нового — память parse_subtitles (список всех субтитров, как в приложении)
+и iter_subtitles при обработке по одному, без общего списка.
+Прежний parse_srt воспроизведён ниже как есть; WebVTT и ASS он не понимает.
+Затем — файл с типичными ошибками (точка вместо запятой, нет пустых строк,
+номер в конце файла), для нового разбора — найденные проблемы со строками.
+
+    python benchmarks/bench_subtitles.py --cues 100000
+"""
+import argparse
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tts_subtitles import open_subtitles, iter_subtitles, parse_subtitles  # noqa: E402
+
+PHRASES = ["Привет, как дела?", "Это очень длинная реплика, которую нужно произнести целиком.",
+           "Да.", "Ёлки-палки, опять субтитры!", "<i>Курсив</i> и обычный текст"]
+
+
+def legacy_time_to_seconds(time_str):
+    h, m, s_ms = time_str.split(':')
+    s, ms = s_ms.split(',')
+    return int(h)*3600 + int(m)*60 + int(s) + int(ms)/1000
+
+
+def legacy_parse_srt(file_path):
+    encodings = ['utf-8', 'cp1251', 'latin1', 'utf-16']
+    lines = None
+    for enc in encodings:
+        try:
+            with open(file_path, 'r', encoding=enc) as f:
+                lines = f.readlines()
+            break
+        except UnicodeDecodeError:
+            continue
+    if lines is None:
+        raise ValueError("Не удалось прочитать SRT: неподдерживаемая кодировка.")
+    subtitles = []
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if line.isdigit():
+            i += 1
+            time_line = lines[i].strip()
+            if '-->' in time_line:
+                start_str, end_str = time_line.split(' --> ')
+                try:
+                    start = legacy_time_to_seconds(start_str)
+                    end = legacy_time_to_seconds(end_str)
+                except ValueError:
+                    i += 1
+                    continue
+                text = ""
+                i += 1
+                while i < len(lines) and lines[i].strip() != "":
+                    text += lines[i].strip() + " "
+                    i += 1
+                subtitles.append((start, end, text.strip()))
+            else:
+                i += 1
+        else:
+            i += 1
+    return subtitles
+
+
+def new_parse(file_path):
+    problems = []
+    return parse_subtitles(file_path, problems), problems
+
+
+def count_cues(file_path):
+    with open_subtitles(file_path) as f:
+        return sum(1 for _ in iter_subtitles(f))
+
+
+def stamp(seconds, separator, digits=3):
+    # 01:02:03,456 для SRT и WebVTT, 1:02:03.45 для ASS (digits=2)
+    h, rest = divmod(seconds, 3600)
+    m, s = divmod(rest, 60)
+    whole = int(s)
+    fraction = int(round((s - whole) * 10 ** digits))
+    return f"{int(h):0{digits - 1}}:{int(m):02}:{whole:02}{separator}{fraction:0{digits}}"
+
+
+def write_files(workdir, count):
+    files = {}
+    cues = [(i * 2.0, i * 2.0 + 1.5, PHRASES[i % len(PHRASES)]) for i in range(count)]
+    srt = "".join(f"{i + 1}\n{stamp(start, ',')} --> {stamp(end, ',')}\n{text}\nвторая строка\n\n"
+                  for i, (start, end, text) in enumerate(cues))
+    files["SRT UTF-8 BOM"] = (os.path.join(workdir, "bom.srt"), codecs.BOM_UTF8 + srt.encode("utf-8"))
+    files["SRT cp1251"] = (os.path.join(workdir, "cp1251.srt"), srt.encode("cp1251"))
+    vtt = "WEBVTT\n\n" + "".join(f"{stamp(start, '.')} --> {stamp(end, '.')} align:start\n<v Анна>{text}</v>\n\n"
+                                 for start, end, text in cues)
+    files["WebVTT"] = (os.path.join(workdir, "subs.vtt"), vtt.encode("utf-8"))
+    ass = ("[Script Info]\nScriptType: v4.00+\n\n[Events]\n"
+           "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n" +
+           "".join(f"Dialogue: 0,{stamp(start, '.', 2)},{stamp(end, '.', 2)},Default,,0,0,0,,{{\\i1}}{text}\\Nвторая\n"
+                   for start, end, text in cues))
+    files["ASS"] = (os.path.join(workdir, "subs.ass"), ass.encode("utf-8"))
+    for file_path, data in files.values():
+        with open(file_path, "wb") as f:
+            f.write(data)
+    return {name: file_path for name, (file_path, _) in files.items()}
+
+
+def measure(function, *args):
+    # Время — отдельным запуском: под tracemalloc всё медленнее в несколько раз
+    started = time.perf_counter()
+    try:
+        result = function(*args)
+    except Exception as e:
+        result = e
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    try:
+        function(*args)
+    except Exception:
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cues", type=int, default=100000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        files = write_files(workdir, args.cues)
+        print(f"{'файл':>14} {'МБ':>6} {'прежний, с':>11} {'память, МБ':>11} {'субтитров':>10} "
+              f"{'новый, с':>9} {'список, МБ':>11} {'по одному, МБ':>14} {'субтитров':>10}")
+        for name, file_path in files.items():
+            old_time, old_peak, old = measure(legacy_parse_srt, file_path)
+            new_time, new_peak, (new, problems) = measure(new_parse, file_path)
+            old_count = len(old) if isinstance(old, list) else type(old).__name__
+            _, stream_peak, _ = measure(count_cues, file_path)
+            print(f"{name:>14} {os.path.getsize(file_path) / 2 ** 20:>6.1f} {old_time:>11.3f} {old_peak / 2 ** 20:>11.1f} "
+                  f"{old_count:>10} {new_time:>9.3f} {new_peak / 2 ** 20:>11.1f} {stream_peak / 2 ** 20:>14.1f} {len(new):>10}")
+
+        broken = os.path.join(workdir, "broken.srt")
+        with open(broken, "w", encoding="utf-8") as f:
+            f.write("1\n00:00:01.000 --> 00:00:02.000\nТочка вместо запятой\n2\n00:00:03,000 --> 00:00:04,000\n"
+                    "Нет пустой строки\n\n3\n00:00:05,000 --> 00:00:04,000\nКонец раньше начала\n\n4\n")
+        _, _, old = measure(legacy_parse_srt, broken)
+        new, problems = new_parse(broken)
+        print(f"\nС ошибками: прежний — {old if isinstance(old, list) else type(old).__name__}")
+        print(f"новый — {new}")
+        for line, message in problems:
+            print(f"  строка {line}: {message}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Детерминированная замена vosk_tts.Synth для бенчмарков без модели.
+
+Длина аудио пропорциональна длине текста, тон и громкость зависят от текста
+и чтеца, так что одинаковый вход всегда даёт одинаковые байты. Как и настоящая
+модель, по краям речи оставляет тишину (pad_ms). latency_ms_per_char
+имитирует время работы модели (ожидание без GIL, как у onnxruntime).
+"""
+import time
+import wave
+import zlib
+
+import numpy as np
+
+SAMPLE_RATE = 22050
+
+
+class FakeSynth:
+    def __init__(self, ms_per_char=10, rate=SAMPLE_RATE, pad_ms=150, latency_ms_per_char=0):
+        self.samples_per_char = max(1, int(rate * ms_per_char / 1000))
+        self.latency = latency_ms_per_char / 1000
+        self.pad = np.zeros(int(rate * pad_ms / 1000), dtype=np.int16)
+        self.rate = rate
+
+    def synth_audio(self, text, speaker_id=0):
+        if self.latency:
+            time.sleep(self.latency * len(text))
+        n = self.samples_per_char * max(1, len(text))
+        seed = zlib.crc32(f"{text}|{speaker_id}".encode("utf-8"))
+        t = np.arange(n, dtype=np.float32)
+        amplitude = 1500 + seed % 3000
+        speech = (amplitude * np.sin(t * (0.02 + (seed % 50) / 1000.0))).astype(np.int16)
+        return np.concatenate([self.pad, speech, self.pad])
+
+    def synth(self, text, oname, speaker_id=0):
+        with wave.open(oname, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.rate)
+            w.writeframes(self.synth_audio(text, speaker_id).tobytes())
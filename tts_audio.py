@@ -0,0 +1,251 @@
+import io
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 22050  # Частота модели vosk-tts, в ней собирается всё аудио
+
+
+def silence(duration_ms, rate=SAMPLE_RATE):
+    return np.zeros(int(rate * duration_ms / 1000), dtype=np.int16)
+
+
+def duration_seconds(pcm, rate=SAMPLE_RATE):
+    return len(pcm) / rate
+
+
+def wav_bytes_to_pcm(data):
+    # WAV (mono или stereo, 16 бит) -> int16 mono в SAMPLE_RATE
+    with wave.open(io.BytesIO(data), "rb") as w:
+        rate = w.getframerate()
+        channels = w.getnchannels()
+        sample_width = w.getsampwidth()
+        frames = w.readframes(w.getnframes())
+    if sample_width == 2 and (channels != 1 or rate != SAMPLE_RATE):
+        from tts_dsp import process
+        pcm = np.frombuffer(frames, dtype=np.int16)
+        if channels > 1:
+            pcm = pcm.reshape(-1, channels).mean(axis=1)
+        return process(pcm, src_rate=rate, dst_rate=SAMPLE_RATE) if rate != SAMPLE_RATE else pcm.astype(np.int16)
+    if sample_width != 2:
+        from pydub import AudioSegment  # Редкие разрядности (8, 24, 32 бит)
+        segment = AudioSegment(data=frames, sample_width=sample_width, frame_rate=rate, channels=channels)
+        segment = segment.set_sample_width(2).set_channels(1).set_frame_rate(SAMPLE_RATE)
+        frames = segment.raw_data
+    return np.frombuffer(frames, dtype=np.int16).copy()
+
+
+def read_wav(file_path):
+    with open(file_path, "rb") as f:
+        return wav_bytes_to_pcm(f.read())
+
+
+def pcm_to_wav_bytes(pcm, rate=SAMPLE_RATE):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.ascontiguousarray(pcm, dtype=np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def pcm_to_segment(pcm, rate=SAMPLE_RATE):
+    from pydub import AudioSegment  # Для смены частоты и кодирования в MP3; импорт при первом использовании
+    return AudioSegment(data=np.ascontiguousarray(pcm, dtype=np.int16).tobytes(), sample_width=2, frame_rate=rate, channels=1)
+
+
+def segment_to_pcm(segment):
+    if segment.sample_width != 2 or segment.channels != 1 or segment.frame_rate != SAMPLE_RATE:
+        segment = segment.set_sample_width(2).set_channels(1).set_frame_rate(SAMPLE_RATE)
+    return np.frombuffer(segment.raw_data, dtype=np.int16).copy()
+
+
+def join_pcm(parts):
+    # Склейка за один проход: буфер выделяется один раз под итоговую длину
+    total = sum(len(part) for part in parts)
+    combined = np.empty(total, dtype=np.int16)
+    pos = 0
+    for part in parts:
+        combined[pos:pos + len(part)] = part
+        pos += len(part)
+    return combined
+
+
+def speedup_pcm(pcm, factor):
+    # Ускорение без смены высоты тона (WSOLA, см. tts_dsp); очень короткие фрагменты не меняются
+    if factor <= 1.0:
+        return pcm
+    from tts_dsp import process
+    return process(pcm, speed=factor)
+
+
+def fit_segment(segment, start, window_end, cursor, max_factor=1.0, max_lead=0):
+    # Подгонка одного фрагмента под тайминг (все величины — в сэмплах).
+    # window_end — начало следующего фрагмента (для последнего — его конец),
+    # cursor — конец предыдущего уже размещённого фрагмента.
+    # Сначала используется запас: фрагмент может начаться раньше своего начала
+    # не более чем на max_lead, если перед ним есть тишина. Только если и этого
+    # мало, фрагмент ускоряется, но не больше чем в max_factor раз. Остаток
+    # переполнения (overflow > 0) сдвигает следующие фрагменты.
+    # Возвращает (позиция, фрагмент, коэффициент ускорения, переполнение).
+    earliest = max(cursor, start - max_lead)
+    length = len(segment)
+    factor = 1.0
+    if max(start, cursor) + length <= window_end:
+        return max(start, cursor), segment, factor, 0
+    if earliest + length <= window_end:
+        # Хватает тишины перед фрагментом
+        return window_end - length, segment, factor, 0
+    position = earliest
+    available = window_end - position
+    factor = min(max_factor, length / available) if available > 0 else max_factor
+    if factor > 1.0:
+        stretched = speedup_pcm(segment, factor)
+        if len(stretched) == len(segment):
+            factor = 1.0
+        segment = stretched
+    else:
+        factor = 1.0
+    return position, segment, factor, max(0, position + len(segment) - window_end)
+
+
+class PCMSink:
+    """Приёмник PCM по мере синтеза: write(pcm), write_silence(samples), close().
+
+    Вместо имени файла synth_text_to_file и synth_srt принимают и готовый
+    приёмник, например CallbackWriter для отдачи аудио по сети.
+    """
+
+    def __init__(self, rate=SAMPLE_RATE, gain=1.0):
+        self.rate = rate
+        self.gain = gain  # Громкость применяется к каждому записываемому фрагменту
+        self.samples = 0
+
+    def write(self, pcm):
+        raise NotImplementedError
+
+    def _prepare(self, pcm):
+        if self.gain != 1.0:
+            from tts_dsp import apply_gain
+            pcm = apply_gain(pcm, self.gain)
+        return np.ascontiguousarray(pcm, dtype=np.int16).tobytes()
+
+    def write_silence(self, samples, block=SAMPLE_RATE * 10):
+        # Длинная тишина пишется блоками, чтобы не выделять её целиком
+        if samples <= 0:
+            return
+        zeros = np.zeros(min(samples, block), dtype=np.int16)
+        while samples > 0:
+            self.write(zeros[:samples])
+            samples -= len(zeros)
+
+    def close(self):
+        pass
+
+    def abort(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class CallbackWriter(PCMSink):
+    # PCM (int16 little-endian байтами) передаётся в callback
+    def __init__(self, callback, rate=SAMPLE_RATE, gain=1.0):
+        super().__init__(rate, gain)
+        self.callback = callback
+
+    def write(self, pcm):
+        self.callback(self._prepare(pcm))
+        self.samples += len(pcm)
+
+
+class StreamWriter(PCMSink):
+    """Запись аудио в файл по мере готовности фрагментов.
+
+    WAV пишется модулем wave: заголовок с длиной дописывается при закрытии.
+    Остальные форматы (mp3) кодирует один процесс ffmpeg, которому PCM
+    подаётся через stdin. В памяти держится только текущий фрагмент.
+    """
+
+    def __init__(self, output_file, format="wav", rate=SAMPLE_RATE, gain=1.0):
+        super().__init__(rate, gain)
+        self.output_file = output_file
+        self.format = format
+        self._wav = None
+        self._process = None
+        if format == "wav":
+            self._wav = wave.open(output_file, "wb")
+            self._wav.setnchannels(1)
+            self._wav.setsampwidth(2)
+            self._wav.setframerate(rate)
+        else:
+            self._stderr = tempfile.TemporaryFile()
+            self._process = subprocess.Popen(
+                [shutil.which("ffmpeg") or "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                 "-f", "s16le", "-ar", str(rate), "-ac", "1", "-i", "pipe:0", "-f", format, output_file],
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+
+    def write(self, pcm):
+        data = self._prepare(pcm)
+        if self._wav is not None:
+            self._wav.writeframes(data)
+        else:
+            self._process.stdin.write(data)
+        self.samples += len(pcm)
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+        elif self._process is not None:
+            process, self._process = self._process, None
+            process.stdin.close()
+            code = process.wait()
+            self._stderr.seek(0)
+            message = self._stderr.read().decode("utf-8", "replace").strip()
+            self._stderr.close()
+            if code != 0:
+                raise RuntimeError(f"ffmpeg завершился с кодом {code}: {message}")
+
+    def abort(self):
+        # Закрыть и удалить недописанный файл
+        try:
+            self.close()
+        except Exception:
+            pass
+        if os.path.exists(self.output_file):
+            os.remove(self.output_file)
+
+
+def open_writer(output, format="wav", rate=SAMPLE_RATE, gain=1.0):
+    # Имя файла -> StreamWriter, готовый приёмник (PCMSink) возвращается как есть
+    return output if isinstance(output, PCMSink) else StreamWriter(output, format, rate, gain)
+
+
+def wav_stream_header(rate=SAMPLE_RATE):
+    # Заголовок WAV для потока неизвестной длины: размеры 0xFFFFFFFF, как у потоковых WAV
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVEfmt " +
+            struct.pack("<IHHIIHH", 16, 1, 1, rate, rate * 2, 2, 16) + b"data" + struct.pack("<I", 0xFFFFFFFF))
+
+
+def write_wav(file_path, pcm, rate=SAMPLE_RATE):
+    with wave.open(file_path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.ascontiguousarray(pcm, dtype=np.int16).tobytes())
+
@@ -0,0 +1,233 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+from tts_audio import SAMPLE_RATE, StreamWriter
+from tts_timing import NO_TIMER
+
+MANIFEST_NAME = "audiobook.json"
+# Заголовок главы: строка, начинающаяся с одного из этих слов
+DEFAULT_HEADING = r"^\s*(Глава|ГЛАВА|Часть|ЧАСТЬ|Пролог|ПРОЛОГ|Эпилог|ЭПИЛОГ|Chapter|CHAPTER)\b"
+
+
+def iter_chapters(file_path, heading=DEFAULT_HEADING, blank_lines=0):
+    # Читает файл построчно и возвращает главы (заголовок, текст) по одной.
+    # Новая глава начинается со строки-заголовка или (если blank_lines > 0)
+    # после blank_lines и более пустых строк подряд.
+    heading_re = re.compile(heading) if heading else None
+    title = None
+    lines = []
+    blanks = 0
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line.strip():
+                blanks += 1
+                lines.append(line)
+                continue
+            is_heading = heading_re is not None and heading_re.match(line) is not None
+            if is_heading or (blank_lines and blanks >= blank_lines):
+                text = "\n".join(lines).strip()
+                if text:
+                    yield title, text
+                lines = []
+                title = line.strip() if is_heading else None
+            blanks = 0
+            lines.append(line)
+    text = "\n".join(lines).strip()
+    if text:
+        yield title, text
+
+
+def _write_json_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+class Audiobook:
+    """Озвучка большой книги по главам с возможностью продолжить после сбоя.
+
+    Каждая глава пишется в свой файл. Пока глава не готова, её аудио
+    дописывается фрагментами в сырой файл .pcm.part, а манифест
+    audiobook.json после каждого фрагмента запоминает, сколько фрагментов и
+    байт записано. При повторном запуске готовые главы и фрагменты
+    пропускаются, а недописанный хвост .part обрезается.
+    """
+
+    def __init__(self, engine, input_file, output_dir, speaker_id, speed_factor=1.0, format="wav",
+                 heading=DEFAULT_HEADING, blank_lines=0, long_pause_ms=1000, gain=1.0):
+        self.engine = engine
+        self.input_file = input_file
+        self.output_dir = output_dir
+        self.speaker_id = speaker_id
+        self.speed_factor = speed_factor
+        self.format = format
+        self.heading = heading
+        self.blank_lines = blank_lines
+        self.long_pause_ms = long_pause_ms
+        self.gain = gain
+        self.manifest_file = os.path.join(output_dir, MANIFEST_NAME)
+
+    def settings(self):
+        # Параметры, от которых зависит звук: при их смене продолжать нельзя
+        return {
+            "input": os.path.abspath(self.input_file),
+            "speaker_id": self.speaker_id,
+            "speed_factor": self.speed_factor,
+            "format": self.format,
+            "heading": self.heading,
+            "blank_lines": self.blank_lines,
+            "long_pause_ms": self.long_pause_ms,
+            "gain": self.gain,
+            "model": self.engine.model_name,
+            "dict_version": self.engine.dict_version,
+            "segment_version": self.engine.segment_version(),
+            "pauses": self.engine.pauses,
+        }
+
+    def load_manifest(self, restart=False):
+        settings = self.settings()
+        if not restart and os.path.exists(self.manifest_file):
+            with open(self.manifest_file, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("settings") != settings:
+                raise ValueError("Настройки или входной файл не совпадают с сохранённой озвучкой; "
+                                 "используйте новый каталог или начните заново (--restart)")
+            return manifest
+        return {"settings": settings, "chapters": []}
+
+    def run(self, restart=False, token=None, progress=None, log=None, timer=NO_TIMER):
+        # Возвращает манифест; progress(done, total) — доля обработанного текста по байтам
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = self.load_manifest(restart)
+        self.manifest = manifest
+        chapters = manifest["chapters"]
+        total_bytes = os.path.getsize(self.input_file) or 1
+        done_bytes = 0
+        for index, (title, text) in enumerate(iter_chapters(self.input_file, self.heading, self.blank_lines)):
+            if token is not None:
+                token.check()
+            data = text.encode("utf-8")
+            digest = hashlib.sha1(data).hexdigest()
+            if index < len(chapters) and chapters[index]["sha1"] != digest:
+                # Глава изменилась: её и все следующие нужно озвучить заново
+                del chapters[index:]
+            if index == len(chapters):
+                chapters.append({"title": title, "sha1": digest, "file": self._chapter_file(index, title),
+                                 "status": "pending", "chunks_done": 0, "chunks_total": None, "chunks_sha1": None, "bytes": 0})
+            chapter = chapters[index]
+            output_file = os.path.join(self.output_dir, chapter["file"])
+            if chapter["status"] == "done" and os.path.exists(output_file):
+                if log:
+                    log(f"Глава {index + 1} уже готова: {chapter['file']}")
+            else:
+                if log:
+                    log(f"Глава {index + 1}: {title or 'без заголовка'}")
+                self._render_chapter(chapter, text, output_file, token, timer)
+            done_bytes += len(data)
+            if progress:
+                progress(min(done_bytes, total_bytes), total_bytes)
+        manifest["complete"] = True
+        _write_json_atomic(self.manifest_file, manifest)
+        return manifest
+
+    def _chapter_file(self, index, title):
+        name = f"{index + 1:03d}"
+        if title:
+            slug = re.sub(r"[^\w\-]+", "_", title).strip("_")[:40]
+            if slug:
+                name += "_" + slug
+        return f"{name}.{self.format}"
+
+    def _render_chapter(self, chapter, text, output_file, token, timer):
+        engine = self.engine
+        part_file = output_file + ".pcm.part"
+        chunks, speakers = engine.prepare_script(text, self.speaker_id, timer)
+        # Границы фрагментов зависят и от разбиения (длина фрагмента, замеры модели):
+        # если они сдвинулись, уже записанный звук не совпадает с фрагментами — глава заново
+        chunks_sha1 = hashlib.sha1("\x1e".join(f"{speaker}\x1f{chunk}" for speaker, chunk in zip(speakers, chunks))
+                                   .encode("utf-8")).hexdigest()
+        if chapter.get("chunks_sha1") != chunks_sha1 or not os.path.exists(part_file):
+            chapter.update(chunks_done=0, bytes=0)
+        chapter["chunks_total"] = len(chunks)
+        chapter["chunks_sha1"] = chunks_sha1
+        chapter["status"] = "in_progress"
+        self.manifest["complete"] = False
+        _write_json_atomic(self.manifest_file, self.manifest)
+
+        mode = "r+b" if os.path.exists(part_file) else "wb"
+        with open(part_file, mode) as f:
+            # Всё, что записано после последней отметки в манифесте, отбрасывается
+            f.truncate(chapter["bytes"])
+            f.seek(chapter["bytes"])
+            for i, _, segment, _ in engine.iter_segments(chunks, self.speaker_id, self.speed_factor, start=chapter["chunks_done"],
+                                                         token=token, timer=timer, speakers=speakers):
+                pcm = engine.with_pauses(chunks, i, segment, self.long_pause_ms, timer)
+                with timer.stage("export"):
+                    f.write(np.ascontiguousarray(pcm, dtype=np.int16).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                chapter["chunks_done"] = i + 1
+                chapter["bytes"] = f.tell()
+                _write_json_atomic(self.manifest_file, self.manifest)
+
+        with timer.stage("export"):
+            self._finish_chapter(part_file, output_file)
+        os.remove(part_file)
+        chapter["status"] = "done"
+        _write_json_atomic(self.manifest_file, self.manifest)
+
+    def _finish_chapter(self, part_file, output_file, block=SAMPLE_RATE * 10):
+        # Сырой PCM главы -> итоговый файл, блоками, не читая главу целиком
+        with StreamWriter(output_file, self.format, gain=self.gain) as writer, open(part_file, "rb") as f:
+            while True:
+                data = f.read(block * 2)
+                if not data:
+                    break
+                writer.write(np.frombuffer(data, dtype=np.int16))
+
+
+def main(argv=None):
+    from tts_engine import TTSEngine, DEFAULT_DICT_FILE, log_message
+    from tts_cache import SegmentCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE
+    from tts_config import add_model_arguments, config_from_args, engine_options
+
+    parser = argparse.ArgumentParser(description="Озвучка книги по главам с продолжением после сбоя")
+    parser.add_argument("input", help="Текст книги в UTF-8")
+    parser.add_argument("-o", "--output-dir", required=True, help="Каталог для глав и манифеста")
+    parser.add_argument("-s", "--speaker", type=int, default=2, help="ID голоса (0-56)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Скорость речи")
+    parser.add_argument("-f", "--format", choices=["wav", "mp3"], default="wav")
+    parser.add_argument("--heading", default=DEFAULT_HEADING, help="Регулярка строки-заголовка главы ('' — не искать)")
+    parser.add_argument("--blank-lines", type=int, default=0, help="Новая глава после стольких пустых строк подряд (0 — нет)")
+    parser.add_argument("--volume", type=float, default=1.0, help="Громкость (1.0 — без изменений)")
+    parser.add_argument("--restart", action="store_true", help="Начать заново, не продолжая сохранённую озвучку")
+    parser.add_argument("--workers", type=int, help="Потоков синтеза фрагментов (по умолчанию из настроек или по числу ядер)")
+    add_model_arguments(parser)
+    parser.add_argument("--dict", default=DEFAULT_DICT_FILE, help="Файл словаря произношения")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Каталог кэша фрагментов")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024))
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш фрагментов")
+    args = parser.parse_args(argv)
+
+    cache = SegmentCache(args.cache_dir, args.cache_size_mb * 1024 * 1024, enabled=not args.no_cache)
+    config = config_from_args(args)
+    workers = args.workers or config["threads"] or os.cpu_count() or 1
+    engine = TTSEngine(dict_file=args.dict, cache=cache, **engine_options(config, workers))
+    engine.text_workers = workers
+    book = Audiobook(engine, args.input, args.output_dir, args.speaker, args.speed, args.format,
+                     heading=args.heading, blank_lines=args.blank_lines, gain=args.volume)
+    manifest = book.run(restart=args.restart, log=log_message)
+    log_message(f"Готово: {len(manifest['chapters'])} глав в {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vosk-tts-gui", "segments")
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024  # 512 МБ
+
+
+class SegmentCache:
+    """Дисковый кэш синтезированных фрагментов с адресацией по содержимому.
+
+    Ключ — хэш от нормализованного текста, чтеца, скорости, модели и версии
+    словаря. Каждый фрагмент хранится отдельным файлом; время последнего
+    доступа (mtime) используется для вытеснения LRU при превышении лимита.
+    Файлы пишутся атомарно, поэтому кэш можно делить между процессами.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size=DEFAULT_CACHE_SIZE, enabled=True):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = None
+
+    @staticmethod
+    def make_key(text, speaker_id, speed_factor, model_name, dict_version, dsp_version=0):
+        raw = "\x1f".join([text, str(speaker_id), f"{speed_factor:.3f}", str(model_name), str(dict_version), str(dsp_version)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".bin")
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Отмечаем использование для LRU
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        if not self.enabled or len(data) > self.max_size:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_size:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        # Удаляем самые давно использованные файлы, пока не уложимся в 90% лимита
+        entries = sorted(self._entries())
+        size = sum(size for _, size, _ in entries)
+        target = self.max_size * 0.9
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                size -= entry_size
+            except OSError:
+                pass
+        self._size = size
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            return {"hits": self.hits, "misses": self.misses, "size": self._size, "max_size": self.max_size, "enabled": self.enabled}
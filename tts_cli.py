@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from multiprocessing import Pool
+
+from tts_engine import TTSEngine, DEFAULT_DICT_FILE
+from tts_config import add_model_arguments, config_from_args, engine_options
+from tts_cache import SegmentCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE
+from tts_timing import StageTimer, json_log_file
+from tts_subtitles import SUBTITLE_EXTENSIONS
+
+INPUT_EXTENSIONS = (".txt",) + SUBTITLE_EXTENSIONS
+
+# Движок создаётся один раз в каждом рабочем процессе
+_engine = None
+_timing_log = None
+_error = None
+
+
+def _init_worker(options, dict_file, cache_dir, cache_size, use_cache, timing_log=None):
+    # Ошибка загрузки модели или словаря передаётся в задачи: исключение в initializer
+    # заставило бы Pool бесконечно перезапускать процессы
+    global _engine, _timing_log, _error
+    try:
+        _timing_log = json_log_file(timing_log) if timing_log else None
+        cache = SegmentCache(cache_dir, cache_size, enabled=use_cache)
+        _engine = TTSEngine(dict_file=dict_file, cache=cache, **options)
+    except Exception as e:
+        _error = e
+
+
+def _process_file(task):
+    input_file, output_file, speaker_id, speed_factor, format, file_workers, gain = task
+    started = time.time()
+    status = {"input": input_file, "output": output_file}
+    if _error is not None:
+        status.update(status="error", error=f"Не удалось загрузить модель: {_error}", seconds=0.0)
+        return status
+    hits, misses = _engine.cache.hits, _engine.cache.misses
+    timer = StageTimer(input_file, log=_timing_log)
+    try:
+        if input_file.lower().endswith(SUBTITLE_EXTENSIONS):
+            problems = []
+            subtitles = _engine.parse_srt(input_file, log=problems.append)
+            if problems:
+                status["parse_problems"] = problems
+            if not subtitles:
+                raise ValueError("SRT пустой или неверный формат")
+            result = _engine.synth_srt(subtitles, output_file, speaker_id, speed_factor, format, log=lambda message: None,
+                                       workers=file_workers, timer=timer, gain=gain)
+            status.update(result)
+        else:
+            with open(input_file, "r", encoding="utf-8") as f:
+                text = f.read().strip()
+            if not text:
+                raise ValueError("Пустой текст")
+            _engine.synth_text_to_file(text, output_file, speaker_id, speed_factor, format, timer=timer, gain=gain,
+                                       workers=file_workers)
+        status["status"] = "ok"
+    except Exception as e:
+        status["status"] = "error"
+        status["error"] = str(e)
+        status["traceback"] = traceback.format_exc()
+    status["cache_hits"] = _engine.cache.hits - hits
+    status["cache_misses"] = _engine.cache.misses - misses
+    status["seconds"] = round(time.time() - started, 3)
+    timer.finish()
+    status["timing"] = timer.summary()
+    return status
+
+
+def collect_inputs(paths, manifest=None):
+    # Возвращает список пар (входной файл, выходной файл или None)
+    inputs = []
+    if manifest:
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if "\t" in line:
+                    input_file, output_file = line.split("\t", 1)
+                    inputs.append((input_file.strip(), output_file.strip()))
+                else:
+                    inputs.append((line, None))
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(INPUT_EXTENSIONS):
+                    inputs.append((os.path.join(path, name), None))
+        else:
+            inputs.append((path, None))
+    return inputs
+
+
+def output_paths(inputs, output_dir, format):
+    # Выходной файл по умолчанию — имя входа с расширением формата; если так совпадают
+    # несколько входов (a.txt и a.srt), к имени добавляется расширение входа (a_txt.wav).
+    # Совпадение, которое так не снять (x/a.txt и y/a.txt, одинаковые выходы в манифесте), — ValueError
+    def default(input_file, keep_extension=False):
+        name, extension = os.path.splitext(os.path.basename(input_file))
+        if keep_extension and extension:
+            name += "_" + extension.lstrip(".")
+        return os.path.join(output_dir, f"{name}.{format}")
+
+    counts = {}
+    for input_file, output_file in inputs:
+        if output_file is None:
+            key = os.path.normcase(os.path.abspath(default(input_file)))
+            counts[key] = counts.get(key, 0) + 1
+    outputs = []
+    for input_file, output_file in inputs:
+        if output_file is None:
+            output_file = default(input_file, counts[os.path.normcase(os.path.abspath(default(input_file)))] > 1)
+        outputs.append(output_file)
+
+    seen = {}
+    for (input_file, _), output_file in zip(inputs, outputs):
+        key = os.path.normcase(os.path.abspath(output_file))
+        if key in seen:
+            raise ValueError(f"{seen[key]} и {input_file} пишутся в один файл {output_file}; "
+                             "задайте выходы в манифесте (-m)")
+        seen[key] = input_file
+    return outputs
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Пакетный синтез текстов и SRT через Vosk TTS без GUI")
+    parser.add_argument("inputs", nargs="*", help="Файлы .txt/.srt/.vtt/.ass или каталоги с ними")
+    parser.add_argument("-m", "--manifest", help="Файл со списком входов: путь или 'вход<TAB>выход' в строке")
+    parser.add_argument("-o", "--output-dir", default="output", help="Каталог для результатов")
+    parser.add_argument("-j", "--jobs", type=int, help="Число рабочих процессов (по умолчанию из настроек или по числу ядер)")
+    parser.add_argument("-s", "--speaker", type=int, default=2, help="Чтец (speaker_id, 0-56)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Скорость (0.5x - 2.0x)")
+    parser.add_argument("--volume", type=float, default=1.0, help="Громкость (1.0 — без изменений)")
+    parser.add_argument("-f", "--format", choices=["wav", "mp3"], default="wav", help="Формат результата")
+    parser.add_argument("--file-workers", "--srt-workers", dest="file_workers", type=int, default=1,
+                        help="Потоков синтеза внутри одного файла (фрагменты текста или субтитры)")
+    add_model_arguments(parser)
+    parser.add_argument("--dict", default=DEFAULT_DICT_FILE, help="Словарь произношения")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Каталог кэша фрагментов")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024), help="Лимит кэша в МБ")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш фрагментов")
+    parser.add_argument("--report", help="Файл отчёта (по умолчанию <output-dir>/report.json)")
+    parser.add_argument("--timing-log", help="Дописывать JSON-замеры по фрагментам и субтитрам в этот файл")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    inputs = collect_inputs(args.inputs, args.manifest)
+    if not inputs:
+        print("Нет входных файлов", file=sys.stderr)
+        return 2
+
+    try:
+        outputs = output_paths(inputs, args.output_dir, args.format)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    tasks = []
+    for (input_file, _), output_file in zip(inputs, outputs):
+        tasks.append((input_file, output_file, args.speaker, args.speed, args.format, args.file_workers, args.volume))
+
+    config = config_from_args(args)
+    jobs = max(1, min(args.jobs or config["processes"] or os.cpu_count() or 1, len(tasks)))
+    report = []
+    initargs = (engine_options(config, jobs * max(1, args.file_workers)), args.dict, args.cache_dir, args.cache_size_mb * 1024 * 1024, not args.no_cache, args.timing_log)
+    with Pool(processes=jobs, initializer=_init_worker, initargs=initargs) as pool:
+        for status in pool.imap_unordered(_process_file, tasks):
+            report.append(status)
+            print(f"[{len(report)}/{len(tasks)}] {status['status']}: {status['input']} ({status['seconds']} с)")
+
+    report.sort(key=lambda status: status["input"])
+    report_file = args.report or os.path.join(args.output_dir, "report.json")
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    failed = sum(1 for status in report if status["status"] != "ok")
+    print(f"Готово: {len(report) - failed} успешно, {failed} с ошибками. Отчёт: {report_file}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
+from tts_dsp import DEFAULT_LOUDNESS_DB
+
+DEFAULT_CONFIG_FILE = os.environ.get("VOSK_TTS_CONFIG") or os.path.join(
+    os.path.expanduser("~"), ".config", "vosk-tts-gui", "config.json")
+
+# Пустое значение или 0 — по умолчанию: модель DEFAULT_MODEL из кэша vosk-tts,
+# потоки onnxruntime выбирает сам (по числу ядер), процессов и потоков синтеза — по числу ядер.
+# processes — процессов со своей моделью (tts_cli.py -j); threads — синтезов одновременно
+# с общей моделью в одном процессе (GUI, tts_audiobook.py, запросы tts_server.py).
+# loudness_dbfs: null — не выравнивать громкость; pauses_ms — замены для tts_engine.PAUSES_MS;
+# preview_phrase — фраза образцов голосов (пусто — tts_preview.DEFAULT_PHRASE)
+DEFAULTS = {
+    "model_name": "",
+    "model_path": "",
+    "intra_op_threads": 0,
+    "inter_op_threads": 0,
+    "processes": 0,
+    "threads": 0,
+    "trim_silence": True,
+    "loudness_dbfs": DEFAULT_LOUDNESS_DB,
+    "pauses_ms": {},
+    "preview_phrase": "",
+}
+
+
+def load_config(file_path=DEFAULT_CONFIG_FILE):
+    config = dict(DEFAULTS)
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return config
+    config.update({key: value for key, value in data.items() if key in DEFAULTS})
+    if "workers" in data and "processes" not in data:
+        config["processes"] = data["workers"]  # Прежний ключ: его записывал autotune как число процессов
+    return config
+
+
+def save_config(config, file_path=DEFAULT_CONFIG_FILE):
+    data = {key: config.get(key, DEFAULTS[key]) for key in DEFAULTS}
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    tmp = file_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, file_path)
+
+
+def engine_options(config, concurrency=1):
+    # Аргументы TTSEngine из настроек; незаданные не передаются, чтобы действовали умолчания движка.
+    # concurrency — сколько синтезов идёт одновременно на этом компьютере (потоки и процессы):
+    # если потоки onnxruntime не заданы, ядра делятся между ними, а не каждому по всем ядрам
+    options = {}
+    if config.get("model_name"):
+        options["model_name"] = config["model_name"]
+    if config.get("model_path"):
+        options["model_path"] = config["model_path"]
+    for key in ("intra_op_threads", "inter_op_threads"):
+        if config.get(key):
+            options[key] = int(config[key])
+    if not config.get("intra_op_threads") and concurrency > 1:
+        options["intra_op_threads"] = max(1, (os.cpu_count() or 1) // concurrency)
+    options["trim_silence"] = bool(config.get("trim_silence", True))
+    options["loudness_dbfs"] = config.get("loudness_dbfs", DEFAULT_LOUDNESS_DB)
+    if config.get("pauses_ms"):
+        options["pauses"] = {mark: int(ms) for mark, ms in config["pauses_ms"].items()}
+    return options
+
+
+def add_model_arguments(parser):
+    parser.add_argument("--config", default=DEFAULT_CONFIG_FILE, help="Файл настроек модели и потоков")
+    parser.add_argument("--model", help="Название модели vosk-tts (скачивается в кэш vosk-tts)")
+    parser.add_argument("--model-path", help="Каталог модели на диске (вместо --model)")
+    parser.add_argument("--intra-threads", type=int, help="Потоков onnxruntime внутри операции (0 — авто)")
+    parser.add_argument("--inter-threads", type=int, help="Потоков onnxruntime между операциями (0 — авто)")
+
+
+def config_from_args(args):
+    # Настройки из файла, поверх — заданные в командной строке
+    config = load_config(args.config)
+    overrides = {"model_name": args.model, "model_path": args.model_path,
+                 "intra_op_threads": args.intra_threads, "inter_op_threads": args.inter_threads}
+    if args.model and args.model_path is None:
+        overrides["model_path"] = ""  # Явно заданное имя модели важнее пути из файла
+    config.update({key: value for key, value in overrides.items() if value is not None})
+    return config
+
+
+TUNED_KEYS = ("processes", "threads", "intra_op_threads", "inter_op_threads")  # Что подбирает autotune
+
+
+def thread_candidates(cpu_count):
+    # Сочетания (процессов, потоков на процесс), не больше ядер в сумме
+    candidates = []
+    processes = 1
+    while processes <= cpu_count:
+        threads = 1
+        while processes * threads <= cpu_count:
+            candidates.append((processes, threads))
+            threads *= 2
+        if (processes, cpu_count // processes) not in candidates:
+            candidates.append((processes, cpu_count // processes))
+        processes *= 2
+    return candidates
+
+
+_engine = None
+_speaker_id = 0
+_error = None
+
+
+def _init_tune_worker(options, speaker_id):
+    # Ошибка загрузки модели передаётся в задачу: исключение в initializer зациклило бы Pool
+    global _engine, _speaker_id, _error
+    from tts_engine import TTSEngine
+    from tts_cache import SegmentCache
+    try:
+        _engine = TTSEngine(dict_file=None, cache=SegmentCache(enabled=False), **options)
+        _speaker_id = speaker_id
+        _engine.synth_raw(_engine.apply_dictionary_and_numbers("Прогрев."), speaker_id)
+    except Exception as e:
+        _error = e
+
+
+def _tune_task(text):
+    from tts_audio import duration_seconds
+    if _error is not None:
+        raise _error
+    return duration_seconds(_engine.synth_raw(_engine.apply_dictionary_and_numbers(text), _speaker_id))
+
+
+def _tune_threads_task(task):
+    # Синтез набора в threads потоках с общей моделью этого процесса: (секунд аудио, секунд)
+    threads, texts = task
+    _tune_task(texts[0])
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        audio = sum(pool.map(_tune_task, texts))
+    return audio, time.perf_counter() - started
+
+
+def _measure(config, speaker_id, texts, processes, intra_op_threads, inter_op_threads, threads=1):
+    options = engine_options(dict(config, intra_op_threads=intra_op_threads, inter_op_threads=inter_op_threads))
+    with Pool(processes=processes, initializer=_init_tune_worker, initargs=(options, speaker_id)) as pool:
+        if threads > 1:
+            audio, seconds = pool.apply(_tune_threads_task, ((threads, texts),))
+        else:
+            pool.map(_tune_task, texts[:processes])  # Ждём загрузки модели во всех процессах
+            started = time.perf_counter()
+            audio = sum(pool.map(_tune_task, texts, chunksize=1))
+            seconds = time.perf_counter() - started
+    return {"processes": processes, "threads": threads, "intra_op_threads": intra_op_threads,
+            "inter_op_threads": inter_op_threads, "seconds": round(seconds, 3), "audio_per_second": round(audio / seconds, 3)}
+
+
+def autotune(config, speaker_id=2, cpu_count=None, rounds=8, log=None):
+    # Одинаковый набор предложений синтезируется при разных настройках; лучшее — больше секунд
+    # аудио за секунду, загрузка модели не входит в замер. По очереди: процессы × потоки внутри
+    # операции (в сумме не больше ядер), затем при лучшем сочетании — потоки между операциями
+    # (0 — последовательный режим onnxruntime), затем синтезов одновременно в одном процессе
+    # с общей моделью. Возвращает (лучшее, все замеры); в лучшем threads — из последнего этапа
+    from tts_segmenter import CALIBRATION_TEXT, split_sentences
+    cpu_count = cpu_count or os.cpu_count() or 1
+    texts = split_sentences(CALIBRATION_TEXT) * rounds
+    results = []
+
+    def run(processes, intra_op_threads, inter_op_threads=0, threads=1):
+        result = _measure(config, speaker_id, texts, processes, intra_op_threads, inter_op_threads, threads)
+        results.append(result)
+        if log:
+            log(f"процессов {processes}, синтезов в процессе {threads}, потоков {intra_op_threads}/{inter_op_threads}: "
+                f"{result['seconds']:.2f} с, {result['audio_per_second']} с аудио/с")
+        return result
+
+    def fastest(candidates):
+        return max(candidates, key=lambda result: result["audio_per_second"])
+
+    best = fastest([run(processes, intra) for processes, intra in thread_candidates(cpu_count)])
+    inter_candidates = [n for n in (2, 4) if n <= cpu_count // best["processes"]]
+    best = fastest([best] + [run(best["processes"], best["intra_op_threads"], inter) for inter in inter_candidates])
+    threads = [best] if best["processes"] == 1 else [run(1, best["intra_op_threads"], best["inter_op_threads"])]
+    n = 2
+    while n * best["intra_op_threads"] <= cpu_count:
+        threads.append(run(1, best["intra_op_threads"], best["inter_op_threads"], n))
+        n *= 2
+    best = dict(best, threads=fastest(threads)["threads"])
+    return best, results
+
+
+def main(argv=None):
+    from tts_engine import log_message
+
+    parser = argparse.ArgumentParser(description="Настройки модели и потоков синтеза")
+    parser.add_argument("command", choices=["show", "set", "autotune"],
+                        help="show — показать, set — сохранить заданные ключи, autotune — подобрать потоки и процессы")
+    add_model_arguments(parser)
+    parser.add_argument("--processes", type=int, help="Процессов пакетного синтеза tts_cli.py (0 — по числу ядер)")
+    parser.add_argument("--threads", type=int, help="Синтезов одновременно с общей моделью в одном процессе (0 — по числу ядер)")
+    parser.add_argument("-s", "--speaker", type=int, default=2, help="ID голоса для замеров autotune")
+    parser.add_argument("--cpus", type=int, help="Сколько ядер занимать при autotune (по умолчанию все)")
+    parser.add_argument("--rounds", type=int, default=8, help="Повторов набора предложений в замере autotune")
+    args = parser.parse_args(argv)
+
+    config = config_from_args(args)
+    for key in ("processes", "threads"):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+    if args.command == "autotune":
+        best, _ = autotune(config, args.speaker, args.cpus, args.rounds, log=log_message)
+        config.update({key: best[key] for key in TUNED_KEYS})
+        log_message(f"Лучшее: процессов {best['processes']}, синтезов в процессе {best['threads']}, "
+                    f"потоков {best['intra_op_threads']}/{best['inter_op_threads']}")
+    if args.command in ("set", "autotune"):
+        save_config(config, args.config)
+        log_message(f"Сохранено в {args.config}")
+    print(json.dumps(config, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
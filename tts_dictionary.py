@@ -0,0 +1,293 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+DEFAULT_COMPILED_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vosk-tts-gui", "dictionaries")
+MAGIC = b"VTTSDIC1"
+_HEADER = struct.Struct("<8sII20s4x")  # метка, записей, разных длин ключей, sha1 исходника
+
+# Полиномиальный хэш строки по кодам символов: sum(c[k] * BASE**k) по модулю 2**64.
+# BASE нечётное, поэтому обратимо: хэш любой подстроки текста считается векторно
+BASE = 0x100000001B3
+_INV_BASE = pow(BASE, -1, 2 ** 64)
+_MASK = 2 ** 64 - 1
+_powers_lock = threading.Lock()
+_powers = (np.ones(1, dtype=np.uint64), np.ones(1, dtype=np.uint64))
+
+
+def _power_tables(n):
+    # BASE**k и BASE**-k для k < n (таблицы растут по мере надобности)
+    global _powers
+    with _powers_lock:
+        powers, inverse = _powers
+        if len(powers) < n:
+            size = max(n, len(powers) * 2)
+            powers = np.ones(size, dtype=np.uint64)
+            inverse = np.ones(size, dtype=np.uint64)
+            with np.errstate(over="ignore"):
+                powers[1:] = np.cumprod(np.full(size - 1, BASE, dtype=np.uint64))
+                inverse[1:] = np.cumprod(np.full(size - 1, _INV_BASE, dtype=np.uint64))
+            _powers = (powers, inverse)
+        return powers, inverse
+
+
+def _codes(text):
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+
+
+def _prefix_sums(codes):
+    powers, inverse = _power_tables(len(codes) + 1)
+    prefix = np.zeros(len(codes) + 1, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        np.cumsum(codes * powers[:len(codes)], out=prefix[1:])
+    return prefix, inverse
+
+
+def string_hash(text):
+    value = 0
+    power = 1
+    for c in text:
+        value = (value + ord(c) * power) & _MASK
+        power = (power * BASE) & _MASK
+    return value
+
+
+def parse_dictionary(file_path):
+    # Строки "ключ: значение"; при повторе ключа действует последняя строка
+    with open(file_path, "r", encoding="utf-8") as f:
+        return {line.split(":", 1)[0].strip(): line.split(":", 1)[1].strip() for line in f if ":" in line}
+
+
+def compile_dictionary(source_file, compiled_file):
+    # Словарь -> двоичный файл: записи отсортированы по ключу (смещения ключей и значений),
+    # плюс отсортированные хэши ключей для поиска и замены без разбора всего словаря
+    with open(source_file, "rb") as f:
+        digest = hashlib.sha1(f.read()).digest()
+    entries = {key: value for key, value in parse_dictionary(source_file).items() if key}
+    keys = sorted(entries)
+    values = [entries[key] for key in keys]
+
+    key_bytes = [key.encode("utf-8") for key in keys]
+    value_bytes = [value.encode("utf-8") for value in values]
+    key_offsets = np.zeros(len(keys) + 1, dtype=np.uint64)
+    key_offsets[1:] = np.cumsum([len(b) for b in key_bytes], dtype=np.uint64)
+    value_offsets = np.zeros(len(keys) + 1, dtype=np.uint64)
+    value_offsets[1:] = np.cumsum([len(b) for b in value_bytes], dtype=np.uint64)
+
+    char_lengths = np.array([len(key) for key in keys], dtype=np.int64)
+    starts = np.zeros(len(keys), dtype=np.int64)
+    starts[1:] = np.cumsum(char_lengths)[:-1]
+    prefix, inverse = _prefix_sums(_codes("".join(keys)))
+    with np.errstate(over="ignore"):
+        hashes = (prefix[starts + char_lengths] - prefix[starts]) * inverse[starts]
+    order = np.argsort(hashes, kind="stable")
+    lengths = np.unique(char_lengths)[::-1].astype(np.uint32)
+
+    os.makedirs(os.path.dirname(os.path.abspath(compiled_file)), exist_ok=True)
+    tmp = f"{compiled_file}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(keys), len(lengths), digest))
+        for array in (lengths, hashes[order], order.astype(np.uint32), key_offsets, value_offsets):
+            f.write(b"\0" * (-f.tell() % 8))  # Выравнивание для чтения через mmap
+            f.write(array.tobytes())
+        f.write(b"".join(key_bytes))
+        f.write(b"".join(value_bytes))
+    os.replace(tmp, compiled_file)
+
+
+class CompiledDictionary:
+    """Словарь произношения в двоичном файле, открытом через mmap.
+
+    Загрузка не читает записи: ключи и значения декодируются по запросу.
+    Записи упорядочены по ключу (row(i), search(prefix) — для редактора),
+    замена в тексте (replace) та же, что у DictionaryMatcher: в каждой
+    позиции самое длинное совпадение, но кандидаты ищутся векторно по
+    хэшам подстрок всех нужных длин.
+    """
+
+    def __init__(self, compiled_file):
+        self.file_path = compiled_file
+        with open(compiled_file, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, n_lengths, digest = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Не скомпилированный словарь: {compiled_file}")
+        self.count = count
+        self.version = digest.hex()
+        offset = _HEADER.size
+
+        def array(dtype, n):
+            nonlocal offset
+            offset += -offset % 8
+            result = np.frombuffer(self._mm, dtype=dtype, count=n, offset=offset)
+            offset += result.nbytes
+            return result
+
+        self.lengths = [int(n) for n in array(np.uint32, n_lengths)]
+        self._hashes = array(np.uint64, count)
+        self._hash_entries = array(np.uint32, count)
+        self._key_offsets = array(np.uint64, count + 1)
+        self._value_offsets = array(np.uint64, count + 1)
+        self._keys_start = offset
+        self._values_start = offset + int(self._key_offsets[-1])
+
+    def __len__(self):
+        return self.count
+
+    def key(self, i):
+        start = self._keys_start + int(self._key_offsets[i])
+        return self._mm[start:self._keys_start + int(self._key_offsets[i + 1])].decode("utf-8")
+
+    def value(self, i):
+        start = self._values_start + int(self._value_offsets[i])
+        return self._mm[start:self._values_start + int(self._value_offsets[i + 1])].decode("utf-8")
+
+    def row(self, i):
+        return self.key(i), self.value(i)
+
+    def __iter__(self):
+        return (self.key(i) for i in range(self.count))
+
+    def items(self):
+        return (self.row(i) for i in range(self.count))
+
+    def _find(self, key, key_hash=None):
+        key_hash = string_hash(key) if key_hash is None else key_hash
+        i = int(np.searchsorted(self._hashes, np.uint64(key_hash)))
+        while i < self.count and int(self._hashes[i]) == key_hash:
+            entry = int(self._hash_entries[i])
+            if self.key(entry) == key:
+                return entry
+            i += 1
+        return -1
+
+    def get(self, key, default=None):
+        entry = self._find(key)
+        return self.value(entry) if entry >= 0 else default
+
+    def __getitem__(self, key):
+        entry = self._find(key)
+        if entry < 0:
+            raise KeyError(key)
+        return self.value(entry)
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def search(self, prefix):
+        # Номер первой записи, ключ которой >= prefix (двоичный поиск по отсортированным ключам)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _longest_at(self, text, position):
+        for length in self.lengths:
+            if position + length <= len(text):
+                entry = self._find(text[position:position + length])
+                if entry >= 0:
+                    return position + length, entry
+        return position, -1
+
+    def replace(self, text):
+        if not self.count or not text:
+            return text
+        n = len(text)
+        prefix, inverse = _prefix_sums(_codes(text))
+        best = np.zeros(n, dtype=np.int32)  # Длина самого длинного ключа, совпавшего в позиции
+        entries = np.zeros(n, dtype=np.int64)  # И его запись
+        last = self.count - 1
+        for length in self.lengths:  # От длинных к коротким
+            if length > n:
+                continue
+            m = n - length + 1
+            with np.errstate(over="ignore"):
+                hashes = (prefix[length:] - prefix[:m]) * inverse[:m]
+            found = np.minimum(np.searchsorted(self._hashes, hashes), last)
+            hit = (self._hashes[found] == hashes) & (best[:m] == 0)
+            best[:m][hit] = length
+            entries[:m][hit] = self._hash_entries[found[hit]]
+        # Слева направо, как у регулярки: совпадение в позиции, затем поиск после него
+        parts = []
+        cursor = 0
+        for position in np.flatnonzero(best).tolist():
+            if position < cursor:
+                continue
+            end = position + int(best[position])
+            entry = int(entries[position])
+            if self.key(entry) != text[position:end]:
+                # Хэши совпали, ключи нет (практически не бывает): точный поиск в этой позиции
+                end, entry = self._longest_at(text, position)
+                if entry < 0:
+                    continue
+            parts.append(text[cursor:position])
+            parts.append(self.value(entry))
+            cursor = end
+        parts.append(text[cursor:])
+        return "".join(parts)
+
+    def close(self):
+        # Сначала массивы-представления: пока они есть, mmap закрыть нельзя
+        self._hashes = self._hash_entries = self._key_offsets = self._value_offsets = None
+        self._mm.close()
+
+
+def compiled_path(source_file, compiled_dir=DEFAULT_COMPILED_DIR):
+    # Имя зависит от пути, размера и времени изменения исходника: правка исходника даёт новый файл,
+    # а открытый другим процессом прежний не перезаписывается (в Windows его нельзя заменить)
+    stat = os.stat(source_file)
+    path_id = hashlib.sha1(os.path.abspath(source_file).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(compiled_dir, f"{path_id}-{stat.st_size}-{stat.st_mtime_ns}.dic"), path_id
+
+
+def open_dictionary(source_file, compiled_dir=DEFAULT_COMPILED_DIR):
+    # Скомпилированный словарь для текстового исходника; пересобирается, только если исходник изменился
+    compiled_file, path_id = compiled_path(source_file, compiled_dir)
+    if not os.path.exists(compiled_file):
+        compile_dictionary(source_file, compiled_file)
+        for name in os.listdir(compiled_dir):
+            # Прежние версии этого словаря; занятые другим процессом останутся до следующего раза
+            if name.startswith(path_id + "-") and name.endswith(".dic") and name != os.path.basename(compiled_file):
+                try:
+                    os.remove(os.path.join(compiled_dir, name))
+                except OSError:
+                    pass
+    return CompiledDictionary(compiled_file)
+
+
+def format_entry(key, value):
+    return f"{key}: {value}\n"
+
+
+def save_changes(source_file, changes):
+    # Правки редактора: changes — ключ -> новое значение или None (удалить).
+    # Новые и изменённые записи дописываются в конец файла (последняя строка
+    # ключа главнее), файл переписывается целиком только при удалении
+    deleted = {key for key, value in changes.items() if value is None}
+    updates = [(key, value) for key, value in changes.items() if value is not None]
+    if deleted and os.path.exists(source_file):
+        tmp = source_file + ".tmp"
+        with open(source_file, "r", encoding="utf-8") as src, open(tmp, "w", encoding="utf-8") as dst:
+            for line in src:
+                if ":" in line and line.split(":", 1)[0].strip() in deleted:
+                    continue
+                dst.write(line)
+        os.replace(tmp, source_file)
+    if updates:
+        needs_newline = False
+        if os.path.exists(source_file) and os.path.getsize(source_file):
+            with open(source_file, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        with open(source_file, "a", encoding="utf-8") as f:
+            if needs_newline:
+                f.write("\n")
+            f.writelines(format_entry(key, value) for key, value in updates)
@@ -0,0 +1,151 @@
+import numpy as np
+
+from tts_audio import SAMPLE_RATE
+
+DSP_VERSION = 1  # Меняется вместе с алгоритмом обработки: входит в ключ кэша фрагментов
+
+FRAME_SECONDS = 0.03  # Окно WSOLA: несколько периодов основного тона голоса
+SEARCH_SECONDS = 0.008  # Насколько можно сдвинуть окно в поиске лучшего совпадения
+
+LEVEL_SECONDS = 0.01  # Кадр для оценки громкости
+SPEECH_THRESHOLD_DB = -35  # Тише самого громкого кадра на столько — тишина
+SILENCE_FLOOR_DB = -55  # Тише этого — тишина всегда
+TRIM_KEEP_SECONDS = 0.04  # Запас вокруг речи, чтобы не срезать тихие согласные
+DEFAULT_LOUDNESS_DB = -20.0  # Средняя громкость речи фрагмента (RMS, дБ от полной шкалы)
+MAX_LOUDNESS_GAIN = 4.0  # Тихий фрагмент усиливается не больше (чтобы не поднимать шум)
+PEAK_LIMIT = 0.95  # Пик после нормализации
+
+
+def to_float(pcm):
+    return np.asarray(pcm, dtype=np.float32) * (1.0 / 32768)
+
+
+def to_int16(x):
+    return (np.clip(x, -1.0, 32767 / 32768) * 32768).astype(np.int16)
+
+
+def _lowpass(x, cutoff):
+    # КИХ-фильтр (sinc с окном Хэннинга), cutoff — доля от частоты дискретизации
+    taps = 31
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = (2 * cutoff * np.sinc(2 * cutoff * n) * np.hanning(taps)).astype(np.float32)
+    kernel /= kernel.sum()
+    return np.convolve(x, kernel, mode="same")
+
+
+def resample(x, src_rate, dst_rate):
+    # Линейная интерполяция; при понижении частоты сначала срезаются частоты выше новой Найквиста
+    if src_rate == dst_rate or not len(x):
+        return x
+    if dst_rate < src_rate:
+        x = _lowpass(x, 0.5 * dst_rate / src_rate)
+    n_out = int(round(len(x) * dst_rate / src_rate))
+    positions = np.arange(n_out, dtype=np.float64) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(x)), x).astype(np.float32)
+
+
+def time_stretch(x, factor, rate=SAMPLE_RATE):
+    # WSOLA: темп меняется в factor раз (> 1 — быстрее) без смены высоты тона.
+    # Окна Ханна с перекрытием 50% берутся из входа с шагом hop*factor, каждое
+    # сдвигается в пределах search так, чтобы лучше всего продолжить предыдущее
+    # (максимум корреляции), и складываются в выход с шагом hop.
+    # Длина результата — ровно len(x) / factor.
+    frame = int(rate * FRAME_SECONDS) // 2 * 2
+    hop = frame // 2
+    n_out = int(round(len(x) / factor))
+    if factor == 1.0 or len(x) < frame * 2:
+        return x
+    search = int(rate * SEARCH_SECONDS)
+    hop_in = hop * factor
+    lead = int(round(hop_in))  # Тишина в начале, чтобы сумма окон была 1 с первого сэмпла
+    x = np.concatenate([np.zeros(lead + search, dtype=np.float32), x,
+                        np.zeros(frame + 2 * search + lead, dtype=np.float32)])
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(np.float32)
+    frames = (n_out + hop) // hop + 1
+    out = np.zeros(frames * hop + frame, dtype=np.float32)
+    previous = search
+    for k in range(frames):
+        nominal = search + int(round(k * hop_in))
+        if k == 0:
+            position = nominal
+        else:
+            template = x[previous + hop:previous + hop + frame]
+            region = x[nominal - search:nominal + search + frame]
+            position = nominal - search + int(np.argmax(np.correlate(region, template, mode="valid")))
+        out[k * hop:k * hop + frame] += x[position:position + frame] * window
+        previous = position
+    start = int(round(lead / factor))
+    return out[start:start + n_out]
+
+
+def process(pcm, speed=1.0, gain=1.0, src_rate=SAMPLE_RATE, dst_rate=SAMPLE_RATE):
+    # Вся обработка фрагмента за один переход в float32: смена частоты, темп, громкость
+    if speed == 1.0 and gain == 1.0 and src_rate == dst_rate:
+        return np.asarray(pcm, dtype=np.int16)
+    x = to_float(pcm)
+    x = resample(x, src_rate, dst_rate)
+    if speed != 1.0:
+        x = time_stretch(x, speed, dst_rate)
+    if gain != 1.0:
+        x = x * np.float32(gain)
+    return to_int16(x)
+
+
+def frame_levels(x, rate=SAMPLE_RATE):
+    # RMS по кадрам LEVEL_SECONDS (хвост короче кадра не учитывается)
+    frame = max(1, int(rate * LEVEL_SECONDS))
+    n = len(x) // frame
+    frames = x[:n * frame].reshape(n, frame)
+    return np.sqrt(np.mean(frames * frames, axis=1)), frame
+
+
+def _speech_frames(levels):
+    if not len(levels):
+        return levels.astype(bool)
+    threshold = max(float(levels.max()) * 10 ** (SPEECH_THRESHOLD_DB / 20), 10 ** (SILENCE_FLOOR_DB / 20))
+    return levels > threshold
+
+
+def speech_bounds(x, rate=SAMPLE_RATE):
+    # Начало и конец речи: тишина, которую модель добавляет по краям, отрезается
+    levels, frame = frame_levels(x, rate)
+    active = np.flatnonzero(_speech_frames(levels))
+    if not len(active):
+        return 0, len(x)
+    keep = int(rate * TRIM_KEEP_SECONDS)
+    return max(0, active[0] * frame - keep), min(len(x), (active[-1] + 1) * frame + keep)
+
+
+def loudness_gain(x, target_db=DEFAULT_LOUDNESS_DB, rate=SAMPLE_RATE):
+    # Множитель, приводящий среднюю громкость речи (без пауз) к target_db, с ограничением пика
+    levels, _ = frame_levels(x, rate)
+    speech = levels[_speech_frames(levels)]
+    if not len(speech):
+        return 1.0
+    rms = float(np.sqrt(np.mean(speech * speech)))
+    gain = min(max(10 ** (target_db / 20) / rms, 1 / MAX_LOUDNESS_GAIN), MAX_LOUDNESS_GAIN)
+    peak = float(np.abs(x).max())
+    return min(gain, PEAK_LIMIT / peak) if peak else 1.0
+
+
+def condition(pcm, speed=1.0, trim=True, loudness_db=DEFAULT_LOUDNESS_DB, rate=SAMPLE_RATE):
+    # Фрагмент от модели за один переход в float32: обрезка тишины по краям,
+    # выравнивание громкости (loudness_db=None — не менять) и темп
+    if speed == 1.0 and not trim and loudness_db is None:
+        return np.asarray(pcm, dtype=np.int16)
+    x = to_float(pcm)
+    if trim:
+        start, end = speech_bounds(x, rate)
+        x = x[start:end]
+    gain = loudness_gain(x, loudness_db, rate) if loudness_db is not None else 1.0
+    if speed != 1.0:
+        x = time_stretch(x, speed, rate)
+    if gain != 1.0:
+        x = x * np.float32(gain)
+    return to_int16(x)
+
+
+def apply_gain(pcm, gain):
+    if gain == 1.0:
+        return pcm
+    return process(pcm, gain=gain)
@@ -0,0 +1,526 @@
+import os
+import hashlib
+import tempfile
+import traceback  # Для полного лога ошибок
+import datetime  # Для timestamp в логах
+from concurrent.futures import ThreadPoolExecutor  # Параллельный синтез субтитров
+import numpy as np
+from tts_normalizer import TextNormalizer, get_fraction_word  # Предобработка текста
+from tts_dictionary import CompiledDictionary, open_dictionary  # Словарь произношения
+from tts_subtitles import iter_subtitles, parse_subtitles, parse_time  # SRT, WebVTT, ASS
+from tts_script import split_speakers, cue_speakers, batch_by_speaker  # Разметка голосов [speaker=N]
+from tts_cache import SegmentCache  # Кэш синтезированных фрагментов
+from tts_timing import NO_TIMER  # Замеры времени по этапам
+from tts_segmenter import Segmenter, CostModel  # Разбиение на фрагменты
+from tts_dsp import condition, DSP_VERSION, DEFAULT_LOUDNESS_DB  # Обрезка тишины, громкость и темп без pydub
+from tts_audio import (SAMPLE_RATE, silence, duration_seconds, join_pcm, fit_segment, open_writer, read_wav, write_wav,
+                       wav_bytes_to_pcm, pcm_to_wav_bytes)  # PCM в памяти
+
+DEFAULT_MODEL = "vosk-model-tts-ru-0.9-multi"
+DEFAULT_DICT_FILE = "pronunciation_dict.txt"
+PAUSE_MARK = "<pause>"  # Разметка явной паузы в тексте
+# Паузы после фрагмента по его последнему знаку, мс; "" — другой знак, "pause" — после <pause>.
+# Тишину по краям, которую оставляет модель, движок обрезает, поэтому паузы задаются только здесь
+PAUSES_MS = {".": 400, "!": 400, "?": 400, "…": 550, ";": 300, ":": 300, ",": 200, "-": 250, "": 250, "pause": 500}
+
+
+def log_message(message):
+    print(f"[{datetime.datetime.now()}] {message}")
+
+
+def set_session_threads(model, intra_op_threads=0, inter_op_threads=0):
+    # vosk_tts создаёт сессии onnxruntime с настройками по умолчанию и не даёт передать свои:
+    # сессии модели пересоздаются с заданным числом потоков (0 — оставить как есть)
+    if not intra_op_threads and not inter_op_threads:
+        return 0
+    try:
+        import onnxruntime
+    except ImportError:
+        return 0  # Синтезатор не на onnxruntime
+    replaced = 0
+    for name, session in list(vars(model).items()):
+        if not isinstance(session, onnxruntime.InferenceSession):
+            continue
+        source = getattr(session, "_model_path", None) or getattr(session, "_model_bytes", None)
+        if source is None:
+            continue
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads:
+            # Потоки между операциями используются только в параллельном режиме
+            options.inter_op_num_threads = inter_op_threads
+            options.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
+        setattr(model, name, onnxruntime.InferenceSession(source, sess_options=options, providers=session.get_providers()))
+        replaced += 1
+    return replaced
+
+
+class TTSEngine:
+    """Синтез речи без GUI: предобработка текста, разбор SRT, сборка аудио.
+
+    Модель загружается один раз при создании объекта: по имени или из
+    каталога model_path, с заданным числом потоков onnxruntime. Вместо готового
+    синтезатора можно передать свой объект с методом synth(text, wav, speaker_id).
+    Готовые фрагменты кэшируются на диске (cache), кэш можно отключить
+    через cache.enabled = False.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, dict_file=DEFAULT_DICT_FILE, synth=None, cache=None,
+                 model_path=None, intra_op_threads=0, inter_op_threads=0, trim_silence=True,
+                 loudness_dbfs=DEFAULT_LOUDNESS_DB, pauses=None):
+        # Модель из каталога на диске называется по имени каталога: так же она входит в ключ кэша
+        self.model_name = os.path.basename(os.path.normpath(model_path)) if model_path else model_name
+        if synth is None:
+            from vosk_tts import Model, Synth  # Импорт при первой загрузке модели
+            self.model = Model(model_path=model_path) if model_path else Model(model_name=model_name)
+            set_session_threads(self.model, intra_op_threads, inter_op_threads)
+            synth = Synth(self.model)
+        self.synth = synth
+
+        # Пользовательский словарь (загружаем из дефолтного файла)
+        self.dict_file = dict_file
+        self.set_dictionary(self.load_dictionary(dict_file) if dict_file else {})
+
+        self.cache = cache if cache is not None else SegmentCache()
+
+        # Обработка фрагмента после модели: обрезка тишины по краям и выравнивание
+        # громкости (None — не менять); паузы между фрагментами — по знакам препинания
+        self.trim_silence = trim_silence
+        self.loudness_dbfs = loudness_dbfs
+        self.pauses = {**PAUSES_MS, **(pauses or {})}
+
+        # Длина фрагментов подбирается по замерам скорости модели (python tts_segmenter.py)
+        self.segmenter = Segmenter(CostModel.load(self.model_name))
+
+        # Фрагменты последнего текста из GUI для повторного синтеза после правки
+        self.last_render = {"params": None, "segments": {}}
+        self.last_render_stats = {"chunks": 0, "reused": 0}
+
+        self.max_speed = 2.0  # Максимальное ускорение для обычного текста
+        self.max_speed_srt = 1.4  # Максимальное ускорение для SRT
+        self.srt_workers = os.cpu_count() or 1  # Потоков для синтеза субтитров
+        self.text_workers = os.cpu_count() or 1  # Потоков для синтеза фрагментов одного текста
+        self.srt_max_lead = 0.3  # На сколько секунд реплика может начаться раньше субтитра
+
+    def speaker_count(self):
+        # Число голосов из config.json модели (num_speakers или speaker_id_map, как у piper);
+        # None — неизвестно (свой синтезатор или модель без этих полей)
+        config = getattr(getattr(self, "model", None), "config", None)
+        if not isinstance(config, dict):
+            return None
+        if config.get("num_speakers"):
+            return int(config["num_speakers"])
+        if config.get("speaker_id_map"):
+            return len(config["speaker_id_map"])
+        return None
+
+    def load_dictionary(self, file_path):
+        # Скомпилированный словарь (tts_dictionary): пересобирается, только если файл изменился
+        if os.path.exists(file_path):
+            return open_dictionary(file_path)
+        return {}
+
+    def set_dictionary(self, dictionary):
+        # Версия словаря входит в ключ кэша: после правки словаря старые фрагменты не используются.
+        # Нормализатор пересобирается только здесь, а не на каждый вызов синтеза
+        self.pronunciation_dict = dictionary
+        self.normalizer = TextNormalizer(dictionary)
+        if isinstance(dictionary, CompiledDictionary):
+            self.dict_version = dictionary.version
+            return
+        digest = hashlib.sha1()
+        for k, v in dictionary.items():
+            digest.update(f"{k}\x1f{v}\x1e".encode("utf-8"))
+        self.dict_version = digest.hexdigest()
+
+    def save_dictionary(self, file_path, dictionary):
+        with open(file_path, "w", encoding="utf-8") as f:
+            for k, v in dictionary.items():
+                f.write(f"{k}: {v}\n")
+
+    def apply_dictionary_and_numbers(self, text):
+        # Очистка, транслитерация, числа и словарь (см. TextNormalizer)
+        return self.normalizer.normalize(text)
+
+    def transliterate_latin(self, text):
+        return self.normalizer.transliterate_latin(text)
+
+    def convert_numbers_to_words(self, text):
+        return self.normalizer.convert_numbers_to_words(text)
+
+    def get_fraction_word(self, digits):
+        return get_fraction_word(digits)
+
+    def clean_text_only(self, text):
+        # Расширенная очистка для попытки 2
+        return self.normalizer.clean(text)
+
+    def split_chunks(self, text):
+        # Нормализованный текст абзаца -> фрагменты по границам предложений (см. Segmenter)
+        return self.segmenter.split(text)
+
+    def prepare_chunks(self, text, timer=NO_TIMER):
+        return self.prepare_script(text, None, timer)[0]
+
+    def prepare_script(self, text, speaker_id, timer=NO_TIMER):
+        # Предобработка и разбиение текста на фрагменты для синтеза: (фрагменты, голос каждого).
+        # Абзацы (строки) обрабатываются по отдельности, последний фрагмент абзаца заканчивается на \n.
+        # Метки [speaker=N] и <pause> делят абзац до предобработки (иначе разметка попала бы
+        # в текст для модели), фрагмент перед <pause> заканчивается на PAUSE_MARK
+        chunks = []
+        speakers = []
+        for paragraph in text.splitlines():
+            paragraph_chunks = []
+            for speaker_id, voiced in split_speakers(paragraph, speaker_id):
+                pieces = voiced.split(PAUSE_MARK)
+                for n, piece in enumerate(pieces):
+                    with timer.stage("normalize"):
+                        piece = self.apply_dictionary_and_numbers(piece)
+                    with timer.stage("split"):
+                        parts = self.split_chunks(piece)
+                    if parts and n < len(pieces) - 1:
+                        parts[-1] += PAUSE_MARK
+                    paragraph_chunks.extend(parts)
+                    speakers.extend([speaker_id] * len(parts))
+            if paragraph_chunks:
+                paragraph_chunks[-1] += "\n"
+                chunks.extend(paragraph_chunks)
+        return chunks, speakers
+
+    def pause_after(self, chunk, long_pause_ms=1000):
+        # Пауза после фрагмента, мс: конец абзаца — long_pause_ms, <pause> — pauses["pause"],
+        # иначе по последнему знаку препинания
+        if chunk.endswith("\n"):
+            return long_pause_ms
+        if chunk.endswith(PAUSE_MARK):
+            return self.pauses["pause"]
+        chunk = chunk.rstrip().rstrip('"»”)')
+        mark = "…" if chunk.endswith("...") else chunk[-1:]
+        return self.pauses.get(mark, self.pauses[""])
+
+    def with_pauses(self, chunks, i, segment, long_pause_ms=1000, timer=NO_TIMER):
+        # Фрагмент i вместе с паузой после него; после последнего фрагмента паузы нет
+        pause_ms = self.pause_after(chunks[i], long_pause_ms) if i < len(chunks) - 1 else 0
+        if not pause_ms:
+            return segment
+        with timer.stage("concat"):
+            return join_pcm([segment, silence(pause_ms)])
+
+    def segment_version(self):
+        # Всё, что меняет звук фрагмента после модели: входит в ключ кэша
+        return f"{DSP_VERSION}:{int(self.trim_silence)}:{self.loudness_dbfs}"
+
+    def iter_segments(self, chunks, speaker_id, speed_factor=1.0, start=0, token=None, timer=NO_TIMER, workers=None, known=None,
+                      speakers=None):
+        # Генератор (i, текст, фрагмент, взят ли готовым) по непустым фрагментам с номера start,
+        # строго по порядку. speakers — голос каждого фрагмента (см. prepare_script), иначе у всех
+        # speaker_id. Фрагменты синтезируются наперёд в workers потоках с общей моделью (окно
+        # workers * 2): окно дополняется пачкой, когда впереди остаётся не больше workers
+        # фрагментов, и пачка запускается по голосам подряд. Результат от числа потоков не зависит.
+        # known — словарь (голос, текст) -> готовый фрагмент: из него берутся повторы, туда же
+        # добавляются новые (None — не запоминать)
+        workers = max(1, workers or self.text_workers)
+        window = workers * 2
+        texts = [chunk.replace(PAUSE_MARK, "").strip() for chunk in chunks]
+        voices = speakers or [speaker_id] * len(chunks)
+        order = [i for i in range(start, len(chunks)) if texts[i]]
+
+        def task(i):
+            if token:
+                token.check()
+            with timer.item("chunk", i, len(texts[i])) as record:
+                record["speaker"] = voices[i]
+                segment = self.synth_segment(texts[i], voices[i], speed_factor, timer)
+                record["audio_s"] = duration_seconds(segment)
+            return segment
+
+        pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 and len(order) > 1 else None
+        pending = {}
+        submitted = 0  # Сколько позиций order уже просмотрено для запуска
+        try:
+            for n, i in enumerate(order):
+                if token:
+                    token.check()
+                if pool and submitted - n <= workers:
+                    for ahead in batch_by_speaker(order[submitted:n + window], lambda j: voices[j]):
+                        key = (voices[ahead], texts[ahead])
+                        if key not in pending and (known is None or key not in known):
+                            pending[key] = pool.submit(task, ahead)
+                    submitted = max(submitted, n + window)
+                text = texts[i]
+                key = (voices[i], text)
+                if known is not None and key in known:
+                    segment = known[key]
+                    with timer.item("chunk", i, len(text)) as record:
+                        record["reused"] = True
+                        record["audio_s"] = duration_seconds(segment)
+                    yield i, text, segment, True
+                    continue
+                future = pending.pop(key, None)
+                segment = future.result() if future else task(i)
+                if known is not None:
+                    known[key] = segment
+                yield i, text, segment, False
+        finally:
+            if pool:
+                # Отмена, ошибка или потребитель перестал читать: не запускать оставшиеся
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    def iter_text_pcm(self, text, speaker_id, speed_factor=1.0, long_pause_ms=1000, incremental=False, token=None, timer=NO_TIMER,
+                      workers=None):
+        # Генератор: по одному буферу на фрагмент (речь + паузы после него)
+        # вместе с общим числом фрагментов, для потокового воспроизведения.
+        # incremental=True: фрагменты, не изменившиеся с прошлого такого запуска
+        # (те же текст, голос, скорость, модель и словарь), берутся из памяти без синтеза.
+        # Голос — у каждого фрагмента: speaker_id, пока разметка [speaker=N] не задала другой.
+        # token (CancelToken) проверяется перед каждым фрагментом, timer (StageTimer) замеряет этапы,
+        # workers — потоков синтеза (см. iter_segments)
+        params = (speed_factor, self.model_name, self.dict_version, self.segment_version())
+        # Без incremental готовые фрагменты не запоминаются: память не растёт с длиной текста
+        previous = self.last_render["segments"] if incremental and self.last_render["params"] == params else {}
+        known = dict(previous) if incremental else None
+        rendered = {}
+        reused = 0
+        completed = False
+        chunks, speakers = self.prepare_script(text, speaker_id, timer)
+        try:
+            for i, chunk, segment, was_reused in self.iter_segments(chunks, speaker_id, speed_factor, token=token, timer=timer,
+                                                                    workers=workers, known=known, speakers=speakers):
+                reused += was_reused
+                if incremental:
+                    rendered[(speakers[i], chunk)] = segment
+                yield self.with_pauses(chunks, i, segment, long_pause_ms, timer), len(chunks)
+            completed = True
+        finally:
+            if incremental:
+                # При прерывании сохраняем и прежние фрагменты, чтобы не терять их при повторе
+                segments = rendered if completed else {**previous, **rendered}
+                self.last_render = {"params": params, "segments": segments}
+                self.last_render_stats = {"chunks": len(chunks), "reused": reused}
+
+    def synth_text_to_pcm(self, text, speaker_id, speed_factor=1.0, long_pause_ms=1000, incremental=False, token=None, progress=None,
+                          timer=NO_TIMER, workers=None):
+        # Фрагменты и паузы собираются в список и склеиваются один раз в конце
+        parts = []
+        for pcm, total in self.iter_text_pcm(text, speaker_id, speed_factor, long_pause_ms, incremental, token, timer, workers):
+            parts.append(pcm)
+            if progress:
+                progress(len(parts), total)
+        with timer.stage("concat"):
+            return join_pcm(parts)
+
+    def synth_text_to_wav(self, text, output_file, speaker_id, speed_factor=1.0):
+        write_wav(output_file, self.synth_text_to_pcm(text, speaker_id, speed_factor))
+
+    def synth_raw(self, text, speaker_id):
+        # Синтез без временного файла, если модель это умеет (vosk-tts >= 0.3)
+        if hasattr(self.synth, "synth_audio"):
+            audio = self.synth.synth_audio(text, speaker_id=speaker_id)
+            return np.asarray(audio, dtype=np.int16).reshape(-1)
+        temp_out = tempfile.mktemp(suffix=".wav")
+        try:
+            self.synth.synth(text, temp_out, speaker_id=speaker_id)
+            return read_wav(temp_out)
+        finally:
+            if os.path.exists(temp_out):
+                os.remove(temp_out)
+
+    def synth_segment(self, chunk, speaker_id, speed_factor=1.0, timer=NO_TIMER):
+        # Синтез одного фрагмента с учётом скорости; повторные фрагменты берутся из кэша
+        key = self.cache.make_key(chunk, speaker_id, speed_factor, self.model_name, self.dict_version, self.segment_version())
+        with timer.stage("cache"):
+            data = self.cache.get(key)
+        if data is not None:
+            with timer.stage("decode"):
+                return wav_bytes_to_pcm(data)
+
+        with timer.stage("synth"):
+            pcm = self.synth_raw(chunk, speaker_id)
+        # Обрезка тишины модели, громкость и темп (без смены высоты тона) за один проход
+        with timer.stage("dsp"):
+            pcm = self.condition(pcm, speed_factor)
+
+        with timer.stage("cache"):
+            self.cache.put(key, pcm_to_wav_bytes(pcm))
+        return pcm
+
+    def condition(self, pcm, speed_factor=1.0):
+        return condition(pcm, speed_factor, self.trim_silence, self.loudness_dbfs)
+
+    def synth_text_to_file(self, text, output_file, speaker_id, speed_factor=1.0, format="wav", incremental=False, token=None, progress=None,
+                           timer=NO_TIMER, gain=1.0, workers=None):
+        # Каждый фрагмент сразу пишется в файл (WAV напрямую, MP3 через один процесс ffmpeg),
+        # поэтому память не растёт с длиной текста. При ошибке или отмене файл удаляется.
+        # Вместо имени файла можно передать приёмник PCMSink (см. tts_audio). gain — громкость (1.0 — без изменений)
+        with open_writer(output_file, format, gain=gain) as writer:
+            for done, (pcm, total) in enumerate(self.iter_text_pcm(text, speaker_id, speed_factor, incremental=incremental, token=token,
+                                                                   timer=timer, workers=workers), 1):
+                with timer.stage("export"):
+                    writer.write(pcm)
+                if progress:
+                    progress(done, total)
+            with timer.stage("export"):
+                writer.close()
+
+    def synth_cue(self, text, speaker_id, speed_factor=1.0, log=log_message, timer=NO_TIMER):
+        # Синтез одного субтитра; None, если обе попытки не удались
+        try:
+            # Попытка 1: Полная предобработка (без пауз абзацев, между предложениями — по знакам)
+            # Субтитры и так синтезируются параллельно: внутри реплики — один поток
+            return self.synth_text_to_pcm(text, speaker_id, speed_factor, long_pause_ms=0, timer=timer, workers=1)
+        except Exception:
+            log(f"Полная предобработка failed для {text}: {traceback.format_exc()}")
+        try:
+            # Попытка 2: Только очистка
+            with timer.stage("normalize"):
+                cleaned_text = self.clean_text_only(text)
+            with timer.stage("synth"):
+                pcm = self.synth_raw(cleaned_text, speaker_id)
+            with timer.stage("dsp"):
+                return self.condition(pcm)
+        except Exception:
+            log(f"Пропущен субтитр: {text} из-за ошибки: {traceback.format_exc()}")
+            return None
+
+    def synth_srt(self, subtitles, output_file, speaker_id, initial_speed=1.0, format="wav", progress=None, log=log_message,
+                  workers=None, token=None, confirm_export=None, timer=NO_TIMER, gain=1.0):
+        # Субтитры синтезируются параллельно (workers потоков с общей моделью), а
+        # подгоняются и пишутся в файл строго по порядку, как только готов очередной:
+        # в памяти только окно из нескольких субтитров. progress(done, total)
+        # вызывается после записи каждого. token (CancelToken) проверяется перед
+        # каждым субтитром. confirm_export(skipped, total) может отменить
+        # сохранение, вернув False. timer (StageTimer) замеряет этапы по каждому
+        # субтитру. Возвращает словарь со скоростью, числом пропусков, признаком,
+        # уложилось ли аудио в тайминг SRT, и сводкой замеров.
+        # Метка [speaker=N] в тексте субтитра задаёт голос этого и следующих субтитров
+        total_subs = len(subtitles)
+        workers = max(1, workers or self.srt_workers)
+        window = workers * 2  # Сколько субтитров синтезируется наперёд
+        cues = cue_speakers(subtitles, speaker_id)
+
+        def task(idx):
+            if token:
+                token.check()
+            text = " ".join(piece for _, piece in cues[idx])
+            log(f"Обработка субтитра {idx+1}/{total_subs}: {text}")
+            with timer.item("cue", idx, len(text)) as record:
+                segments = [self.synth_cue(piece, speaker, initial_speed, log, timer) for speaker, piece in cues[idx]]
+                # Несколько голосов в одном субтитре звучат подряд; не удался хоть один — субтитр пропущен
+                if not segments or any(segment is None for segment in segments):
+                    segment = None
+                else:
+                    segment = segments[0] if len(segments) == 1 else join_pcm(segments)
+                record["audio_s"] = duration_seconds(segment) if segment is not None else 0.0
+            return segment
+
+        def voice(idx):
+            return cues[idx][0][0] if cues[idx] else speaker_id
+
+        # Подгонка по каждому субтитру: сначала тишина вокруг, затем ускорение только тех,
+        # кто не помещается до начала следующего (не больше max_speed_srt с учётом начальной скорости)
+        starts = [int(round(start * SAMPLE_RATE)) for start, _, _ in subtitles]
+        max_factor = max(1.0, self.max_speed_srt / initial_speed)
+        max_lead = int(self.srt_max_lead * SAMPLE_RATE)
+        skipped = 0
+        stretched = 0
+        max_applied = 1.0
+        report = []
+
+        log(f"Синтез и запись в {output_file} (формат: {format})...")
+        with open_writer(output_file, format, gain=gain) as writer, ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            submitted = 0
+            try:
+                for idx in range(total_subs):
+                    if submitted - idx <= workers:
+                        # Окно дополняется пачкой, субтитры одного голоса в ней запускаются подряд
+                        for ahead in batch_by_speaker(list(range(submitted, min(idx + window, total_subs))), voice):
+                            futures[ahead] = pool.submit(task, ahead)
+                        submitted = max(submitted, min(idx + window, total_subs))
+                    segment = futures.pop(idx).result()
+                    if segment is None:
+                        # Интервал пропущенного субтитра остаётся тишиной на дорожке
+                        skipped += 1
+                        segment = silence(0)
+
+                    window_end = starts[idx + 1] if idx + 1 < total_subs else int(round(subtitles[idx][1] * SAMPLE_RATE))
+                    with timer.stage("fit"):
+                        position, segment, factor, overflow = fit_segment(segment, starts[idx], window_end, writer.samples, max_factor, max_lead)
+                    with timer.stage("export"):
+                        writer.write_silence(position - writer.samples)
+                        writer.write(segment)
+                    if factor > 1.0:
+                        stretched += 1
+                        max_applied = max(max_applied, factor)
+                    if overflow > 0:
+                        report.append((idx, overflow, factor))
+
+                    if progress:
+                        progress(idx + 1, total_subs)
+
+                # Проверка combined
+                if skipped == total_subs:
+                    raise ValueError("Аудио пустое (все субтитры пропущены).")
+
+                # Проверка на большое количество пропусков
+                if confirm_export and not confirm_export(skipped, total_subs):
+                    raise ValueError("Сохранение отменено пользователем")
+
+                # Дорожка не короче тайминга SRT
+                with timer.stage("export"):
+                    writer.write_silence(int(round(subtitles[-1][1] * SAMPLE_RATE)) - writer.samples)
+                if token:
+                    token.check()
+                with timer.stage("export"):
+                    writer.close()
+            except BaseException:
+                # Отмена или ошибка: не запускать оставшиеся субтитры
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+            duration = writer.samples / SAMPLE_RATE
+        log("Экспорт завершён.")
+
+        overflow = [{
+            "index": idx + 1,
+            "start": subtitles[idx][0],
+            "text": subtitles[idx][2],
+            "overflow_seconds": round(samples / SAMPLE_RATE, 3),
+            "speed": round(initial_speed * factor, 3),
+        } for idx, samples, factor in report]
+        for item in overflow:
+            log(f"Субтитр {item['index']} не уложился на {item['overflow_seconds']} с при {item['speed']}x: {item['text']}")
+
+        return {
+            "speed_factor": initial_speed * max_applied,
+            "skipped": skipped,
+            "total": total_subs,
+            "fits": not overflow,
+            "stretched": stretched,
+            "overflow": overflow,
+            "duration": round(duration, 3),
+            "srt_duration": subtitles[-1][1],
+            "timing": timer.summary() if timer.enabled else None,
+        }
+
+    def parse_srt(self, file_path, log=log_message):
+        # SRT, WebVTT или ASS/SSA: кодировка определяется по началу файла (см. parse_subtitles).
+        # Испорченные субтитры пропускаются с сообщением в log (номер строки и причина)
+        problems = []
+        subtitles = parse_subtitles(file_path, problems)
+        for line, message in problems:
+            log(f"{os.path.basename(file_path)}, строка {line}: {message}")
+        return subtitles
+
+    def parse_srt_text(self, text, log=log_message):
+        return self.parse_srt_lines(text.splitlines(), log)
+
+    def parse_srt_lines(self, lines, log=log_message):
+        problems = []
+        subtitles = sorted(iter_subtitles(lines, problems), key=lambda cue: cue[0])
+        for line, message in problems:
+            log(f"Строка {line}: {message}")
+        return subtitles
+
+    def time_to_seconds(self, time_str):
+        return parse_time(time_str)
@@ -0,0 +1,184 @@
+import collections
+import heapq
+import itertools
+import json
+import threading
+import traceback
+
+from tts_timing import StageTimer
+
+PRIORITY_INTERACTIVE = 0  # Проигрывание: короткие задачи, нужны сразу
+PRIORITY_BATCH = 10  # Сохранение в файл, SRT: длинные задачи
+PRIORITY_BACKGROUND = 20  # Фоновая подготовка (образцы голосов): когда больше нечего делать
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """Флаг отмены, который синтез проверяет между фрагментами и субтитрами."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback):
+        # callback вызывается при отмене (сразу, если отмена уже была)
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def check(self):
+        if self._event.is_set():
+            raise JobCancelled("Задача отменена")
+
+
+class Job:
+    def __init__(self, job_id, name, func, priority, timing_log=None):
+        self.id = job_id
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.token = CancelToken()
+        self.status = "queued"  # queued, running, done, cancelled, error
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.traceback = None
+        self.on_done = None
+        self.timer = StageTimer(name, log=timing_log)  # Замеры по этапам, передаются в синтез
+
+    def set_progress(self, done, total=1):
+        self.progress = min(1.0, done / total) if total else 0.0
+
+    def cancel(self):
+        self.token.cancel()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "cancelled", "error")
+
+
+class JobScheduler:
+    """Очередь задач синтеза с ограниченным числом рабочих потоков.
+
+    Задачи выбираются по приоритету (меньше — раньше), при равном — по
+    порядку постановки. Если потоков больше одного, длинные задачи
+    (PRIORITY_BATCH) занимают не больше workers - 1 потоков, чтобы
+    проигрывание не ждало окончания экспорта; фоновые (PRIORITY_BACKGROUND)
+    ограничены так же и в историю не попадают. func(job) получает задачу и
+    должна проверять job.token; on_done(job) вызывается из рабочего потока.
+    timing_log получает JSON-строки замеров (job.timer) всех задач,
+    history хранит последние завершённые задачи со сводками замеров.
+    """
+
+    def __init__(self, workers=2, timing_log=None):
+        self.workers = max(1, workers)
+        self.timing_log = timing_log
+        self.max_batch = self.workers - 1 if self.workers > 1 else 1
+        self.jobs = []
+        self.history = collections.deque(maxlen=20)
+        self._heap = []
+        self._ids = itertools.count(1)
+        self._running_batch = 0
+        self._cond = threading.Condition()
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, name, func, priority=PRIORITY_BATCH, on_done=None):
+        job = Job(next(self._ids), name, func, priority, self.timing_log)
+        job.on_done = on_done
+        with self._cond:
+            self.jobs.append(job)
+            heapq.heappush(self._heap, (priority, job.id, job))
+            self._cond.notify_all()
+        return job
+
+    def cancel(self, priority=None):
+        # Отмена всех незавершённых задач (или только задач с данным приоритетом)
+        with self._cond:
+            jobs = [job for job in self.jobs if not job.finished and (priority is None or job.priority == priority)]
+        for job in jobs:
+            job.cancel()
+        return jobs
+
+    def active(self):
+        with self._cond:
+            return [job for job in self.jobs if not job.finished]
+
+    def _next_job(self):
+        # Вызывается под self._cond: первая задача, которую можно запустить сейчас
+        skipped = []
+        job = None
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            candidate = item[2]
+            if candidate.priority >= PRIORITY_BATCH and self._running_batch >= self.max_batch:
+                skipped.append(item)
+                continue
+            job = candidate
+            break
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                batch = job.priority >= PRIORITY_BATCH
+                if batch:
+                    self._running_batch += 1
+            self._run(job)
+            with self._cond:
+                if batch:
+                    self._running_batch -= 1
+                # Завершённые задачи не копятся
+                self.jobs = [j for j in self.jobs if not j.finished]
+                self._cond.notify_all()
+
+    def _run(self, job):
+        if job.token.cancelled:
+            job.status = "cancelled"
+        else:
+            job.status = "running"
+            try:
+                job.result = job.func(job)
+                job.status = "cancelled" if job.token.cancelled else "done"
+            except JobCancelled:
+                job.status = "cancelled"
+            except Exception as e:
+                job.error = e
+                job.traceback = traceback.format_exc()
+                job.status = "error"
+        job.timer.finish()
+        if job.priority < PRIORITY_BACKGROUND:
+            self.history.append(job)
+        if self.timing_log and job.timer.items:
+            self.timing_log(json.dumps(dict(job.timer.summary(), event="job", status=job.status), ensure_ascii=False))
+        if job.on_done:
+            try:
+                job.on_done(job)
+            except Exception:
+                traceback.print_exc()
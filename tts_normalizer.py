@@ -0,0 +1,137 @@
+import re
+import string
+import unicodedata
+
+# Управляющие символы (Cc), кроме printable (\t, \n, \r, \x0b, \x0c), удаляются
+_CONTROL = {i: None for i in list(range(0x00, 0x20)) + list(range(0x7f, 0xa0)) if chr(i) not in string.printable}
+
+# Очистка: скобки удаляются, тире -> дефис, кавычки -> пробел, многоточие, ё -> е
+_CLEAN = dict(_CONTROL)
+_CLEAN.update(str.maketrans({c: None for c in "[]{}()"}))
+_CLEAN.update(str.maketrans({'–': '-', '—': '-', '−': '-',
+                             '«': ' ', '»': ' ', '"': ' ', '‘': ' ', '’': ' ', "'": ' ',
+                             '…': '...', 'ё': 'е'}))
+
+# Базовая транслитерация латинского/английского текста
+TRANSLIT_MAP = {
+    'a': 'а', 'b': 'б', 'c': 'к', 'd': 'д', 'e': 'е', 'f': 'ф', 'g': 'г', 'h': 'х', 'i': 'и', 'j': 'й',
+    'k': 'к', 'l': 'л', 'm': 'м', 'n': 'н', 'o': 'о', 'p': 'п', 'q': 'к', 'r': 'р', 's': 'с', 't': 'т',
+    'u': 'у', 'v': 'в', 'w': 'в', 'x': 'кс', 'y': 'й', 'z': 'з',
+    'A': 'А', 'B': 'Б', 'C': 'К', 'D': 'Д', 'E': 'Е', 'F': 'Ф', 'G': 'Г', 'H': 'Х', 'I': 'И', 'J': 'Й',
+    'K': 'К', 'L': 'Л', 'M': 'М', 'N': 'Н', 'O': 'О', 'P': 'П', 'Q': 'К', 'R': 'Р', 'S': 'С', 'T': 'Т',
+    'U': 'У', 'V': 'В', 'W': 'В', 'X': 'Кс', 'Y': 'Й', 'Z': 'З'
+}
+_TRANSLIT = str.maketrans(TRANSLIT_MAP)
+# Очистка и транслитерация не пересекаются по символам, поэтому их можно сделать одной таблицей
+_CLEAN_TRANSLIT = dict(_CLEAN)
+_CLEAN_TRANSLIT.update(_TRANSLIT)
+
+_NEWLINES_RE = re.compile(r'[\r\n]+')
+_FRACTION_RE = re.compile(r'(\d+)/(\d+)')
+_PERCENT_RE = re.compile(r'(\d+)\s*%')
+_DECIMAL_RE = re.compile(r'(\d+)[.,](\d+)')
+_NUMBER_RE = re.compile(r'\b(\d+)\b')
+_CURRENCY_RE = re.compile(r'(\d+) руб\.')
+
+_END = ""  # Метка конца ключа в узле префиксного дерева
+
+
+def get_fraction_word(digits):
+    if digits == 1: return "десятых"
+    elif digits == 2: return "сотых"
+    elif digits == 3: return "тысячных"
+    return "долей"
+
+
+def _trie_pattern(node):
+    # Регулярка из префиксного дерева: в каждом узле ветвление по следующему символу,
+    # продолжение после конца ключа необязательное и жадное — берётся самое длинное совпадение
+    alternatives = []
+    chars = []
+    for c, child in sorted((c, child) for c, child in node.items() if c != _END):
+        rest = _trie_pattern(child)
+        if rest:
+            alternatives.append(re.escape(c) + rest)
+        else:
+            chars.append(re.escape(c))
+    if chars:
+        alternatives.append(chars[0] if len(chars) == 1 else "[" + "".join(chars) + "]")
+    if not alternatives:
+        return ""
+    pattern = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+    if _END in node:
+        if len(alternatives) == 1 and not pattern.startswith("(?:"):
+            pattern = "(?:" + pattern + ")"
+        pattern += "?"
+    return pattern
+
+
+class DictionaryMatcher:
+    """Замена по словарю произношения за один проход по тексту.
+
+    Ключи собираются в префиксное дерево, из которого строится одна
+    регулярка: в каждой позиции берётся самое длинное совпадение, а
+    результат замены повторно не просматривается.
+    """
+
+    def __init__(self, dictionary):
+        self.dictionary = {key: value for key, value in dictionary.items() if key}
+        root = {}
+        for key in self.dictionary:
+            node = root
+            for c in key:
+                node = node.setdefault(c, {})
+            node[_END] = True
+        pattern = _trie_pattern(root)
+        self._regex = re.compile(pattern) if pattern else None
+
+    def replace(self, text):
+        if self._regex is None:
+            return text
+        dictionary = self.dictionary
+        return self._regex.sub(lambda m: dictionary[m.group(0)], text)
+
+
+class TextNormalizer:
+    """Предобработка текста перед синтезом, собирается один раз на версию словаря.
+
+    Все посимвольные замены (очистка и транслитерация) сведены в таблицы
+    для str.translate, регулярки скомпилированы заранее, словарь
+    применяется через DictionaryMatcher. Скомпилированный словарь
+    (tts_dictionary.CompiledDictionary) заменяет сам, без сборки регулярки.
+    """
+
+    def __init__(self, dictionary=None):
+        if hasattr(dictionary, "replace"):
+            self.matcher = dictionary
+        else:
+            self.matcher = DictionaryMatcher(dictionary or {})
+
+    def clean(self, text):
+        # Расширенная очистка: нормализация, удаление управляющих символов и скобок, замена тире/кавычек
+        text = unicodedata.normalize('NFKC', text).translate(_CLEAN)
+        return _NEWLINES_RE.sub(' ', text)
+
+    def transliterate_latin(self, text):
+        return text.translate(_TRANSLIT)
+
+    def convert_numbers_to_words(self, text):
+        from num2words import num2words  # Импорт при первом использовании
+        # Дроби (1/2 -> одна вторая)
+        text = _FRACTION_RE.sub(lambda m: f"{num2words(int(m.group(1)), lang='ru')} {num2words(int(m.group(2)), lang='ru', to='ordinal')}", text)
+        # Проценты (50% или 50 % -> пятьдесят процентов)
+        text = _PERCENT_RE.sub(lambda m: f"{num2words(int(m.group(1)), lang='ru')} процентов", text)
+        # Десятичные с точкой или запятой (3.14 или 1,9 -> три целых четырнадцать сотых)
+        text = _DECIMAL_RE.sub(lambda m: f"{num2words(int(m.group(1)), lang='ru')} целых {num2words(int(m.group(2)), lang='ru')} {get_fraction_word(len(m.group(2)))}", text)
+        # Простые числа (123 -> сто двадцать три)
+        text = _NUMBER_RE.sub(lambda m: num2words(int(m.group(1)), lang='ru'), text)
+        # Валюта (100 руб. -> сто рублей)
+        text = _CURRENCY_RE.sub(lambda m: f"{num2words(int(m.group(1)), lang='ru')} рублей", text)
+        return text
+
+    def normalize(self, text):
+        # Очистка и транслитерация одной таблицей, затем числа и словарь
+        text = unicodedata.normalize('NFKC', text).translate(_CLEAN_TRANSLIT)
+        text = _NEWLINES_RE.sub(' ', text)
+        text = self.convert_numbers_to_words(text)
+        return self.matcher.replace(text)
@@ -0,0 +1,130 @@
+import queue
+import time
+from collections import deque
+from threading import Thread, Event
+
+import numpy as np
+import pygame  # Для воспроизведения
+
+from tts_audio import SAMPLE_RATE
+from tts_dsp import process
+
+_DONE = object()
+
+
+def to_sound(pcm, volume=1.0):
+    # Частота микшера и громкость — одним проходом (громкость та же, что при экспорте)
+    frequency, _, channels = pygame.mixer.get_init()
+    pcm = process(pcm, gain=volume, src_rate=SAMPLE_RATE, dst_rate=frequency)
+    if channels > 1:
+        pcm = np.repeat(pcm[:, None], channels, axis=1)
+    return pygame.mixer.Sound(buffer=np.ascontiguousarray(pcm).tobytes())
+
+
+def play_preview(pcm, volume=1.0):
+    # Короткий звук целиком (образец голоса); прерывает прежний образец, но не проигрывание текста:
+    # у образцов последний канал микшера, а find_channel отдаёт первый свободный
+    channel = pygame.mixer.Channel(pygame.mixer.get_num_channels() - 1)
+    channel.play(to_sound(pcm, volume))
+
+
+class StreamPlayer:
+    """Потоковое воспроизведение: синтез и проигрывание идут одновременно.
+
+    Поток-производитель забирает готовые буферы из генератора
+    (engine.iter_text_pcm) и кладёт их в ограниченную очередь, а play()
+    подаёт их в канал pygame, держа в канале не больше двух буферов
+    (текущий и следующий). Проигранные фрагменты считаются по концу буфера
+    в канале; внутри текущего буфера pygame позицию не сообщает, поэтому она
+    оценивается по времени с начала буфера и не выходит за его длину: ошибка
+    оценки не накапливается от фрагмента к фрагменту.
+    """
+
+    def __init__(self, max_buffered=4, poll_interval=0.02):
+        self.max_buffered = max_buffered
+        self.poll_interval = poll_interval
+        self._stop = Event()
+        self.playing = False
+
+    def stop(self):
+        self._stop.set()
+
+    def _produce(self, buffers, pending):
+        try:
+            for pcm, total in buffers:
+                while not self._stop.is_set():
+                    try:
+                        pending.put((pcm, total), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if self._stop.is_set():
+                    break
+        except Exception as e:
+            pending.put(e)
+            return
+        pending.put(_DONE)
+
+    def play(self, buffers, volume=1.0, on_progress=None):
+        # buffers — итератор пар (pcm, всего фрагментов); on_progress(доля 0..1)
+        # Блокирует до конца воспроизведения или stop(); ошибки синтеза пробрасываются
+        self._stop.clear()
+        pending = queue.Queue(maxsize=self.max_buffered)
+        producer = Thread(target=self._produce, args=(buffers, pending), daemon=True)
+        producer.start()
+
+        channel = pygame.mixer.find_channel(True)
+        channel.set_volume(1.0)
+        scheduled = deque()  # Буферы в канале: [играет, следующий]
+        finished = 0  # Полностью проигранные фрагменты
+        total = 1
+        started_at = 0.0
+        done = False
+        error = None
+        self.playing = True
+        try:
+            while not self._stop.is_set():
+                # Снимаем проигранные буферы
+                if scheduled and not channel.get_busy():
+                    finished += len(scheduled)
+                    scheduled.clear()
+                elif len(scheduled) == 2 and channel.get_queue() is None:
+                    scheduled.popleft()
+                    finished += 1
+                    started_at = time.perf_counter()
+
+                # Подкладываем следующий буфер, пока в канале меньше двух
+                if not done and len(scheduled) < 2:
+                    try:
+                        item = pending.get(timeout=0 if scheduled else self.poll_interval)
+                    except queue.Empty:
+                        item = None
+                    if item is _DONE:
+                        done = True
+                    elif isinstance(item, Exception):
+                        error = item
+                        done = True
+                    elif item is not None:
+                        pcm, total = item
+                        sound = to_sound(pcm, volume)
+                        if scheduled:
+                            channel.queue(sound)
+                        else:
+                            channel.play(sound)
+                            started_at = time.perf_counter()
+                        scheduled.append(len(pcm))
+
+                if done and not scheduled:
+                    break
+
+                if on_progress and scheduled:
+                    # Оценка по часам в пределах текущего буфера; при недогрузке канала начало сдвигается на его play()
+                    position = min(scheduled[0], (time.perf_counter() - started_at) * SAMPLE_RATE)
+                    on_progress(min(1.0, (finished + position / max(1, scheduled[0])) / max(1, total)))
+                time.sleep(self.poll_interval)
+        finally:
+            self._stop.set()
+            channel.stop()
+            self.playing = False
+        if error is not None:
+            raise error
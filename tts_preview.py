@@ -0,0 +1,110 @@
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import threading
+import time
+
+from tts_audio import read_wav, write_wav
+
+DEFAULT_PREVIEW_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vosk-tts-gui", "previews")
+DEFAULT_PHRASE = "Здравствуйте! Так звучит мой голос."
+SPEAKER_COUNT = 57  # Голоса 0-56 многоголосой модели
+MAX_UNUSED_AGE = 30 * 24 * 3600  # Версии образцов, которыми столько не пользовались, удаляются
+
+
+class SpeakerCatalog:
+    """Образцы голосов: короткая фраза каждым чтецом, на диске.
+
+    Каталог версии — по модели, фразе и обработке фрагментов
+    (engine.segment_version()); внутри — по скорости: каталог_версии/скорость/N.wav.
+    Образцы пересобираются только после смены модели или фразы. Другие версии
+    не трогаются, пока ими пользуются (GUI и tts_preview.py с другой моделью или
+    фразой не удаляют образцы друг друга): при создании удаляются только те, что
+    не открывались MAX_UNUSED_AGE. Прочитанные образцы держатся в памяти.
+    """
+
+    def __init__(self, engine, phrase=None, cache_dir=DEFAULT_PREVIEW_DIR):
+        self.engine = engine
+        self.phrase = phrase or DEFAULT_PHRASE
+        version = f"{engine.model_name}|{self.phrase}|{engine.segment_version()}"
+        self.directory = os.path.join(cache_dir, hashlib.sha1(version.encode("utf-8")).hexdigest()[:16])
+        self._samples = {}  # (голос, скорость) -> PCM
+        self._lock = threading.Lock()
+        if os.path.isdir(self.directory):
+            os.utime(self.directory)  # Время последнего использования этой версии
+        if os.path.isdir(cache_dir):
+            cutoff = time.time() - MAX_UNUSED_AGE
+            for name in os.listdir(cache_dir):
+                path = os.path.join(cache_dir, name)
+                try:
+                    unused = name != os.path.basename(self.directory) and os.path.getmtime(path) < cutoff
+                except OSError:
+                    continue
+                if unused:
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def path(self, speaker_id, speed_factor=1.0):
+        return os.path.join(self.directory, f"{speed_factor:g}", f"{speaker_id}.wav")
+
+    def missing(self, speed_factor=1.0, speakers=range(SPEAKER_COUNT)):
+        return [speaker_id for speaker_id in speakers if not os.path.exists(self.path(speaker_id, speed_factor))]
+
+    def get(self, speaker_id, speed_factor=1.0):
+        # Готовый образец или None (не синтезирует)
+        key = (speaker_id, speed_factor)
+        with self._lock:
+            if key in self._samples:
+                return self._samples[key]
+        try:
+            pcm = read_wav(self.path(speaker_id, speed_factor))
+        except (OSError, EOFError, ValueError):
+            return None
+        with self._lock:
+            self._samples[key] = pcm
+        return pcm
+
+    def render(self, speaker_id, speed_factor=1.0, token=None):
+        # Образец из кэша или синтез; фраза только очищается (словарь пользователя не влияет на образец)
+        pcm = self.get(speaker_id, speed_factor)
+        if pcm is not None:
+            return pcm
+        if token:
+            token.check()
+        engine = self.engine
+        pcm = engine.condition(engine.synth_raw(engine.clean_text_only(self.phrase), speaker_id), speed_factor)
+        file_path = self.path(speaker_id, speed_factor)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        write_wav(tmp, pcm)
+        os.replace(tmp, file_path)
+        with self._lock:
+            self._samples[(speaker_id, speed_factor)] = pcm
+        return pcm
+
+
+def main(argv=None):
+    from tts_engine import TTSEngine, log_message
+    from tts_cache import SegmentCache
+    from tts_config import add_model_arguments, config_from_args, engine_options
+
+    parser = argparse.ArgumentParser(description="Образцы всех голосов модели для выбора чтеца в GUI")
+    add_model_arguments(parser)
+    parser.add_argument("--speed", type=float, default=1.0, help="Скорость образцов")
+    parser.add_argument("--phrase", help="Фраза образца (по умолчанию — из настроек)")
+    args = parser.parse_args(argv)
+
+    config = config_from_args(args)
+    engine = TTSEngine(dict_file=None, cache=SegmentCache(enabled=False), **engine_options(config))
+    catalog = SpeakerCatalog(engine, args.phrase or config["preview_phrase"])
+    missing = catalog.missing(args.speed)
+    for n, speaker_id in enumerate(missing, 1):
+        catalog.render(speaker_id, args.speed)
+        log_message(f"Голос {speaker_id}: {n}/{len(missing)}")
+    log_message(f"Образцы в {os.path.dirname(catalog.path(0, args.speed))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import re
+
+# Разметка голоса: [speaker=12] действует до следующей метки (в тексте — и через абзацы, в SRT — и на следующие субтитры)
+SPEAKER_TAG_RE = re.compile(r"\[\s*speaker\s*=\s*(\d+)\s*\]", re.IGNORECASE)
+
+
+def split_speakers(text, speaker_id):
+    # Текст -> [(голос, кусок)] по порядку, без меток; голос до первой метки — speaker_id.
+    # Пустые куски не отбрасываются: по последнему видно, какой голос действует дальше
+    pieces = []
+    position = 0
+    for match in SPEAKER_TAG_RE.finditer(text):
+        pieces.append((speaker_id, text[position:match.start()]))
+        speaker_id = int(match.group(1))
+        position = match.end()
+    pieces.append((speaker_id, text[position:]))
+    return pieces
+
+
+def cue_speakers(subtitles, speaker_id):
+    # По субтитру: непустые куски [(голос, текст)]; метка в субтитре действует и на следующие
+    result = []
+    for _, _, text in subtitles:
+        pieces = split_speakers(text, speaker_id)
+        speaker_id = pieces[-1][0]
+        result.append([(speaker, piece.strip()) for speaker, piece in pieces if piece.strip()])
+    return result
+
+
+def batch_by_speaker(items, speaker_of):
+    # Порядок запуска: подряд всё для первого встреченного голоса, затем для следующего;
+    # внутри голоса — по порядку текста (сортировка устойчивая)
+    first_seen = {}
+    for item in items:
+        first_seen.setdefault(speaker_of(item), len(first_seen))
+    return sorted(items, key=lambda item: first_seen[speaker_of(item)])
@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import zlib
+
+import numpy as np
+
+DEFAULT_COST_FILE = os.path.join(os.path.expanduser("~"), ".cache", "vosk-tts-gui", "cost_model.json")
+MAX_CHARS = 500  # Длиннее модель звучит хуже и требует много памяти
+MIN_CHARS = 60  # Короче фрагменты не делаются, если есть что склеить
+
+# Сокращения, после точки в которых предложение не заканчивается (нижний регистр, без точки)
+ABBREVIATIONS = {
+    "т", "е", "д", "п", "г", "гг", "в", "вв", "ул", "пр", "пер", "просп", "пл", "обл", "р", "им", "см", "ср",
+    "стр", "с", "рис", "табл", "гл", "ч", "т.е", "т.к", "т.н", "т.ч", "т.д", "т.п", "др", "проф", "акад", "доц",
+    "канд", "тов", "г-н", "г-жа", "ст", "млн", "млрд", "тыс", "руб", "коп", "долл", "мин", "сек", "кв", "корп",
+    "напр", "прим", "ред", "изд", "англ", "лат", "рус", "нем", "франц", "н.э", "до н.э", "etc",
+}
+# Эти сокращения часто стоят в конце предложения: граница, если дальше заглавная буква
+FINAL_ABBREVIATIONS = {"т.д", "т.п", "др", "пр", "н.э", "etc"}
+
+_SENTENCE_END_RE = re.compile(r'[.!?…]+["»”)]*(?=\s|$)')
+_WORD_BEFORE_RE = re.compile(r'(\S+?)[.!?…]*$')
+_CLAUSE_RE = re.compile(r'(?<=[,;:])\s+|\s+(?=[—–-]\s)')
+
+
+def split_sentences(text):
+    # Предложения по . ! ? …, кроме точки после сокращения или инициала (А. С. Пушкин)
+    sentences = []
+    start = 0
+    for m in _SENTENCE_END_RE.finditer(text):
+        if m.group(0).startswith(".") and len(m.group(0).rstrip('"»”)')) == 1:
+            word = _WORD_BEFORE_RE.search(text, start, m.start() + 1).group(1).rstrip(".").split("(")[-1]
+            if len(word) == 1 and word.isupper():
+                continue  # Инициал
+            word = word.lower()
+            next_upper = text[m.end():].lstrip()[:1].isupper()
+            if word in ABBREVIATIONS and not (word in FINAL_ABBREVIATIONS and next_upper):
+                continue
+        sentence = text[start:m.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = m.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _split_long(sentence, max_chars):
+    # Слишком длинное предложение — по границам частей (запятая, точка с запятой, двоеточие, тире),
+    # затем по пробелам, в крайнем случае — жёстко
+    if len(sentence) <= max_chars:
+        return [sentence]
+    pieces = []
+    for clause in _CLAUSE_RE.split(sentence):
+        if len(clause) <= max_chars:
+            pieces.append(clause)
+            continue
+        words = []
+        for word in clause.split():
+            while len(word) > max_chars:
+                pieces.append(word[:max_chars])
+                word = word[max_chars:]
+            if words and len(" ".join(words)) + 1 + len(word) > max_chars:
+                pieces.append(" ".join(words))
+                words = []
+            words.append(word)
+        if words:
+            pieces.append(" ".join(words))
+    return _pack(pieces, max_chars, 0)
+
+
+def _pack(pieces, target, min_chars):
+    # Склейка подряд идущих кусков до target символов. Кроме длины, граница ставится
+    # по содержимому (хэш последнего куска), если фрагмент уже не короче min_chars:
+    # после правки в начале текста границы дальше совпадают с прежними и
+    # повторный синтез (incremental) затрагивает только изменённые фрагменты
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > target:
+            chunks.append(current)
+            current = ""
+        current = f"{current} {piece}" if current else piece
+        if len(current) >= min_chars and zlib.crc32(piece.encode("utf-8")) % 4 == 0:
+            chunks.append(current)
+            current = ""
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class CostModel:
+    """Время синтеза в зависимости от длины входа: fixed + per_char*n + quadratic*n².
+
+    fixed — накладные расходы вызова модели, quadratic — рост стоимости на
+    длинных входах. Секунд аудио на символ примерно постоянно, поэтому
+    больше всего аудио на секунду CPU даёт длина sqrt(fixed / quadratic).
+    """
+
+    def __init__(self, fixed=0.18, per_char=0.002, quadratic=2e-6, measured=False):
+        self.fixed = fixed
+        self.per_char = per_char
+        self.quadratic = quadratic
+        self.measured = measured
+
+    def seconds(self, chars):
+        return self.fixed + self.per_char * chars + self.quadratic * chars * chars
+
+    def best_chars(self, max_chars=MAX_CHARS, min_chars=MIN_CHARS):
+        if self.quadratic <= 0:
+            return max_chars
+        return int(min(max_chars, max(min_chars, (self.fixed / self.quadratic) ** 0.5)))
+
+    @classmethod
+    def fit(cls, lengths, seconds):
+        # МНК по замерам; отрицательные коэффициенты не имеют смысла и обнуляются
+        c, b, a = np.polyfit(np.asarray(lengths, dtype=float), np.asarray(seconds, dtype=float), 2)
+        if c < 0:
+            c = 0.0
+            b, a = np.polyfit(np.asarray(lengths, dtype=float), np.asarray(seconds, dtype=float), 1)
+        return cls(max(0.0, float(a)), max(0.0, float(b)), float(c), measured=True)
+
+    def to_dict(self):
+        return {"fixed": self.fixed, "per_char": self.per_char, "quadratic": self.quadratic}
+
+    @classmethod
+    def load(cls, model_name, file_path=DEFAULT_COST_FILE):
+        # Откалиброванная модель для данной модели TTS или значения по умолчанию
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f).get(model_name)
+        except (OSError, ValueError):
+            data = None
+        if not data:
+            return cls()
+        return cls(data["fixed"], data["per_char"], data["quadratic"], measured=True)
+
+    def save(self, model_name, file_path=DEFAULT_COST_FILE):
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data[model_name] = self.to_dict()
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp = file_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, file_path)
+
+
+class Segmenter:
+    """Разбиение нормализованного текста абзаца на фрагменты для синтеза.
+
+    Границы только между предложениями (с учётом сокращений), длинные
+    предложения режутся по запятым и тире. Длина фрагмента выбирается по
+    CostModel, но не больше max_chars.
+    """
+
+    def __init__(self, cost_model=None, max_chars=MAX_CHARS, min_chars=MIN_CHARS):
+        self.cost_model = cost_model or CostModel()
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self.target_chars = self.cost_model.best_chars(max_chars, min_chars)
+
+    def split(self, text):
+        pieces = []
+        for sentence in split_sentences(text):
+            pieces.extend(_split_long(sentence, self.max_chars))
+        return _pack(pieces, self.target_chars, min(self.min_chars, self.target_chars))
+
+
+CALIBRATION_TEXT = ("Съешь же ещё этих мягких французских булок, да выпей чаю. Широкая электрификация южных губерний "
+                    "даст мощный толчок подъёму сельского хозяйства. В чащах юга жил бы цитрус, да, но фальшивый экземпляр. ")
+
+
+def calibrate(engine, speaker_id=0, lengths=(20, 50, 100, 200, 300, 400, 500), repeats=3, log=None):
+    # Замер времени синтеза для входов разной длины и подгонка CostModel
+    text = engine.apply_dictionary_and_numbers(CALIBRATION_TEXT * 10)
+    engine.synth_raw(text[:50], speaker_id)  # Прогрев
+    xs, ys = [], []
+    for n in lengths:
+        sample = text[:n]
+        for _ in range(repeats):
+            started = time.perf_counter()
+            engine.synth_raw(sample, speaker_id)
+            xs.append(len(sample))
+            ys.append(time.perf_counter() - started)
+        if log:
+            log(f"{n} символов: {min(ys[-repeats:]):.3f} с")
+    return CostModel.fit(xs, ys)
+
+
+def main(argv=None):
+    from tts_engine import TTSEngine, log_message
+    from tts_cache import SegmentCache
+    from tts_config import add_model_arguments, config_from_args, engine_options
+
+    parser = argparse.ArgumentParser(description="Калибровка модели стоимости синтеза для выбора длины фрагментов")
+    add_model_arguments(parser)
+    parser.add_argument("-s", "--speaker", type=int, default=0, help="ID голоса для замеров")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[20, 50, 100, 200, 300, 400, 500])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--cost-file", default=DEFAULT_COST_FILE, help="Куда сохранить результат")
+    args = parser.parse_args(argv)
+
+    engine = TTSEngine(dict_file=None, cache=SegmentCache(enabled=False), **engine_options(config_from_args(args)))
+    model = calibrate(engine, args.speaker, args.lengths, args.repeats, log=log_message)
+    model.save(engine.model_name, args.cost_file)
+    log_message(f"Модель стоимости: {json.dumps(model.to_dict())}, длина фрагмента: {model.best_chars()} символов")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import json
+import sys
+import traceback
+from urllib.parse import urlsplit, parse_qsl
+
+from tts_audio import SAMPLE_RATE, CallbackWriter, wav_stream_header
+from tts_dsp import apply_gain
+from tts_jobs import CancelToken, JobCancelled
+from tts_timing import StageTimer
+
+MAX_BODY = 50 * 1024 * 1024  # Больше не принимаем: текст книги целиком лучше отдавать tts_audiobook.py
+MAX_VOLUME = 4.0  # Усиление больше +12 дБ только перегружает звук
+STREAM_BUFFERS = 8  # Сколько готовых фрагментов ждёт медленного клиента, дальше синтез стоит
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class SynthServer:
+    """Локальный HTTP-сервер синтеза с одной загруженной моделью.
+
+    POST /synth — JSON {"text" или "srt", "speaker", "speed", "volume", "format": "wav"|"pcm"}
+    (или текст в теле и параметры в строке запроса). Аудио отдаётся
+    chunked-ответом по мере синтеза фрагментов. Одновременно синтезируется
+    не больше max_concurrent запросов, ещё max_queue ждут очереди, остальным
+    сразу отвечается 503. Медленный клиент притормаживает свой синтез
+    (очередь на STREAM_BUFFERS фрагментов), отключившийся — отменяет его.
+    GET /health — состояние сервера.
+    """
+
+    def __init__(self, engine, max_concurrent=2, max_queue=16, request_workers=1, log=None):
+        self.engine = engine
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.request_workers = request_workers
+        self.log = log
+        self.active = 0
+        self.waiting = 0
+        self.served = 0
+        self._semaphore = None
+
+    async def serve(self, host="127.0.0.1", port=5002, unix_socket=None):
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        if unix_socket:
+            server = await asyncio.start_unix_server(self._handle, path=unix_socket)
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+        if self.log:
+            where = unix_socket or f"http://{host}:{port}"
+            self.log(f"Сервер синтеза: {where} (одновременно {self.max_concurrent}, очередь {self.max_queue})")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            method, path, query, headers, body = await self._read_request(reader)
+            if path == "/health":
+                await self._send_json(writer, 200, self.health())
+            elif path == "/synth":
+                if method not in ("GET", "POST"):
+                    raise HTTPError(405, "Нужен POST")
+                await self._synth(writer, self._parse_params(query, headers, body))
+            else:
+                raise HTTPError(404, f"Нет такого пути: {path}")
+        except HTTPError as e:
+            await self._send_json(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            if self.log:
+                self.log(f"Ошибка запроса: {traceback.format_exc()}")
+            try:
+                await self._send_json(writer, 500, {"error": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    def health(self):
+        return {"status": "ok", "model": self.engine.model_name, "active": self.active, "waiting": self.waiting,
+                "served": self.served, "max_concurrent": self.max_concurrent, "max_queue": self.max_queue,
+                "sample_rate": SAMPLE_RATE}
+
+    async def _read_request(self, reader):
+        request_line = (await reader.readline()).decode("latin1").strip()
+        if not request_line:
+            raise ConnectionError("Пустой запрос")
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Неверная строка запроса")
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Неверный Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Неверный Content-Length")
+        if length > MAX_BODY:
+            raise HTTPError(413, "Слишком большой запрос")
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return method.upper(), url.path, dict(parse_qsl(url.query)), headers, body
+
+    def _parse_params(self, query, headers, body):
+        params = dict(query)
+        if body:
+            if headers.get("content-type", "").startswith("application/json"):
+                try:
+                    data = json.loads(body.decode("utf-8"))
+                except ValueError:
+                    raise HTTPError(400, "Неверный JSON")
+                if not isinstance(data, dict):
+                    raise HTTPError(400, "JSON должен быть объектом")
+                params.update(data)
+            else:
+                try:
+                    params.setdefault("srt" if params.get("type") == "srt" else "text", body.decode("utf-8"))
+                except UnicodeDecodeError:
+                    raise HTTPError(400, "Текст должен быть в UTF-8")
+        try:
+            speaker_id = int(params.get("speaker", 2))
+            speed_factor = float(params.get("speed", 1.0))
+        except (TypeError, ValueError):
+            raise HTTPError(400, "speaker и speed должны быть числами")
+        speakers = self.engine.speaker_count()
+        if speaker_id < 0 or (speakers and speaker_id >= speakers):
+            raise HTTPError(400, f"speaker должен быть от 0 до {speakers - 1}" if speakers else "speaker должен быть не меньше 0")
+        if not 0.5 <= speed_factor <= 2.0:
+            raise HTTPError(400, "speed должен быть от 0.5 до 2.0")
+        try:
+            gain = float(params.get("volume", 1.0))
+        except (TypeError, ValueError):
+            raise HTTPError(400, "volume должен быть числом")
+        if not 0.0 <= gain <= MAX_VOLUME:
+            raise HTTPError(400, f"volume должен быть от 0 до {MAX_VOLUME:g}")
+        format = params.get("format", "wav")
+        if format not in ("wav", "pcm"):
+            raise HTTPError(400, "format: wav или pcm")
+        text = params.get("text")
+        srt = params.get("srt")
+        if not isinstance(text, (str, type(None))) or not isinstance(srt, (str, type(None))):
+            raise HTTPError(400, "text и srt должны быть строками")
+        if srt:
+            problems = []
+            subtitles = self.engine.parse_srt_text(srt, log=problems.append)
+            if not subtitles:
+                raise HTTPError(400, "SRT пустой или неверный формат" + (f" ({problems[0]})" if problems else ""))
+        elif not text or not text.strip():
+            raise HTTPError(400, "Нужен text или srt")
+        else:
+            subtitles = None
+        return {"text": text, "subtitles": subtitles, "speaker_id": speaker_id, "speed_factor": speed_factor,
+                "gain": gain, "format": format}
+
+    async def _synth(self, writer, request):
+        if self.waiting >= self.max_queue and self._semaphore.locked():
+            raise HTTPError(503, "Сервер занят, повторите позже")
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            await self._stream(writer, request)
+            self.served += 1
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    async def _stream(self, writer, request):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(STREAM_BUFFERS)
+        token = CancelToken()
+        timer = StageTimer("server")
+        done = object()
+
+        def put(data):
+            # Вызывается из потока синтеза; ждёт, пока в очереди есть место
+            token.check()
+            asyncio.run_coroutine_threadsafe(queue.put(data), loop).result()
+
+        def produce():
+            try:
+                if request["subtitles"] is not None:
+                    self.engine.synth_srt(request["subtitles"], CallbackWriter(put, gain=request["gain"]), request["speaker_id"],
+                                          request["speed_factor"], log=lambda message: None,
+                                          workers=self.request_workers, token=token, timer=timer)
+                else:
+                    for pcm, _ in self.engine.iter_text_pcm(request["text"], request["speaker_id"],
+                                                            request["speed_factor"], token=token, timer=timer,
+                                                            workers=self.request_workers):
+                        put(apply_gain(pcm, request["gain"]).tobytes())
+                return None
+            except JobCancelled:
+                return None
+            except Exception as e:
+                return e
+            finally:
+                asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+        producer = loop.run_in_executor(None, produce)
+        first = await queue.get()
+        if first is done:
+            error = await producer
+            if error is not None:
+                raise error
+            first = b""
+
+        content_type = "audio/wav" if request["format"] == "wav" else "audio/L16"
+        await self._send_head(writer, 200, content_type, {"X-Sample-Rate": str(SAMPLE_RATE), "Transfer-Encoding": "chunked"})
+        try:
+            if request["format"] == "wav":
+                await self._send_chunk(writer, wav_stream_header())
+            data = first
+            while data is not done:
+                if data:
+                    await self._send_chunk(writer, data)
+                data = await queue.get()
+            error = await producer
+            if error is not None:
+                # Ответ уже начат: без завершающего чанка клиент увидит оборванный поток
+                if self.log:
+                    self.log(f"Синтез прерван ошибкой: {error}")
+                return
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except BaseException:
+            # Клиент отключился (или сервер останавливается): синтез отменяется
+            token.cancel()
+            while not producer.done():
+                # Освободить поток синтеза, если он ждёт места в очереди
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.sleep(0.01)
+            raise
+        finally:
+            timer.finish()
+            if self.log and timer.items:
+                self.log(json.dumps(dict(timer.summary(), event="request"), ensure_ascii=False))
+
+    async def _send_head(self, writer, status, content_type, extra=None):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}", "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in (extra or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin1"))
+        await writer.drain()
+
+    async def _send_chunk(self, writer, data):
+        writer.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        await writer.drain()
+
+    async def _send_json(self, writer, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        extra = {"Content-Length": str(len(body))}
+        if status == 503:
+            extra["Retry-After"] = "1"
+        await self._send_head(writer, status, "application/json; charset=utf-8", extra)
+        writer.write(body)
+        await writer.drain()
+
+
+def main(argv=None):
+    from tts_engine import TTSEngine, DEFAULT_DICT_FILE, log_message
+    from tts_cache import SegmentCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE
+    from tts_config import add_model_arguments, config_from_args, engine_options
+
+    parser = argparse.ArgumentParser(description="Локальный сервер синтеза с загруженной моделью")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5002)
+    parser.add_argument("--unix", help="Слушать Unix-сокет вместо TCP")
+    parser.add_argument("--max-concurrent", type=int, help="Одновременно синтезируемых запросов (по умолчанию threads из настроек или 2)")
+    parser.add_argument("--max-queue", type=int, default=16, help="Сколько запросов ждут в очереди, остальным 503")
+    parser.add_argument("--request-workers", "--srt-workers", dest="request_workers", type=int, default=1,
+                        help="Потоков синтеза на один запрос (фрагменты текста или субтитры)")
+    add_model_arguments(parser)
+    parser.add_argument("--dict", default=DEFAULT_DICT_FILE, help="Файл словаря произношения")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Каталог кэша фрагментов")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024))
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш фрагментов")
+    args = parser.parse_args(argv)
+
+    cache = SegmentCache(args.cache_dir, args.cache_size_mb * 1024 * 1024, enabled=not args.no_cache)
+    config = config_from_args(args)
+    max_concurrent = args.max_concurrent or config["threads"] or 2
+    engine = TTSEngine(dict_file=args.dict, cache=cache, **engine_options(config, max_concurrent * max(1, args.request_workers)))
+    server = SynthServer(engine, max_concurrent, args.max_queue, args.request_workers, log=log_message)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
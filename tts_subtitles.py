@@ -0,0 +1,214 @@
+import codecs
+import io
+import re
+from itertools import chain
+
+SUBTITLE_EXTENSIONS = (".srt", ".vtt", ".ass", ".ssa")
+SNIFF_BYTES = 64 * 1024  # Сколько байт начала файла смотреть при выборе кодировки
+FALLBACK_ENCODING = "cp1251"  # Не UTF: русские субтитры чаще всего в windows-1251
+
+_BOMS = [(codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"), (codecs.BOM_UTF8, "utf-8-sig"),
+         (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")]
+
+# Время: [часы:]минуты:секунды с дробной частью через запятую или точку (SRT, WebVTT, ASS)
+_TIME = r"(?:(\d+):)?(\d{1,2}):(\d{1,2})(?:[,.](\d{1,3}))?"
+_TIME_RE = re.compile(rf"^{_TIME}$")
+_TIMING_RE = re.compile(rf"^\s*{_TIME}\s*-->\s*{_TIME}(?:\s|$)")  # Дальше могут быть настройки WebVTT
+_TAG_RE = re.compile(r"<[^>]*>")  # <i>, <font ...>, <v Имя>, <00:01.000> в WebVTT
+_ASS_OVERRIDE_RE = re.compile(r"\{[^}]*\}")  # {\an8}, {\i1} и т.п.
+_ASS_BREAK_RE = re.compile(r"\\[Nnh]")
+
+
+def sniff_encoding(head):
+    # По BOM, затем по началу файла: нули через байт — UTF-16 без BOM, корректный UTF-8 — UTF-8
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    sample = head[:4096]
+    if sample.count(b"\0") > len(sample) // 4:
+        return "utf-16-le" if sample[1::2].count(b"\0") > sample[0::2].count(b"\0") else "utf-16-be"
+    try:
+        # Последний символ мог обрезаться на границе SNIFF_BYTES: final=False
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+
+
+def open_subtitles(file_path, encoding=None):
+    # Файл читается потоком; кодировка (если не задана) выбирается по первым SNIFF_BYTES.
+    # Декодирование строгое: байт не в этой кодировке дальше по файлу — UnicodeDecodeError
+    raw = open(file_path, "rb")
+    try:
+        if encoding is None:
+            encoding = sniff_encoding(raw.read(SNIFF_BYTES))
+            raw.seek(0)
+        return io.TextIOWrapper(raw, encoding=encoding, newline=None)
+    except BaseException:
+        raw.close()
+        raise
+
+
+def _seconds(hours, minutes, seconds, fraction):
+    value = float(int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds))
+    return value + int(fraction) / 10 ** len(fraction) if fraction else value
+
+
+def parse_time(time_str):
+    match = _TIME_RE.match(time_str.strip())
+    if not match:
+        raise ValueError(f"Неверное время: {time_str}")
+    return _seconds(*match.groups())
+
+
+def _clean(lines):
+    text = " ".join(lines)
+    return " ".join(_TAG_RE.sub("", text).split()) if "<" in text else text
+
+
+def _timing(line):
+    match = _TIMING_RE.match(line)
+    if not match:
+        raise ValueError(f"Неверная строка времени: {line}")
+    groups = match.groups()
+    start, end = _seconds(*groups[:4]), _seconds(*groups[4:])
+    if end < start:
+        raise ValueError(f"Конец раньше начала: {line}")
+    return start, end
+
+
+def _iter_srt_vtt(lines, problems, first_number):
+    # SRT и WebVTT: субтитр начинается со строки времени "начало --> конец", текст — до пустой
+    # строки или до следующей строки времени. Номер (или идентификатор WebVTT) перед строкой
+    # времени отбрасывается, даже если пустой строки перед ним нет
+    cue = None  # (начало, конец, строки текста, номер строки времени)
+    pending = None  # Последняя строка: текст или номер следующего субтитра, ясно на следующей строке
+    skip_block = False  # Блоки NOTE, STYLE, REGION в WebVTT и текст испорченного субтитра
+    index = 0  # Номер последнего субтитра: строка со следующим номером в конце текста — не текст
+    number = first_number
+    for number, line in enumerate(lines, first_number):
+        line = line.strip()
+        if not line:
+            if cue is not None:
+                if pending == str(index + 1):
+                    problems.append((number - 1, f"Номер субтитра без строки времени: {pending}"))
+                elif pending is not None:
+                    cue[2].append(pending)
+                yield cue
+            elif pending is not None:
+                problems.append((number - 1, f"Строка вне субтитра: {pending}"))
+            cue = pending = None
+            skip_block = False
+        elif skip_block:
+            continue
+        elif "-->" in line:
+            if cue is not None:
+                if pending is not None and not pending.isdigit():
+                    cue[2].append(pending)
+                yield cue
+            if pending is not None and pending.isdigit():
+                index = int(pending)
+            cue = pending = None
+            try:
+                start, end = _timing(line)
+            except ValueError as e:
+                problems.append((number, str(e)))
+                skip_block = True
+                continue
+            cue = (start, end, [], number)
+        elif cue is not None:
+            if pending is not None:
+                cue[2].append(pending)
+            pending = line
+        elif pending is None and line.split(" ", 1)[0] in ("WEBVTT", "NOTE", "STYLE", "REGION"):
+            skip_block = True
+        else:
+            if pending is not None:
+                problems.append((number - 1, f"Строка вне субтитра: {pending}"))
+            pending = line
+    # Номер субтитра без строки времени в конце файла не считается ошибкой
+    if cue is not None:
+        if pending is not None and pending != str(index + 1):
+            cue[2].append(pending)
+        yield cue
+    elif pending is not None and not pending.isdigit():
+        problems.append((number, f"Строка вне субтитра: {pending}"))
+
+
+def _iter_ass(lines, problems, first_number):
+    # ASS/SSA: строки Dialogue в разделе [Events], порядок полей — из строки Format
+    fields = ["layer", "start", "end", "style", "name", "marginl", "marginr", "marginv", "effect", "text"]
+    in_events = False
+    for number, line in enumerate(lines, first_number):
+        line = line.strip()
+        if line.startswith("["):
+            in_events = line.lower() == "[events]"
+            continue
+        if not in_events or ":" not in line:
+            continue
+        kind, _, value = line.partition(":")
+        kind = kind.strip().lower()
+        if kind == "format":
+            fields = [field.strip().lower() for field in value.split(",")]
+        elif kind == "dialogue":
+            parts = value.split(",", len(fields) - 1)
+            if len(parts) < len(fields) or "text" not in fields:
+                problems.append((number, f"Неполная строка Dialogue: {line}"))
+                continue
+            event = dict(zip(fields, parts))
+            try:
+                start, end = _timing(f"{event['start']} --> {event['end']}")
+            except ValueError as e:
+                problems.append((number, str(e)))
+                continue
+            text = _ASS_BREAK_RE.sub(" ", _ASS_OVERRIDE_RE.sub("", event["text"]))
+            yield start, end, [" ".join(text.split())], number
+
+
+def detect_format(line):
+    # По первой непустой строке: WebVTT начинается с WEBVTT, ASS/SSA — с раздела в квадратных скобках
+    line = line.strip().lstrip("\ufeff")
+    if line.startswith("WEBVTT"):
+        return "vtt"
+    if line.startswith("["):
+        return "ass"
+    return "srt"
+
+
+def iter_subtitles(lines, problems=None):
+    # Субтитры (начало, конец, текст) по мере чтения строк: файл целиком в памяти не нужен.
+    # Испорченные субтитры пропускаются, а в problems добавляется (номер строки, описание)
+    problems = problems if problems is not None else []
+    lines = iter(lines)
+    number = 0
+    first = ""
+    for first in lines:
+        number += 1
+        if first.strip():
+            break
+    else:
+        return
+    parse = _iter_ass if detect_format(first) == "ass" else _iter_srt_vtt
+    for start, end, text, _ in parse(chain([first.lstrip("\ufeff")], lines), problems, number):
+        yield start, end, _clean(text)
+
+
+def parse_subtitles(file_path, problems=None):
+    # Список субтитров файла, по времени начала (в ASS события не обязаны идти по порядку).
+    # Начало файла в ASCII, а дальше не UTF-8 — разбор повторяется в FALLBACK_ENCODING;
+    # не декодируется и так — ValueError, а не текст с испорченными символами
+    encoding = None
+    while True:
+        found = []
+        with open_subtitles(file_path, encoding) as f:
+            try:
+                subtitles = list(iter_subtitles(f, found))
+                break
+            except UnicodeDecodeError as e:
+                if f.encoding != "utf-8":
+                    raise ValueError(f"Файл субтитров не в кодировке {f.encoding}: {e.reason}") from e
+                encoding = FALLBACK_ENCODING
+    if problems is not None:
+        problems.extend(found)
+    subtitles.sort(key=lambda cue: cue[0])
+    return subtitles
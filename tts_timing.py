@@ -0,0 +1,141 @@
+import heapq
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+SLOWEST = 5  # Сколько самых долгих фрагментов/субтитров попадает в сводку
+
+
+class StageTimer:
+    """Замеры времени по этапам синтеза для одной задачи.
+
+    stage(name) добавляет время этапа (normalize, split, cache, decode, synth,
+    dsp, concat, fit, export) к итогам задачи и к текущему фрагменту
+    или субтитру, открытому через item(). Для каждого фрагмента верхнего
+    уровня в log передаётся JSON-строка: длина текста, секунды аудио, время
+    этапов и real-time factor. summary() — сводка по всей задаче.
+    Потокобезопасен: субтитры синтезируются в нескольких потоках.
+    """
+
+    def __init__(self, name="", log=None, enabled=True):
+        self.name = name
+        self.log = log
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.finished = None
+        self.stages = {}
+        self.items = 0
+        self.reused = 0
+        self.text_len = 0
+        self.audio_seconds = 0.0
+        self._slowest = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            for record in self._stack():
+                record["stages"][name] = record["stages"].get(name, 0.0) + seconds
+            with self._lock:
+                total = self.stages.setdefault(name, [0.0, 0])
+                total[0] += seconds
+                total[1] += 1
+
+    @contextmanager
+    def item(self, kind, index, text_len):
+        # Фрагмент текста или субтитр; вложенные item() учитываются в объемлющем
+        record = {"event": kind, "index": index, "text_len": text_len, "audio_s": 0.0, "stages": {}}
+        if not self.enabled:
+            yield record
+            return
+        stack = self._stack()
+        stack.append(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            stack.pop()
+            if not stack:
+                self._finish_item(record, time.perf_counter() - started)
+
+    def _finish_item(self, record, seconds):
+        record["seconds"] = round(seconds, 4)
+        record["stages"] = {name: round(value, 4) for name, value in record["stages"].items()}
+        record["audio_s"] = round(record["audio_s"], 3)
+        record["rtf"] = round(seconds / record["audio_s"], 4) if record["audio_s"] else None
+        if self.name:
+            record["job"] = self.name
+        with self._lock:
+            self.items += 1
+            self.reused += bool(record.get("reused"))
+            self.text_len += record["text_len"]
+            self.audio_seconds += record["audio_s"]
+            entry = (seconds, next(self._order), record)
+            if len(self._slowest) < SLOWEST:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+        if self.log:
+            self.log(json.dumps(record, ensure_ascii=False))
+
+    def finish(self):
+        if self.finished is None:
+            self.finished = time.perf_counter()
+
+    def summary(self):
+        end = self.finished if self.finished is not None else time.perf_counter()
+        wall = end - self.started
+        with self._lock:
+            return {
+                "job": self.name,
+                "wall_s": round(wall, 3),
+                "items": self.items,
+                "reused": self.reused,
+                "text_len": self.text_len,
+                "audio_s": round(self.audio_seconds, 3),
+                "rtf": round(wall / self.audio_seconds, 4) if self.audio_seconds else None,
+                "stages": {name: {"seconds": round(seconds, 4), "calls": calls}
+                           for name, (seconds, calls) in sorted(self.stages.items(), key=lambda kv: -kv[1][0])},
+                "slowest": [{key: record[key] for key in ("event", "index", "text_len", "seconds", "audio_s")}
+                            for _, _, record in sorted(self._slowest, reverse=True)],
+            }
+
+    def format_summary(self):
+        # Краткая сводка для показа пользователю
+        summary = self.summary()
+        lines = [f"Время: {summary['wall_s']} с, аудио: {summary['audio_s']} с, RTF: {summary['rtf']}",
+                 f"Фрагментов: {summary['items']} (из кэша правки: {summary['reused']}), символов: {summary['text_len']}"]
+        for name, stage in summary["stages"].items():
+            share = stage["seconds"] / summary["wall_s"] * 100 if summary["wall_s"] else 0
+            lines.append(f"  {name}: {stage['seconds']} с ({share:.0f}%), вызовов: {stage['calls']}")
+        return "\n".join(lines)
+
+
+NO_TIMER = StageTimer(enabled=False)  # Заглушка, когда замеры не нужны
+
+
+def json_log_file(file_path):
+    # log для StageTimer: дописывает JSON-строки в файл (можно из нескольких процессов)
+    lock = threading.Lock()
+
+    def log(line):
+        with lock, open(file_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    return log